@@ -0,0 +1,95 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Throughput of the sprite atlas image sequence writer of bad_export with in-memory arrays: frames per second
+# per format and crop mode, and how long write_frame blocks the caller when the sink is slower than rendering.
+# The png cells of the first frame are decoded again and compared with the atlas.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_atlas_export.py [--json results.json]
+
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+bad_export = load_addon_module("bad_export")
+
+FRAMES = 24
+
+def decode_png(data : bytes) -> np.ndarray:
+    width, height = struct.unpack(">II", data[16:24])
+    length = struct.unpack(">I", data[33:37])[0]
+    scanlines = np.frombuffer(zlib.decompress(data[41:41 + length]), dtype = np.uint8).reshape(height, 1 + width * 4)
+    return scanlines[:, 1:].reshape(height, width, 4)
+
+class MemorySink:
+
+    def __init__(self, delay : float = 0.0):
+        self.m_files = {}
+        self.m_delay = delay
+        self.m_lock = threading.Lock()
+
+    def __call__(self, path : str, data : bytes):
+        if self.m_delay > 0.0:
+            time.sleep(self.m_delay)
+        with self.m_lock:
+            self.m_files[path] = data
+
+def create_atlas(rng : np.random.Generator):
+    atlas = rng.integers(0, 256, (1, 2048, 2048, 4), dtype = np.uint8)
+    cells = { object_id : ((object_id - 1) % 16 * 128, (object_id - 1) // 16 * 128, 128, 128, 0) for object_id in range(1, 65) }
+    return atlas, cells
+
+def run(atlas : np.ndarray, cells : dict, format : str, crop : str, sink : MemorySink, workers : int = 2, max_pending : int = 4):
+    writer = bad_export.BAD_ImageSequenceWriter("atlas", format, crop, workers, max_pending, sink = sink)
+
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        writer.write_frame(frame, atlas, cells)
+    writer.close()
+
+    return time.perf_counter() - start, writer
+
+def main(argv):
+    rng = np.random.default_rng(0)
+    atlas, cells = create_atlas(rng)
+    results = []
+
+    sink = MemorySink()
+    run(atlas, cells, "PNG", "CELLS", sink)
+    for object_id, (x, y, width, height, page) in cells.items():
+        assert np.array_equal(decode_png(sink.m_files[f"atlas/cell_{object_id:05d}_00000.png"]), atlas[page, y:y + height, x:x + width][::-1])
+
+    print(f"{'format':>6} {'crop':>6} {'sink delay (ms)':>16} {'frames/s':>9} {'MB/frame':>9} {'blocked (ms)':>13}")
+
+    for format, crop, delay in (("PNG", "CELLS", 0.0), ("PNG", "PAGES", 0.0), ("EXR", "PAGES", 0.0), ("RAW", "PAGES", 0.0), ("RAW", "PAGES", 0.05)):
+        seconds, writer = run(atlas, cells, format, crop, MemorySink(delay))
+
+        results.append({ "format" : format, "crop" : crop, "sink_delay_seconds" : delay, "frames" : FRAMES, "seconds" : seconds,
+                         "bytes_per_frame" : writer.m_written_bytes / FRAMES, "blocked_seconds" : writer.m_blocked_seconds })
+
+        print(f"{format:>6} {crop:>6} {delay * 1000.0:>16.0f} {FRAMES / seconds:>9.1f} {writer.m_written_bytes / FRAMES / 2**20:>9.2f} {writer.m_blocked_seconds * 1000.0:>13.1f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,132 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Compares the atomic (render channels + merge) and gather sprite atlas kernels with the numpy references
+# of bad_cpu_backend: all must produce the same atlas, and all are timed on the cpu. The atomic kernel runs
+# with 32 bit sums in 4 accumulator layers per page and, where the cell sizes allow it, packed 16 bit sums in 2.
+# Atlas memory and the estimated per frame traffic of the atomic kernel are printed for both accumulator layouts.
+# The objects of the frames leave background pixels (id 0) between them, neither kernel writes them to the atlas.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_atlas_kernels.py [--json results.json]
+
+import time
+
+import numpy as np
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+bad_globals = load_addon_module("bad_globals")
+bad_packer = load_addon_module("bad_packer")
+bad_cpu_backend = load_addon_module("bad_cpu_backend")
+
+ATLAS_WIDTH = bad_globals.BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH
+ATLAS_HEIGHT = bad_globals.BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT
+
+def create_frame(width : int, height : int, object_count : int, rng : np.random.Generator):
+    object_ids = np.zeros((height, width), dtype = np.float32)
+
+    for object_id in range(1, object_count + 1):
+        w = int(rng.integers(width // 20, width // 4))
+        h = int(rng.integers(height // 20, height // 4))
+        x = int(rng.integers(0, width - w))
+        y = int(rng.integers(0, height - h))
+        object_ids[y:y + h, x:x + w] = object_id
+
+    colors = rng.integers(0, 256, (height, width, 4)).astype(np.float32) / np.float32(255.0)
+    return object_ids, colors
+
+def create_cell_table(packer, width : int, height : int) -> np.ndarray:
+    capacity = bad_globals.BAD_CELL_VIEWPORTS_PER_ROW
+    while capacity <= max(packer.m_rects.keys(), default = 0):
+        capacity *= 2
+
+    cell_viewports = np.zeros((capacity, 2, 4), dtype = np.float32)
+    for object_id, (x, y, w, h, page) in packer.m_rects.items():
+        cell_viewports[object_id, 0, :] = (x, y, w, h)
+        cell_viewports[object_id, 1, 0] = page
+    cell_viewports[0, 0, 2:] = (width, height)
+
+    return cell_viewports
+
+def main(argv):
+    rng = np.random.default_rng(0)
+    results = []
+
+    print(f"{'viewport':>10} {'objects':>8} {'cell':>6} {'atomic (ms)':>12} {'packed (ms)':>12} {'gather (ms)':>12} {'max difference':>15}")
+
+    for width, height in ((640, 360), (1280, 720)):
+        for object_count, cell_size in ((10, 256), (50, 128), (100, 64), (10, 32)):
+            object_ids, colors = create_frame(width, height, object_count, rng)
+
+            packer = bad_packer.BAD_AtlasPages(bad_globals.BAD_SPRITE_ATLAS_PACKER, ATLAS_WIDTH, ATLAS_HEIGHT, bad_globals.BAD_MAX_SPRITE_ATLAS_PAGES)
+            packer.update({ object_id : (cell_size, cell_size) for object_id in range(1, object_count + 1) })
+            pages = packer.page_count()
+            cell_viewports = create_cell_table(packer, width, height)
+
+            start = time.perf_counter()
+            accumulator = bad_cpu_backend.render_channels_atomic(object_ids, colors, cell_viewports, ATLAS_WIDTH, ATLAS_HEIGHT, pages)
+            atomic_atlas = bad_cpu_backend.merge_channels(accumulator)
+            atomic_time = time.perf_counter() - start
+
+            rects = np.array(list(packer.m_rects.values()), dtype = np.int64)
+            packed_atlas = atomic_atlas
+            packed_time = None
+            if bad_cpu_backend.max_contributors(rects, width, height) <= bad_cpu_backend.BAD_MAX_PACKED_CONTRIBUTORS:
+                start = time.perf_counter()
+                accumulator = bad_cpu_backend.render_channels_atomic(object_ids, colors, cell_viewports, ATLAS_WIDTH, ATLAS_HEIGHT, pages, is_packed = True)
+                packed_atlas = bad_cpu_backend.merge_channels(accumulator, is_packed = True)
+                packed_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cell_owners = bad_cpu_backend.build_cell_owners(packer.m_rects, ATLAS_WIDTH, ATLAS_HEIGHT, pages)
+            gather_atlas = bad_cpu_backend.gather(object_ids, colors, cell_viewports, cell_owners)
+            gather_time = time.perf_counter() - start
+
+            difference = float(max(np.abs(atomic_atlas - gather_atlas).max(), np.abs(atomic_atlas - packed_atlas).max()))
+
+            layouts = {}
+            for name, is_packed in (("32_bit", False), ("16_bit", True)):
+                layers_per_page = bad_cpu_backend.sprite_atlas_layers_per_page("ATOMIC", is_packed)
+                layouts[name] = { "memory_bytes" : bad_cpu_backend.sprite_atlas_memory_bytes(ATLAS_WIDTH, ATLAS_HEIGHT, pages, layers_per_page),
+                                  "frame_traffic_bytes" : bad_cpu_backend.sprite_atlas_frame_traffic_bytes(width * height, ATLAS_WIDTH, ATLAS_HEIGHT, pages, layers_per_page) }
+
+            results.append({ "viewport" : [width, height], "objects" : object_count, "cell_size" : cell_size, "pages" : pages,
+                             "atomic_seconds" : atomic_time, "packed_seconds" : packed_time, "gather_seconds" : gather_time,
+                             "max_difference" : difference, "layouts" : layouts })
+
+            packed = f"{packed_time * 1000.0:>12.1f}" if packed_time != None else f"{'-':>12}"
+            print(f"{f'{width}x{height}':>10} {object_count:>8} {cell_size:>6} {atomic_time * 1000.0:>12.1f} {packed} {gather_time * 1000.0:>12.1f} {difference:>15.6f}")
+
+    print()
+    print(f"{'viewport':>10} {'pages':>6} {'32 bit (MB)':>12} {'16 bit (MB)':>12} {'32 bit (MB/frame)':>18} {'16 bit (MB/frame)':>18}")
+    printed = set()
+    for result in results:
+        key = (tuple(result["viewport"]), result["pages"])
+        if key in printed:
+            continue
+        printed.add(key)
+
+        layouts = result["layouts"]
+        print(f"{'x'.join(str(d) for d in result['viewport']):>10} {result['pages']:>6} "
+              f"{layouts['32_bit']['memory_bytes'] / 2**20:>12.0f} {layouts['16_bit']['memory_bytes'] / 2**20:>12.0f} "
+              f"{layouts['32_bit']['frame_traffic_bytes'] / 2**20:>18.1f} {layouts['16_bit']['frame_traffic_bytes'] / 2**20:>18.1f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
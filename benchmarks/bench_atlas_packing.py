@@ -0,0 +1,112 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Fill rate of the sprite atlas packers against the shelf loop that
+# create_uniform_buffer_cell_viewports used before, plus the cost of an incremental update.
+# PAGED is the multi page atlas the pipeline uses, its occupancy is relative to all allocated pages.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_atlas_packing.py [--json results.json]
+
+import random
+import sys
+import time
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+bad_globals = load_addon_module("bad_globals")
+bad_packer = load_addon_module("bad_packer")
+
+ATLAS_WIDTH = bad_globals.BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH
+ATLAS_HEIGHT = bad_globals.BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT
+
+def legacy_shelf(sizes : dict) -> dict:
+    rects = {}
+    width_counter = 0
+    height_counter = 0
+    max_resolution_height = 0
+
+    for key, (width, height) in sizes.items():
+        rects[key] = (width_counter, height_counter, width, height)
+        width_counter += width
+        max_resolution_height = max(max_resolution_height, height_counter + height)
+        if width_counter >= ATLAS_WIDTH:
+            width_counter = 0
+            height_counter = max_resolution_height
+            if height_counter >= ATLAS_HEIGHT:
+                break
+
+    # cells sticking out of the atlas are garbage
+    return { key : rect for key, rect in rects.items() if rect[0] + rect[2] <= ATLAS_WIDTH and rect[1] + rect[3] <= ATLAS_HEIGHT }
+
+def create_scene(kind : str, count : int, rng : random.Random) -> dict:
+    sizes = {}
+    for key in range(1, count + 1):
+        if kind == "uniform":
+            sizes[key] = (64, 128)
+        elif kind == "elongated":
+            sizes[key] = (8, 512) if key % 2 == 0 else (512, 8)
+        else:
+            sizes[key] = (1 << rng.randint(3, 9), 1 << rng.randint(3, 9))
+    return sizes
+
+def main(argv):
+    rng = random.Random(0)
+    results = []
+
+    print(f"{'scene':>10} {'cells':>6} {'packer':>9} {'placed':>7} {'occupancy':>10} {'pack (ms)':>10} {'resize one (ms)':>16}")
+
+    for kind in ("uniform", "elongated", "mixed"):
+        for count in (50, 100, 200, 400):
+            sizes = create_scene(kind, count, rng)
+
+            start = time.perf_counter()
+            rects = legacy_shelf(sizes)
+            pack_time = time.perf_counter() - start
+            area = sum(rect[2] * rect[3] for rect in rects.values())
+            results.append({ "scene" : kind, "cells" : count, "packer" : "SHELF", "placed" : len(rects),
+                             "occupancy" : area / float(ATLAS_WIDTH * ATLAS_HEIGHT), "pack_seconds" : pack_time, "resize_one_seconds" : pack_time })
+
+            packers = [(name, bad_packer.create_atlas_packer(name, ATLAS_WIDTH, ATLAS_HEIGHT)) for name in bad_packer.BAD_ATLAS_PACKERS]
+            packers.append(("PAGED", bad_packer.BAD_AtlasPages(bad_globals.BAD_SPRITE_ATLAS_PACKER, ATLAS_WIDTH, ATLAS_HEIGHT, bad_globals.BAD_MAX_SPRITE_ATLAS_PAGES)))
+
+            for name, packer in packers:
+
+                start = time.perf_counter()
+                packer.update(sizes)
+                pack_time = time.perf_counter() - start
+
+                # resize one placed cell, the old loop repacked everything for that
+                key = next(iter(packer.m_rects))
+                resized = dict(sizes)
+                resized[key] = (max(8, sizes[key][0] // 2), sizes[key][1])
+                start = time.perf_counter()
+                packer.update(resized)
+                resize_time = time.perf_counter() - start
+
+                packer.update(sizes)
+                results.append({ "scene" : kind, "cells" : count, "packer" : name, "placed" : len(packer.m_rects),
+                                 "occupancy" : packer.occupancy(), "pack_seconds" : pack_time, "resize_one_seconds" : resize_time })
+
+            for result in results[-1 - len(packers):]:
+                print(f"{result['scene']:>10} {result['cells']:>6} {result['packer']:>9} {result['placed']:>7} {result['occupancy'] * 100.0:>9.1f}% "
+                      f"{result['pack_seconds'] * 1000.0:>10.2f} {result['resize_one_seconds'] * 1000.0:>16.2f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
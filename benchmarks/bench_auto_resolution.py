@@ -0,0 +1,111 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Fixed against screen space (m_is_auto_resolution) cell sizes while the camera of a 3d view dollies towards a
+# grid of objects, with the bpy and gpu stand-ins of bench_stand_ins. For every mode:
+#   texels       atlas texels allocated to cells, averaged over the frames
+#   undersized   fraction of the visible objects whose cell has fewer texels than the object has pixels on screen
+#   rebuilds     cell layout rebuilds over the dolly. Fixed cells are freed as soon as their objects leave the view, auto
+#                resolution cells are resized or freed once BAD_AUTO_RESOLUTION_HYSTERESIS_FRAMES frames passed outside of
+#                their hysteresis band, together with every other pending change
+#   lod (ms)     average time of the Auto Resolution stage
+#   cells (ms)   average time of the Cell Table stage, repacking included
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_auto_resolution.py [--objects 1000] [--frames 60] [--resolution 64] [--json results.json]
+
+import numpy as np
+
+import bench_stand_ins
+
+bench_stand_ins.install()
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_frustum_culling import perspective_matrix
+from bench_pipeline import option_values
+
+bad_geometry = load_addon_module("bad_geometry")
+bad_pipeline = load_addon_module("bad_pipeline")
+
+WIDTH = 1920
+HEIGHT = 1080
+
+def camera_matrix(frame : int, frames : int, extent : float) -> np.ndarray:
+    distance = extent * (3.0 - 2.9 * frame / max(frames - 1, 1))
+    return perspective_matrix(50.0, WIDTH / HEIGHT, 0.1, 1000.0, np.array((0.0, -distance, 0.5 * distance)), np.array((0.0, 0.0, 0.0)))
+
+def benchmark_mode(is_auto_resolution : bool, object_count : int, frames : int, resolution : int) -> dict:
+    extent = np.sqrt(object_count) * 4.0
+    context = bench_stand_ins.create_scene(object_count, 50, (resolution, resolution), viewport_dimensions = (WIDTH, HEIGHT),
+                                           vp = camera_matrix(0, frames, extent))
+    objects = bench_stand_ins.install().data.objects
+    for obj in objects:
+        obj.bad_settings.m_is_auto_resolution = is_auto_resolution
+
+    region = context.screen.areas[0].regions[0]
+
+    pipeline = bad_pipeline.BAD_Pipeline()
+    pipeline.m_mesh_preparer.m_worker_count = 0
+    pipeline.initialize()
+    pipeline.render(context)
+
+    rebuilds = pipeline.m_cell_layout_rebuild_count
+    texels = []
+    undersized = []
+
+    for frame in range(frames):
+        vp = camera_matrix(frame, frames, extent)
+        region.data.perspective_matrix = vp
+        region.data.window_matrix = vp
+        pipeline.render(context)
+
+        rects = pipeline.m_atlas_packer.m_rects
+        texels.append(sum(rect[2] * rect[3] for rect in rects.values()))
+
+        # the cells of the visible objects against their size on screen
+        object_ids, extents = pipeline.m_views[region.as_pointer()].m_screen_extents
+        cells = np.array([rects[object_id][2:4] if object_id in rects else (0, 0) for object_id in object_ids.tolist()]).reshape(-1, 2)
+        undersized.append(float(np.mean(np.prod(cells, axis = 1) < np.prod(np.minimum(extents, 512.0), axis = 1))) if len(cells) > 0 else 0.0)
+
+    statistics = pipeline.m_profiler.statistics()
+    lod_seconds = statistics["Auto Resolution"][0] / 1000.0 if "Auto Resolution" in statistics else 0.0
+    cell_table_seconds = statistics["Cell Table"][0] / 1000.0 if "Cell Table" in statistics else 0.0
+
+    return { "auto_resolution" : is_auto_resolution, "texels" : float(np.mean(texels)), "undersized" : float(np.mean(undersized)),
+             "rebuilds" : pipeline.m_cell_layout_rebuild_count - rebuilds, "lod_seconds" : lod_seconds, "cell_table_seconds" : cell_table_seconds,
+             "pages" : pipeline.m_atlas_packer.page_count() }
+
+def main(argv):
+    object_count = option_values(argv, "--objects", [1000])[0]
+    frames = option_values(argv, "--frames", [60])[0]
+    resolution = option_values(argv, "--resolution", [64])[0]
+
+    results = []
+
+    print(f"{'mode':>6} {'texels (M)':>11} {'undersized':>11} {'rebuilds':>9} {'lod (ms)':>9} {'cells (ms)':>11} {'pages':>6}")
+
+    for is_auto_resolution in (False, True):
+        result = benchmark_mode(is_auto_resolution, object_count, frames, resolution)
+        results.append(result)
+
+        print(f"{'auto' if is_auto_resolution else 'fixed':>6} {result['texels'] / 1e6:>11.2f} {result['undersized'] * 100.0:>10.1f}% "
+              f"{result['rebuilds']:>9} {result['lod_seconds'] * 1000.0:>9.3f} {result['cell_table_seconds'] * 1000.0:>11.2f} {result['pages']:>6}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], { "objects" : object_count, "frames" : frames, "resolution" : resolution, "results" : results })
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,94 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Cost of building the object id -> cell table as the object count grows, the per cell python lists
+# of the old uniform block against the numpy table that backs the cell viewports texture.
+# The gpu upload itself is measured in the pipeline (m_cell_viewports_upload_seconds, shown in the panel).
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_cell_table.py [--json results.json]
+
+import time
+
+import numpy as np
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+bad_globals = load_addon_module("bad_globals")
+
+CELLS_PER_ROW = bad_globals.BAD_CELL_VIEWPORTS_PER_ROW
+
+def create_rects(count : int) -> dict:
+    # the cells do not have to fit one atlas here, only the table layout matters
+    return { object_id : (float(object_id % 64) * 32.0, float(object_id // 64 % 64) * 32.0, 32.0, 32.0, float(object_id // 4096))
+             for object_id in range(1, count + 1) }
+
+# the fill as update_uniform_buffer_cell_viewports did it, sized to the object count
+def legacy_table(rects : dict, count : int) -> list:
+    cell_viewports = [[0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0] for i in range(count + 1)]
+
+    for object_id, (x, y, width, height, page) in rects.items():
+        cell_viewports[object_id] = [float(x), float(y), float(width), float(height), float(page), 0.0, 0.0, 0.0]
+
+    return cell_viewports
+
+def texture_table(rects : dict, count : int) -> np.ndarray:
+    capacity = CELLS_PER_ROW
+    while capacity < count + 1:
+        capacity *= 2
+
+    cell_viewports = np.zeros((capacity, 2, 4), dtype = np.float32)
+
+    object_ids = np.fromiter(rects.keys(), dtype = np.int64, count = len(rects))
+    values = np.array(list(rects.values()), dtype = np.float32)
+    cell_viewports[object_ids, 0, :] = values[:, :4]
+    cell_viewports[object_ids, 1, 0] = values[:, 4]
+
+    return cell_viewports
+
+def time_function(function, rects : dict, count : int, repeats : int = 5) -> float:
+    best = float("inf")
+    for i in range(repeats):
+        start = time.perf_counter()
+        function(rects, count)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv):
+    results = []
+
+    print(f"{'cells':>7} {'legacy (ms)':>12} {'texture (ms)':>13} {'texture rows':>13} {'texture (KiB)':>14}")
+
+    for count in (100, 1000, 2000, 5000, 10000, 20000, 50000):
+        rects = create_rects(count)
+
+        table = texture_table(rects, count)
+        legacy = legacy_table(rects, count)
+        assert np.array_equal(table[:count + 1].reshape(-1, 8), np.array(legacy, dtype = np.float32))
+
+        legacy_time = time_function(legacy_table, rects, count)
+        texture_time = time_function(texture_table, rects, count)
+
+        results.append({ "cells" : count, "legacy_seconds" : legacy_time, "texture_seconds" : texture_time,
+                         "texture_rows" : len(table) // CELLS_PER_ROW, "texture_bytes" : table.nbytes })
+
+        print(f"{count:>7} {legacy_time * 1000.0:>12.2f} {texture_time * 1000.0:>13.2f} {len(table) // CELLS_PER_ROW:>13} {table.nbytes / 1024.0:>14.1f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
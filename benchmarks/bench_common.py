@@ -0,0 +1,44 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import importlib
+import json
+import os
+import sys
+import types
+
+ADDON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blender_add_on")
+
+# imports blender_add_on.<name> without running the package __init__ (which needs bpy),
+# only works for modules that do not import bpy or gpu themselves, unless bench_stand_ins.install() ran first
+def load_addon_module(name : str):
+    if not "blender_add_on" in sys.modules:
+        package = types.ModuleType("blender_add_on")
+        package.__path__ = [ADDON_PATH]
+        sys.modules["blender_add_on"] = package
+
+    return importlib.import_module("blender_add_on." + name)
+
+# arguments after "--" when run through blender, all of them otherwise
+def script_arguments() -> list:
+    if "--" in sys.argv:
+        return sys.argv[sys.argv.index("--") + 1:]
+    return sys.argv[1:]
+
+def write_json(path : str, results):
+    with open(path, "w") as file:
+        json.dump(results, file, indent = 2)
@@ -0,0 +1,68 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Cost of the numpy cpu backend (BAD_COMPUTE_BACKEND = "CPU") for the sprite atlas and combined render passes of both
+# kernels, best of 3 renders. The backend runs in the main process, a process pool splitting the scatter into row tiles
+# was slower than a single process at every size since the merge and combined passes stay serial and every tile has to
+# send the atlas inputs to its worker.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_cpu_backend.py [--json results.json]
+
+import time
+
+import numpy as np
+
+from bench_common import script_arguments, write_json
+from bench_atlas_kernels import create_frame, create_cell_table, bad_globals, bad_packer, bad_cpu_backend, ATLAS_WIDTH, ATLAS_HEIGHT
+
+def time_render(backend, repeats : int, *arguments) -> float:
+    best = float("inf")
+    for i in range(repeats):
+        start = time.perf_counter()
+        backend.render(*arguments)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv):
+    rng = np.random.default_rng(0)
+    results = []
+
+    print(f"{'viewport':>10} {'objects':>8} {'atomic (ms)':>12} {'gather (ms)':>12}")
+
+    for width, height in ((1280, 720), (1920, 1080)):
+        object_count = 50
+        object_ids, colors = create_frame(width, height, object_count, rng)
+
+        packer = bad_packer.BAD_AtlasPages(bad_globals.BAD_SPRITE_ATLAS_PACKER, ATLAS_WIDTH, ATLAS_HEIGHT, bad_globals.BAD_MAX_SPRITE_ATLAS_PAGES)
+        packer.update({ object_id : (128, 128) for object_id in range(1, object_count + 1) })
+        pages = packer.page_count()
+        cell_owners = bad_cpu_backend.build_cell_owners(packer.m_rects, ATLAS_WIDTH, ATLAS_HEIGHT, pages)
+        arguments = (object_ids, colors, create_cell_table(packer, width, height), ATLAS_WIDTH, ATLAS_HEIGHT, pages)
+
+        backend = bad_cpu_backend.BAD_CpuBackend()
+        times = { kernel : time_render(backend, 3, *arguments, kernel, False, cell_owners) for kernel in ("ATOMIC", "GATHER") }
+
+        results.append({ "viewport" : [width, height], "objects" : object_count,
+                         "atomic_seconds" : times["ATOMIC"], "gather_seconds" : times["GATHER"] })
+
+        print(f"{f'{width}x{height}':>10} {object_count:>8} {times['ATOMIC'] * 1000.0:>12.1f} {times['GATHER'] * 1000.0:>12.1f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,88 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Cost of the frustum culling in BAD_Pipeline.cull_mesh_instances: the aabb refresh after a scene change
+# and the per frame frustum test, for instances scattered over a large set with a camera looking at a corner.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_frustum_culling.py [--json results.json]
+
+import time
+from math import tan, radians
+
+import numpy as np
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+bad_geometry = load_addon_module("bad_geometry")
+
+def perspective_matrix(fov : float, aspect : float, near : float, far : float, eye : np.ndarray, target : np.ndarray) -> np.ndarray:
+    forward = (target - eye) / np.linalg.norm(target - eye)
+    right = np.cross(forward, (0.0, 0.0, 1.0))
+    right /= np.linalg.norm(right)
+    up = np.cross(right, forward)
+
+    view = np.eye(4)
+    view[0, :3], view[1, :3], view[2, :3] = right, up, -forward
+    view[:3, 3] = -view[:3, :3] @ eye
+
+    f = 1.0 / tan(radians(fov) / 2.0)
+    projection = np.zeros((4, 4))
+    projection[0, 0] = f / aspect
+    projection[1, 1] = f
+    projection[2, 2] = (far + near) / (near - far)
+    projection[2, 3] = 2.0 * far * near / (near - far)
+    projection[3, 2] = -1.0
+
+    return (projection @ view).astype(np.float32)
+
+def time_function(function, repeats : int = 5) -> float:
+    best = float("inf")
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv):
+    rng = np.random.default_rng(0)
+    results = []
+
+    vp = perspective_matrix(50.0, 16.0 / 9.0, 0.1, 1000.0, np.array((-500.0, -500.0, 20.0)), np.array((-400.0, -400.0, 0.0)))
+    planes = bad_geometry.frustum_planes(vp)
+
+    print(f"{'instances':>10} {'visible':>8} {'aabb refresh (ms)':>18} {'frustum test (ms)':>18}")
+
+    for count in (1000, 10000, 100000):
+        local_bounds = np.broadcast_to(np.array(((-1.0, -1.0, 0.0), (1.0, 1.0, 2.0)), dtype = np.float32), (count, 2, 3))
+        matrices = np.tile(np.eye(4, dtype = np.float32), (count, 1, 1))
+        matrices[:, :2, 3] = rng.uniform(-500.0, 500.0, (count, 2))
+
+        bounds = bad_geometry.transform_bounds(local_bounds, matrices)
+        visible = int(np.count_nonzero(bad_geometry.cull_bounds(bounds, planes)))
+
+        refresh_time = time_function(lambda: bad_geometry.transform_bounds(local_bounds, matrices))
+        test_time = time_function(lambda: bad_geometry.cull_bounds(bounds, planes))
+
+        results.append({ "instances" : count, "visible" : visible, "refresh_seconds" : refresh_time, "test_seconds" : test_time })
+
+        print(f"{count:>10} {visible:>8} {refresh_time * 1000.0:>18.3f} {test_time * 1000.0:>18.3f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,115 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Compares the synchronous BAD_Pipeline.initialize, which blocks the ui until every mesh is built, with the time
+# sliced initialization run by the timer of the add-on: the longest and p95 tick, the number of ticks, and how long
+# it takes until the pipeline renders and until every mesh inside the view frustum is built. The camera looks at
+# a corner of the scene so only part of the meshes are in view. Uses the bpy and gpu stand-ins of bench_stand_ins.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_initialization.py [--objects 1000 10000] [--triangles 2000] [--budget-ms 8] [--json results.json]
+
+import time
+
+import numpy as np
+
+import bench_stand_ins
+
+bench_stand_ins.install()
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_frustum_culling import perspective_matrix
+from bench_pipeline import option_values
+
+bad_geometry = load_addon_module("bad_geometry")
+bad_pipeline = load_addon_module("bad_pipeline")
+
+def create_scene(object_count : int, triangle_count : int):
+    extent = np.sqrt(object_count) * 4.0
+    vp = perspective_matrix(50.0, 16.0 / 9.0, 0.1, 1000.0, np.array((-0.5 * extent, -0.5 * extent, 5.0)), np.array((-extent, -extent, 0.0)))
+    context = bench_stand_ins.create_scene(object_count, triangle_count, vp = vp)
+
+    objects = bench_stand_ins.install().data.objects
+    local_bounds = np.broadcast_to(np.array(((-1.0, -1.0, 0.0), (1.0, 1.0, 0.0)), dtype = np.float32), (len(objects), 2, 3))
+    matrices = np.array([obj.matrix_world for obj in objects], dtype = np.float32)
+    is_in_view = bad_geometry.cull_bounds(bad_geometry.transform_bounds(local_bounds, matrices), bad_geometry.frustum_planes(vp))
+    in_view_meshes = { obj.data.as_pointer() for obj, in_view in zip(objects, is_in_view) if in_view }
+
+    return context, in_view_meshes
+
+def benchmark_synchronous(object_count : int, triangle_count : int) -> float:
+    create_scene(object_count, triangle_count)
+
+    pipeline = bad_pipeline.BAD_Pipeline()
+    pipeline.m_mesh_preparer.m_worker_count = 0
+
+    start = time.perf_counter()
+    pipeline.initialize()
+    return time.perf_counter() - start
+
+def benchmark_time_sliced(object_count : int, triangle_count : int, budget_seconds : float) -> dict:
+    context, in_view_meshes = create_scene(object_count, triangle_count)
+
+    pipeline = bad_pipeline.BAD_Pipeline()
+    pipeline.m_mesh_preparer.m_worker_count = 0 # the steps build the meshes, see bench_mesh_preparation for the worker pool
+    pipeline.begin_initialize()
+
+    ticks = []
+    render_ready_seconds = None
+    in_view_seconds = None
+    is_initialized = False
+
+    # tick durations are summed, the idle time between the ticks of the timer is left out
+    while not is_initialized:
+        start = time.perf_counter()
+        is_initialized = pipeline.continue_initialize(budget_seconds)
+        ticks.append(time.perf_counter() - start)
+
+        if render_ready_seconds == None and pipeline.m_is_render_ready:
+            render_ready_seconds = sum(ticks)
+        if in_view_seconds == None and pipeline.m_is_render_ready and len(in_view_meshes & pipeline.m_pending_meshes) == 0 \
+            and in_view_meshes <= pipeline.m_batches.keys():
+            in_view_seconds = sum(ticks)
+
+    return { "in_view_objects" : len(in_view_meshes), "ticks" : len(ticks), "total_seconds" : sum(ticks),
+             "max_tick_seconds" : max(ticks), "p95_tick_seconds" : float(np.percentile(ticks, 95)),
+             "render_ready_seconds" : render_ready_seconds, "in_view_seconds" : in_view_seconds }
+
+def main(argv):
+    object_counts = option_values(argv, "--objects", [1000, 10000])
+    triangle_count = option_values(argv, "--triangles", [2000])[0]
+    budget_seconds = option_values(argv, "--budget-ms", [8])[0] / 1000.0
+
+    results = []
+
+    print(f"{'objects':>8} {'in view':>8} {'blocking (ms)':>14} {'ticks':>6} {'max tick (ms)':>14} {'p95 tick (ms)':>14} "
+          f"{'renders (ms)':>13} {'in view (ms)':>13} {'total (ms)':>11}")
+
+    for object_count in object_counts:
+        synchronous_seconds = benchmark_synchronous(object_count, triangle_count)
+        result = benchmark_time_sliced(object_count, triangle_count, budget_seconds)
+        result.update({ "objects" : object_count, "synchronous_seconds" : synchronous_seconds })
+        results.append(result)
+
+        print(f"{object_count:>8} {result['in_view_objects']:>8} {synchronous_seconds * 1000.0:>14.0f} {result['ticks']:>6} "
+              f"{result['max_tick_seconds'] * 1000.0:>14.2f} {result['p95_tick_seconds'] * 1000.0:>14.2f} "
+              f"{result['render_ready_seconds'] * 1000.0:>13.2f} {result['in_view_seconds'] * 1000.0:>13.0f} {result['total_seconds'] * 1000.0:>11.0f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], { "triangles" : triangle_count, "budget_seconds" : budget_seconds, "results" : results })
+
+if __name__ == "__main__":
+    main(script_arguments())
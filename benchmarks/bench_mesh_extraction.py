@@ -0,0 +1,153 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Compares the per-element mesh extraction loop against the foreach_get path, in object mode and in edit mode where
+# the edit mesh was read per element from the bmesh before it was read through obj.to_mesh().
+# Run from the repository root:
+#   blender --background --factory-startup --python benchmarks/bench_mesh_extraction.py -- 100000 500000 2000000
+
+import os
+import sys
+import time
+from math import ceil, sqrt
+
+import numpy as np
+import bpy
+import bmesh
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from blender_add_on.bad_geometry import extract_vertex_positions, extract_triangle_indices
+
+def create_grid_mesh(triangle_count : int) -> bpy.types.Mesh:
+    # k * k vertices give 2 * (k - 1)^2 triangles
+    k = int(ceil(sqrt(triangle_count / 2.0))) + 1
+
+    xs, ys = np.meshgrid(np.arange(k, dtype = np.float32), np.arange(k, dtype = np.float32))
+    co = np.stack((xs.ravel(), ys.ravel(), np.zeros(k * k, dtype = np.float32)), axis = 1)
+
+    quad = np.arange(k * (k - 1)).reshape(k - 1, k)[:, :-1].ravel()
+    triangles = np.concatenate((np.stack((quad, quad + 1, quad + k + 1), axis = 1),
+                                np.stack((quad, quad + k + 1, quad + k), axis = 1))).astype(np.int32)
+
+    mesh = bpy.data.meshes.new("BAD_bench_mesh")
+    mesh.vertices.add(len(co))
+    mesh.vertices.foreach_set("co", co.ravel())
+    mesh.loops.add(triangles.size)
+    mesh.loops.foreach_set("vertex_index", triangles.ravel())
+    mesh.polygons.add(len(triangles))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, triangles.size, 3, dtype = np.int32))
+    mesh.update()
+    mesh.calc_loop_triangles()
+    return mesh
+
+# the extraction as it was done before bad_geometry
+def legacy_extract(mesh : bpy.types.Mesh):
+    vertices = []
+    for mesh_vertex in mesh.vertices:
+        vertices.append(mesh_vertex.co.to_tuple())
+
+    indices = []
+    for triangle in mesh.loop_triangles:
+        indices.append(triangle.vertices)
+
+    return vertices, indices
+
+def vectorized_extract(mesh : bpy.types.Mesh):
+    return extract_vertex_positions(mesh), extract_triangle_indices(mesh)
+
+# the edit mode extraction as it was done before obj.to_mesh()
+def legacy_edit_extract(obj : bpy.types.Object):
+    bm = bmesh.from_edit_mesh(obj.data)
+    vertices = np.fromiter((value for vertex in bm.verts for value in vertex.co), dtype = np.float32, count = len(bm.verts) * 3)
+
+    bm.verts.index_update()
+    triangles = bm.calc_loop_triangles()
+    indices = np.fromiter((loop.vert.index for triangle in triangles for loop in triangle), dtype = np.uint32, count = len(triangles) * 3)
+
+    return vertices.reshape(-1, 3), indices.reshape(-1, 3)
+
+# the same as BAD_Pipeline.create_edit_mesh_buffers
+def edit_extract(obj : bpy.types.Object):
+    mesh = obj.to_mesh()
+    mesh.calc_loop_triangles()
+    vertices, indices = extract_vertex_positions(mesh), extract_triangle_indices(mesh)
+    obj.to_mesh_clear()
+    return vertices, indices
+
+def time_function(function, mesh : bpy.types.Mesh, repeats : int) -> float:
+    best = float("inf")
+    for i in range(repeats):
+        start = time.perf_counter()
+        function(mesh)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv):
+    triangle_counts = [int(arg) for arg in argv] if len(argv) > 0 else [100000, 500000, 2000000]
+
+    meshes = []
+
+    print(f"{'triangles':>10} {'vertices':>10} {'legacy (s)':>12} {'foreach_get (s)':>16} {'speedup':>8}")
+
+    for triangle_count in triangle_counts:
+        mesh = create_grid_mesh(triangle_count)
+
+        vertices, indices = vectorized_extract(mesh)
+        legacy_vertices, legacy_indices = legacy_extract(mesh)
+        assert np.array_equal(vertices, np.array(legacy_vertices, dtype = np.float32))
+        assert np.array_equal(indices, np.array([tuple(t) for t in legacy_indices], dtype = np.uint32))
+
+        legacy_time = time_function(legacy_extract, mesh, 1)
+        vectorized_time = time_function(vectorized_extract, mesh, 3)
+
+        print(f"{len(mesh.loop_triangles):>10} {len(mesh.vertices):>10} {legacy_time:>12.4f} {vectorized_time:>16.4f} {legacy_time / vectorized_time:>7.1f}x")
+
+        meshes.append(mesh)
+
+    print()
+    print(f"{'edit mode':>10} {'vertices':>10} {'bmesh (s)':>12} {'to_mesh (s)':>16} {'speedup':>8}")
+
+    for mesh in meshes:
+        obj = bpy.data.objects.new("BAD_bench_object", mesh)
+        bpy.context.scene.collection.objects.link(obj)
+        bpy.context.view_layer.objects.active = obj
+        bpy.ops.object.mode_set(mode = "EDIT")
+
+        # an edit that is only in the edit mesh, both paths have to see it
+        bm = bmesh.from_edit_mesh(mesh)
+        bm.verts.ensure_lookup_table()
+        bm.verts[0].co.z = 1.0
+        bmesh.update_edit_mesh(mesh)
+
+        vertices, indices = edit_extract(obj)
+        legacy_vertices, legacy_indices = legacy_edit_extract(obj)
+        assert vertices[0, 2] == 1.0
+        assert np.array_equal(vertices, legacy_vertices)
+        assert np.array_equal(indices, legacy_indices)
+
+        legacy_time = time_function(legacy_edit_extract, obj, 1)
+        vectorized_time = time_function(edit_extract, obj, 3)
+
+        print(f"{len(indices):>10} {len(vertices):>10} {legacy_time:>12.4f} {vectorized_time:>16.4f} {legacy_time / vectorized_time:>7.1f}x")
+
+        bpy.ops.object.mode_set(mode = "OBJECT")
+        bpy.data.objects.remove(obj)
+        bpy.data.meshes.remove(mesh)
+
+if __name__ == "__main__":
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
@@ -0,0 +1,122 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# A heavy asset appearing in the scene: every mesh is new to BAD_Pipeline at once. Compares the mesh part of a
+# frame (update_mesh_uploads and gather_mesh_instances) when the meshes are built inline in the first frame with
+# the worker pool of bad_mesh_preparer, where frames take at most about BAD_MESH_UPLOAD_BUDGET_MS of reading and
+# uploading and the meshes show up over the next frames. Frames are paced at 60 Hz. Also prints the average cache
+# miss ratio (transformed vertices per triangle with a 16 entry fifo cache) of a mesh before and after
+# reorder_for_locality. Uses the bpy and gpu stand-ins of bench_stand_ins, the gpu upload itself costs nothing there.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_mesh_preparation.py [--meshes 20 100] [--triangles 100000] [--workers 2] [--json results.json]
+
+from collections import deque
+import time
+
+import numpy as np
+
+import bench_stand_ins
+
+bench_stand_ins.install()
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_pipeline import option_values, create_pipeline
+
+bad_geometry = load_addon_module("bad_geometry")
+bad_pipeline = load_addon_module("bad_pipeline")
+bad_mesh_preparer = load_addon_module("bad_mesh_preparer")
+
+FRAME_SECONDS = 1.0 / 60.0
+
+def average_cache_miss_ratio(indices : np.ndarray, cache_size : int = 16) -> float:
+    cache = deque()
+    cached = set()
+    misses = 0
+
+    for vertex in indices.ravel().tolist():
+        if not vertex in cached:
+            misses += 1
+            if len(cache) == cache_size:
+                cached.discard(cache.popleft())
+            cache.append(vertex)
+            cached.add(vertex)
+
+    return misses / len(indices)
+
+def run_frames(pipeline, context, mesh_count : int) -> list:
+    frame_times = []
+
+    while True:
+        start = time.perf_counter()
+        pipeline.m_mesh_resources.begin_frame()
+        pipeline.update_mesh_uploads()
+        instance_groups = pipeline.gather_mesh_instances(context)
+        frame_times.append(time.perf_counter() - start)
+
+        if len(instance_groups) == mesh_count:
+            return frame_times
+
+        time.sleep(max(0.0, FRAME_SECONDS - frame_times[-1]))
+
+def benchmark(mesh_count : int, triangle_count : int, worker_count : int) -> dict:
+    context = bench_stand_ins.create_scene(mesh_count, triangle_count)
+
+    pipeline = create_pipeline(context)
+    start = time.perf_counter()
+    inline_times = run_frames(pipeline, context, mesh_count)
+    inline_seconds = time.perf_counter() - start
+
+    pipeline = create_pipeline(context)
+    pipeline.m_mesh_preparer = bad_mesh_preparer.BAD_MeshPreparer(worker_count)
+    start = time.perf_counter()
+    pooled_times = run_frames(pipeline, context, mesh_count)
+    pooled_seconds = time.perf_counter() - start
+    pipeline.m_mesh_preparer.close()
+
+    return { "meshes" : mesh_count, "triangles" : triangle_count, "workers" : worker_count,
+             "inline_max_frame_seconds" : max(inline_times), "inline_seconds" : inline_seconds,
+             "pooled_max_frame_seconds" : max(pooled_times), "pooled_frames" : len(pooled_times), "pooled_seconds" : pooled_seconds,
+             "prepare_seconds" : pipeline.m_mesh_preparer.m_prepare_seconds }
+
+def main(argv):
+    mesh_counts = option_values(argv, "--meshes", [20, 100])
+    triangle_count = option_values(argv, "--triangles", [100000])[0]
+    worker_count = option_values(argv, "--workers", [2])[0]
+
+    vertices, triangles = bench_stand_ins.create_grid(min(triangle_count, 100000))
+    triangles = triangles.astype(np.uint32)[np.random.default_rng(0).permutation(len(triangles))] # exported meshes are rarely in a good order
+    reordered_vertices, reordered_triangles = bad_geometry.reorder_for_locality(vertices, triangles)
+    cache_miss_ratios = (average_cache_miss_ratio(triangles), average_cache_miss_ratio(reordered_triangles))
+    print(f"average cache miss ratio of {len(triangles)} shuffled triangles: {cache_miss_ratios[0]:.3f}, reordered {cache_miss_ratios[1]:.3f}")
+    print()
+
+    results = []
+
+    print(f"{'meshes':>7} {'inline max frame (ms)':>22} {'pooled max frame (ms)':>22} {'pooled frames':>14} {'inline (ms)':>12} {'pooled (ms)':>12}")
+
+    for mesh_count in mesh_counts:
+        result = benchmark(mesh_count, triangle_count, worker_count)
+        results.append(result)
+
+        print(f"{mesh_count:>7} {result['inline_max_frame_seconds'] * 1000.0:>22.1f} {result['pooled_max_frame_seconds'] * 1000.0:>22.1f} "
+              f"{result['pooled_frames']:>14} {result['inline_seconds'] * 1000.0:>12.0f} {result['pooled_seconds'] * 1000.0:>12.0f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], { "cache_miss_ratios" : cache_miss_ratios, "results" : results })
+
+if __name__ == "__main__":
+    main(script_arguments())
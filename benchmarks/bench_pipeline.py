@@ -0,0 +1,163 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Times the cpu side stages of BAD_Pipeline on synthetic scenes with the bpy and gpu stand-ins of bench_stand_ins:
+#   mesh_extraction     first gather_mesh_instances, extracts and uploads every mesh and assigns the object ids
+#   instance_gathering  gather_mesh_instances of a steady frame
+#   culling             cull_mesh_instances with the instance aabbs recomputed
+#   cell_packing        update_cell_viewports_table with an empty packer, packs every cell and fills the cell table
+#   uniform_building    cell table upload and instance data texture of the object id depth pass
+#   draw_submission     draw_object_id_depth, one instanced draw per mesh
+# Every stage reports the best of a few repeats. The json holds the git revision so runs of different
+# versions can be compared.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_pipeline.py [--objects 10 100 1000 10000] [--triangles 200] [--resolution 64]
+#                                       [--shared-meshes 0] [--json results.json]
+
+import os
+import subprocess
+import time
+
+import numpy as np
+
+import bench_stand_ins
+
+bench_stand_ins.install()
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_frustum_culling import perspective_matrix
+
+bad_globals = load_addon_module("bad_globals")
+bad_packer = load_addon_module("bad_packer")
+bad_pipeline = load_addon_module("bad_pipeline")
+
+NEAR = 0.1
+FAR = 1000.0
+
+def option_values(argv : list, name : str, default : list) -> list:
+    if not name in argv:
+        return default
+    values = []
+    for arg in argv[argv.index(name) + 1:]:
+        if arg.startswith("--"):
+            break
+        values.append(int(arg))
+    return values
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd = os.path.dirname(os.path.abspath(__file__)),
+                              capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def time_stage(function, repeats : int, setup = None) -> float:
+    best = float("inf")
+    for i in range(repeats):
+        if setup != None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def create_pipeline(context):
+    pipeline = bad_pipeline.BAD_Pipeline()
+    pipeline.m_mesh_preparer.m_worker_count = 0 # see bench_mesh_preparation for the worker pool
+    # initialize without the mesh buffers, they are built by the first gather
+    for view in pipeline.update_views(context):
+        view.update_render_targets((view.m_region.width, view.m_region.height))
+    pipeline.create_sprite_atlas_textures()
+    pipeline.create_cell_viewports_table()
+    pipeline.create_images()
+    pipeline.create_shaders()
+    return pipeline
+
+def benchmark_scene(object_count : int, triangle_count : int, resolution : int, shared_meshes : int, repeats : int) -> dict:
+    width, height = 1920, 1080
+    extent = np.sqrt(object_count) * 4.0
+    vp = perspective_matrix(50.0, width / height, NEAR, FAR, np.array((0.0, -2.0 * extent, extent)), np.array((0.0, 0.0, 0.0)))
+
+    context = bench_stand_ins.create_scene(object_count, triangle_count, (resolution, resolution), shared_meshes if shared_meshes > 0 else None,
+                                           (width, height), vp = vp)
+
+    stages = {}
+
+    # a new pipeline for every repeat so every mesh is new
+    pipelines = []
+    stages["mesh_extraction"] = time_stage(lambda: pipelines[-1].gather_mesh_instances(context), repeats,
+                                           setup = lambda: pipelines.append(create_pipeline(context)))
+    pipeline = pipelines[-1]
+    view = pipeline.update_views(context)[0]
+
+    instance_groups = pipeline.gather_mesh_instances(context)
+    stages["instance_gathering"] = time_stage(lambda: pipeline.gather_mesh_instances(context), repeats)
+
+    def invalidate_bounds():
+        pipeline.m_scene_version += 1
+    stages["culling"] = time_stage(lambda: pipeline.cull_mesh_instances(context, instance_groups, view), repeats, setup = invalidate_bounds)
+    visible_groups = pipeline.cull_mesh_instances(context, instance_groups, view)
+
+    def reset_layout():
+        pipeline.m_atlas_packer = bad_packer.BAD_AtlasPages(bad_globals.BAD_SPRITE_ATLAS_PACKER, pipeline.m_texture_atlas_dimensions[0],
+                                                            pipeline.m_texture_atlas_dimensions[1], bad_globals.BAD_MAX_SPRITE_ATLAS_PAGES)
+        pipeline.m_is_cell_layout_dirty = True
+    stages["cell_packing"] = time_stage(pipeline.update_cell_viewports_table, repeats, setup = reset_layout)
+
+    def build_uniforms():
+        pipeline.upload_cell_viewports_table(view)
+        pipeline.create_instance_data_texture(visible_groups)
+    stages["uniform_building"] = time_stage(build_uniforms, repeats)
+
+    bench_stand_ins.Counters.reset()
+    stages["draw_submission"] = time_stage(lambda: pipeline.draw_object_id_depth(view, visible_groups, vp, NEAR, FAR), repeats,
+                                           setup = bench_stand_ins.Counters.reset)
+
+    return { "objects" : object_count,
+             "meshes" : len(pipeline.m_batches),
+             "triangles_per_mesh" : len(next(iter(pipeline.m_index_buffers_data.values()))),
+             "resolution" : resolution,
+             "visible_instances" : sum(len(object_ids) for matrices, object_ids in visible_groups.values()),
+             "atlas_pages" : pipeline.m_atlas_packer.page_count(),
+             "draw_calls" : bench_stand_ins.Counters.draw_calls,
+             "stage_seconds" : stages }
+
+def main(argv):
+    object_counts = option_values(argv, "--objects", [10, 100, 1000, 10000])
+    triangle_count = option_values(argv, "--triangles", [200])[0]
+    resolution = option_values(argv, "--resolution", [64])[0]
+    shared_meshes = option_values(argv, "--shared-meshes", [0])[0]
+
+    stage_names = ("mesh_extraction", "instance_gathering", "culling", "cell_packing", "uniform_building", "draw_submission")
+    results = []
+
+    print(f"{'objects':>8} {'visible':>8} {'draws':>6} " + " ".join(f"{name + ' (ms)':>23}" for name in stage_names))
+
+    for object_count in object_counts:
+        result = benchmark_scene(object_count, triangle_count, resolution, shared_meshes, 3)
+        results.append(result)
+
+        print(f"{object_count:>8} {result['visible_instances']:>8} {result['draw_calls']:>6} " +
+              " ".join(f"{result['stage_seconds'][name] * 1000.0:>23.2f}" for name in stage_names))
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], { "revision" : git_revision(), "time" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                                     "triangles" : triangle_count, "resolution" : resolution,
+                                                     "shared_meshes" : shared_meshes, "results" : results })
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,82 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Cost of the software object id depth pass (BAD_OBJECT_ID_DEPTH_BACKEND = "CPU") at 1920x1080 for scenes of
+# uv sphere instances scattered in front of the camera, from 10k to about 1M triangles.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_rasterizer.py [--json results.json]
+
+import time
+
+import numpy as np
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_frustum_culling import perspective_matrix
+
+bad_rasterizer = load_addon_module("bad_rasterizer")
+
+WIDTH = 1920
+HEIGHT = 1080
+NEAR = 0.1
+FAR = 1000.0
+
+def create_uv_sphere(segments : int):
+    theta, phi = np.meshgrid(np.linspace(0.0, np.pi, segments + 1), np.linspace(0.0, 2.0 * np.pi, 2 * segments + 1), indexing = "ij")
+    vertices = np.stack((np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)), axis = -1).reshape(-1, 3).astype(np.float32)
+
+    columns = 2 * segments + 1
+    corners = (np.arange(segments)[:, None] * columns + np.arange(2 * segments)[None, :]).ravel()
+    indices = np.concatenate((np.stack((corners, corners + columns, corners + 1), axis = 1),
+                              np.stack((corners + 1, corners + columns, corners + columns + 1), axis = 1))).astype(np.uint32)
+
+    return vertices, indices
+
+def main(argv):
+    rng = np.random.default_rng(0)
+    results = []
+
+    vertices, indices = create_uv_sphere(22)
+    vp = perspective_matrix(50.0, WIDTH / HEIGHT, NEAR, FAR, np.array((0.0, -60.0, 40.0)), np.array((0.0, 0.0, 0.0)))
+
+    rasterizer = bad_rasterizer.BAD_Rasterizer(WIDTH, HEIGHT)
+
+    print(f"{'instances':>10} {'triangles':>10} {'coverage':>9} {'time (ms)':>10} {'Mtris/s':>8}")
+
+    for instance_count in (5, 50, 500):
+        matrices = np.tile(np.eye(4, dtype = np.float32), (instance_count, 1, 1))
+        matrices[:, :3, 3] = rng.uniform((-30.0, -30.0, -2.0), (30.0, 30.0, 2.0), (instance_count, 3))
+        object_ids = np.arange(1, instance_count + 1, dtype = np.float32)
+
+        best = float("inf")
+        for i in range(3):
+            rasterizer.clear()
+            start = time.perf_counter()
+            rasterizer.draw(vertices, indices, matrices, object_ids, vp, NEAR, FAR)
+            best = min(best, time.perf_counter() - start)
+
+        triangles = instance_count * len(indices)
+        coverage = float(np.count_nonzero(rasterizer.m_object_ids) / rasterizer.m_object_ids.size)
+
+        results.append({ "instances" : instance_count, "triangles" : triangles, "coverage" : coverage, "seconds" : best })
+
+        print(f"{instance_count:>10} {triangles:>10} {coverage * 100.0:>8.1f}% {best * 1000.0:>10.1f} {triangles / best / 1e6:>8.2f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,90 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Render target allocations of BAD_RenderTargetPool for typical viewport resizes, the exact policy (granularity 1,
+# full coverage, no pool) is how the pipeline allocated before the pool: new targets for every new viewport size.
+#   drag     the 3d view border dragged 1 pixel per frame from 1200 to 1500 pixels wide and back
+#   toggle   the side panel toggled 20 times, the view switches between 1500 and 1200 pixels wide
+#   split    both dimensions shrink 1 pixel per frame from 1600x900 to 800x450
+# Bytes count the pipeline's set of targets: two R32F attachments, a 24 bit depth attachment, the combined render and
+# the RGBA8 offscreen with its depth buffer, 24 bytes per pixel. Coverage is the viewport share of the target pixels.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_render_targets.py [--json results.json]
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+bad_globals = load_addon_module("bad_globals")
+bad_render_targets = load_addon_module("bad_render_targets")
+
+BYTES_PER_PIXEL = 24
+
+def scenario_sizes(name : str) -> list:
+    if name == "drag":
+        widths = list(range(1200, 1501)) + list(range(1500, 1199, -1))
+        return [(width, 800) for width in widths]
+    if name == "toggle":
+        return [(1500 if i % 2 == 0 else 1200, 800) for i in range(41)]
+    return [(1600 - i * 2, 900 - ((i * 9) // 8)) for i in range(401)]
+
+def run(sizes : list, granularity : int, min_coverage : float, max_sets : int) -> dict:
+    allocated = { "bytes" : 0, "resident" : 0, "peak" : 0 }
+
+    def create(width : int, height : int):
+        allocated["bytes"] += width * height * BYTES_PER_PIXEL
+        allocated["resident"] += width * height * BYTES_PER_PIXEL
+        allocated["peak"] = max(allocated["peak"], allocated["resident"])
+        return (width, height)
+
+    def release(targets):
+        allocated["resident"] -= targets[0] * targets[1] * BYTES_PER_PIXEL
+
+    pool = bad_render_targets.BAD_RenderTargetPool(create, release, granularity, min_coverage, max_sets)
+    coverage = 0.0
+    previous_size = None
+
+    for width, height in sizes:
+        if (width, height) != previous_size: # the pipeline only acquires when the viewport changed
+            targets, size = pool.acquire(width, height)
+            previous_size = (width, height)
+        coverage += width * height / (size[0] * size[1])
+
+    return { "allocations" : pool.m_allocation_count, "reuses" : pool.m_reuse_count, "allocated_bytes" : allocated["bytes"],
+             "peak_bytes" : allocated["peak"], "coverage" : coverage / len(sizes) }
+
+def main(argv):
+    policies = { "exact" : (1, 1.0, 1),
+                 "pooled" : (bad_globals.BAD_RENDER_TARGET_GRANULARITY, bad_globals.BAD_RENDER_TARGET_MIN_COVERAGE, bad_globals.BAD_RENDER_TARGET_POOL_SIZE) }
+    results = []
+
+    print(f"{'scenario':>9} {'policy':>7} {'resizes':>8} {'allocations':>12} {'allocated (MB)':>15} {'peak (MB)':>10} {'coverage':>9}")
+
+    for scenario in ("drag", "toggle", "split"):
+        sizes = scenario_sizes(scenario)
+
+        for policy, (granularity, min_coverage, max_sets) in policies.items():
+            result = run(sizes, granularity, min_coverage, max_sets)
+            result.update({ "scenario" : scenario, "policy" : policy, "resizes" : len(sizes) })
+            results.append(result)
+
+            print(f"{scenario:>9} {policy:>7} {len(sizes):>8} {result['allocations']:>12} {result['allocated_bytes'] / 2**20:>15.0f} "
+                  f"{result['peak_bytes'] / 2**20:>10.0f} {result['coverage']:>9.2f}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,83 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Cold and warm startup of BAD_Pipeline with the lazy shader cache of bad_shader_cache, with the bpy and gpu
+# stand-ins of bench_stand_ins and a fixed time per compiled program standing in for the driver compile.
+#   cold    empty BAD_SHADER_CACHE, initialize and first use of every program
+#   reload  add-on modules reloaded like reloadscript.reload does, then the same as cold
+#   warm    a second pipeline in the same session
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_shader_cache.py [--compile-ms 40] [--json results.json]
+
+import importlib
+import time
+
+import bench_stand_ins
+
+bench_stand_ins.install()
+
+from bench_common import load_addon_module, script_arguments, write_json
+
+def startup(bad_pipeline, context) -> dict:
+    start = time.perf_counter()
+
+    pipeline = bad_pipeline.BAD_Pipeline()
+    pipeline.create_shaders()
+    describe_seconds = time.perf_counter() - start
+
+    # first frame: every program is used once
+    for name in pipeline.m_shaders.m_descriptions:
+        pipeline.m_shaders.get(name)
+
+    return { "seconds" : time.perf_counter() - start, "describe_seconds" : describe_seconds,
+             "compiled" : pipeline.m_shaders.m_compiled_count, "cached" : pipeline.m_shaders.m_cached_count,
+             "compile_seconds" : pipeline.m_shaders.m_compile_seconds }
+
+def main(argv):
+    compile_seconds = float(argv[argv.index("--compile-ms") + 1]) / 1000.0 if "--compile-ms" in argv else 0.04
+
+    def create_from_info(create_info):
+        time.sleep(compile_seconds)
+        return bench_stand_ins.StandIn()
+
+    gpu = bench_stand_ins.sys.modules["gpu"]
+    gpu.shader.create_from_info = create_from_info
+
+    context = bench_stand_ins.create_scene(0, 2)
+    bad_shader_cache = load_addon_module("bad_shader_cache")
+    bad_pipeline = load_addon_module("bad_pipeline")
+
+    bad_shader_cache.BAD_SHADER_CACHE.clear()
+    results = { "compile_seconds_per_program" : compile_seconds }
+    results["cold"] = startup(bad_pipeline, context)
+
+    importlib.reload(bad_shader_cache)
+    importlib.reload(bad_pipeline)
+    results["reload"] = startup(bad_pipeline, context)
+
+    results["warm"] = startup(bad_pipeline, context)
+
+    print(f"{'startup':>8} {'total (ms)':>11} {'describe (ms)':>14} {'compiled':>9} {'cached':>7}")
+    for name in ("cold", "reload", "warm"):
+        result = results[name]
+        print(f"{name:>8} {result['seconds'] * 1000.0:>11.2f} {result['describe_seconds'] * 1000.0:>14.3f} {result['compiled']:>9} {result['cached']:>7}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
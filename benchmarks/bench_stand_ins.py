@@ -0,0 +1,336 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Lightweight stand-ins for the parts of bpy and gpu that BAD_Pipeline touches, so its cpu side stages can be
+# timed under plain python. Nothing is drawn: gpu objects only keep what the pipeline reads back (sizes, arrays)
+# and count draw calls and dispatches, every other gpu call is accepted and ignored by StandIn.
+# install() must run before the add-on modules are loaded, create_scene() builds a synthetic scene in bpy.data.
+
+import sys
+import types
+from itertools import count
+
+import numpy as np
+
+# accepts any call, attribute or with block, for shader create infos, programs, framebuffers and the like
+class StandIn:
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name : str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return StandIn()
+
+    def __call__(self, *args, **kwargs):
+        return StandIn()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+class Counters:
+    draw_calls = 0
+    instances = 0
+    dispatches = 0
+
+    @staticmethod
+    def reset():
+        Counters.draw_calls = 0
+        Counters.instances = 0
+        Counters.dispatches = 0
+
+class Buffer:
+
+    def __init__(self, format : str, size, data = None):
+        self.data = np.asarray(data) if data is not None else np.zeros(size, dtype = np.float32)
+
+class GPUTexture:
+
+    def __init__(self, size, layers : int = 0, is_cubemap : bool = False, format : str = "RGBA8", data : Buffer = None):
+        self.width, self.height = size
+        self.layers = layers
+        self.format = format
+        self.data = data
+
+    def clear(self, format : str = "FLOAT", value = (0.0, 0.0, 0.0, 1.0)):
+        pass
+
+    def read(self):
+        channels = 1 if self.format in ("R32F", "R32UI") else 4
+        dtype = np.uint8 if self.format == "RGBA8" else np.float32
+        return np.zeros((max(self.layers, 1), self.height, self.width, channels), dtype = dtype)
+
+class GPUVertFormat(StandIn):
+    pass
+
+class GPUVertBuf:
+
+    def __init__(self, format, len : int):
+        self.len = len
+
+    def attr_fill(self, id : str, data):
+        pass
+
+class GPUIndexBuf:
+
+    def __init__(self, type : str, seq):
+        self.seq = seq
+
+class GPUBatch:
+
+    def __init__(self, type : str, buf : GPUVertBuf, elem : GPUIndexBuf = None):
+        self.buf = buf
+        self.elem = elem
+
+    def draw(self, program = None):
+        Counters.draw_calls += 1
+        Counters.instances += 1
+
+    def draw_instanced(self, program, instance_start : int = 0, instance_count : int = 0):
+        Counters.draw_calls += 1
+        Counters.instances += instance_count
+
+class GPUOffScreen(StandIn):
+
+    def __init__(self, width : int, height : int, format : str = "RGBA8"):
+        self.texture_color = GPUTexture((width, height), format = format)
+
+    def free(self):
+        pass
+
+def dispatch(program, groups_x_len : int, groups_y_len : int, groups_z_len : int):
+    Counters.dispatches += 1
+
+class Mesh:
+    pass
+
+class Object:
+    pass
+
+class Context:
+    pass
+
+class SpaceView3D:
+    pass
+
+class Area:
+    pass
+
+class Region:
+
+    m_pointers = count(1)
+
+    # a WINDOW region of a 3d view, data is its RegionView3D
+    def __init__(self, width : int, height : int, vp : np.ndarray):
+        self.type = "WINDOW"
+        self.width = width
+        self.height = height
+        self.data = types.SimpleNamespace(perspective_matrix = vp, view_matrix = np.eye(4, dtype = np.float32), window_matrix = vp)
+        self.m_pointer = next(Region.m_pointers)
+
+    def as_pointer(self) -> int:
+        return self.m_pointer
+
+class Window:
+    pass
+
+class Scene:
+    pass
+
+class ForeachCollection:
+
+    def __init__(self, attribute : str, values : np.ndarray):
+        self.attribute = attribute
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def foreach_get(self, attribute : str, out):
+        assert attribute == self.attribute
+        out[:] = self.values.ravel()
+
+class StandInMesh(Mesh):
+
+    m_pointers = count(1)
+
+    def __init__(self, name : str, vertices : np.ndarray, triangles : np.ndarray):
+        self.name = name
+        self.vertices = ForeachCollection("co", vertices)
+        self.loop_triangles = ForeachCollection("vertices", triangles.astype(np.int32))
+        self.m_pointer = next(StandInMesh.m_pointers)
+        self.session_uid = self.m_pointer
+
+    def as_pointer(self) -> int:
+        return self.m_pointer
+
+    def calc_loop_triangles(self):
+        pass
+
+class StandInObject(Object):
+
+    m_session_uids = count(1)
+
+    def __init__(self, name : str, mesh : StandInMesh, matrix_world : np.ndarray, resolution : tuple):
+        self.name = name
+        self.type = "MESH"
+        self.data = mesh
+        self.mode = "OBJECT"
+        self.matrix_world = matrix_world
+        self.original = self
+        self.session_uid = next(StandInObject.m_session_uids)
+        # the 8 corners of the object space bounding box of the mesh
+        bounds = np.stack((mesh.vertices.values.min(axis = 0), mesh.vertices.values.max(axis = 0)))
+        self.bound_box = [(bounds[i & 1, 0], bounds[(i >> 1) & 1, 1], bounds[(i >> 2) & 1, 2]) for i in range(8)]
+        self.bad_settings = types.SimpleNamespace(m_id = 0, m_is_enabled = True, m_is_resolution_dirty = False,
+                                                  m_render_resolution_width = resolution[0], m_render_resolution_height = resolution[1],
+                                                  m_is_auto_resolution = False, m_auto_resolution_min_power = 3, m_auto_resolution_max_power = 9)
+
+    def visible_get(self) -> bool:
+        return True
+
+class ObjectInstance:
+
+    def __init__(self, obj : StandInObject):
+        self.object = obj
+        self.is_instance = False
+        self.show_self = True
+        self.parent = None
+        self.matrix_world = obj.matrix_world
+
+class Depsgraph:
+
+    def __init__(self, data):
+        self.m_data = data
+
+    @property
+    def object_instances(self):
+        return (ObjectInstance(obj) for obj in self.m_data.objects)
+
+class ImageCollection(dict):
+
+    def new(self, name : str, width : int, height : int):
+        self[name] = types.SimpleNamespace(name = name, size = (width, height))
+        return self[name]
+
+    def remove(self, image):
+        self.pop(image.name, None)
+
+def install():
+    if "bpy" in sys.modules and getattr(sys.modules["bpy"], "BAD_STAND_IN", False):
+        return sys.modules["bpy"]
+
+    bpy = types.ModuleType("bpy")
+    bpy.BAD_STAND_IN = True
+    bpy.types = types.SimpleNamespace(Mesh = Mesh, Object = Object, Context = Context, SpaceView3D = SpaceView3D, Area = Area,
+                                      Region = Region, Window = Window, Scene = Scene)
+    bpy.data = types.SimpleNamespace(objects = [], meshes = [], images = ImageCollection())
+    bpy.app = types.ModuleType("bpy.app")
+    bpy.app.handlers = types.ModuleType("bpy.app.handlers")
+    bpy.app.handlers.persistent = lambda function: function
+    bpy.app.handlers.depsgraph_update_post = []
+    bpy.app.timers = types.SimpleNamespace(register = lambda function, first_interval = 0.0, persistent = False: None,
+                                           is_registered = lambda function: False)
+    bpy.context = None
+
+    gpu = types.ModuleType("gpu")
+    gpu.types = types.ModuleType("gpu.types")
+    for name, value in (("GPUTexture", GPUTexture), ("GPUFrameBuffer", StandIn), ("GPUShaderCreateInfo", StandIn),
+                        ("GPUVertFormat", GPUVertFormat), ("GPUVertBuf", GPUVertBuf), ("GPUIndexBuf", GPUIndexBuf),
+                        ("GPUBatch", GPUBatch), ("GPUStageInterfaceInfo", StandIn), ("GPUOffScreen", GPUOffScreen),
+                        ("Buffer", Buffer), ("GPUUniformBuf", StandIn)):
+        setattr(gpu.types, name, value)
+    gpu.shader = types.SimpleNamespace(create_from_info = StandIn)
+    gpu.compute = types.SimpleNamespace(dispatch = dispatch)
+    gpu.state = StandIn()
+
+    gpu_extras = types.ModuleType("gpu_extras")
+    gpu_extras.batch = types.ModuleType("gpu_extras.batch")
+    gpu_extras.batch.batch_for_shader = StandIn
+
+    sys.modules.update({ "bpy" : bpy, "bpy.app" : bpy.app, "bpy.app.handlers" : bpy.app.handlers,
+                         "gpu" : gpu, "gpu.types" : gpu.types,
+                         "gpu_extras" : gpu_extras, "gpu_extras.batch" : gpu_extras.batch })
+    return bpy
+
+# a grid of about triangle_count triangles
+def create_grid(triangle_count : int):
+    k = max(2, int(np.ceil(np.sqrt(triangle_count / 2.0))) + 1)
+
+    xs, ys = np.meshgrid(np.linspace(-1.0, 1.0, k, dtype = np.float32), np.linspace(-1.0, 1.0, k, dtype = np.float32))
+    vertices = np.stack((xs.ravel(), ys.ravel(), np.zeros(k * k, dtype = np.float32)), axis = 1)
+
+    quad = np.arange(k * (k - 1)).reshape(k - 1, k)[:, :-1].ravel()
+    triangles = np.concatenate((np.stack((quad, quad + 1, quad + k + 1), axis = 1),
+                                np.stack((quad, quad + k + 1, quad + k), axis = 1)))
+
+    return vertices, triangles
+
+# a 3d view area whose WINDOW regions are the given (width, height, vp), 4 regions stand for a quad view
+def create_view_3d_area(regions : list) -> Area:
+    area = Area()
+    area.type = "VIEW_3D"
+    area.regions = [Region(width, height, vp) for width, height, vp in regions]
+    area.width = max(region.width for region in area.regions)
+    area.height = max(region.height for region in area.regions)
+    area.spaces = types.SimpleNamespace(active = types.SimpleNamespace(clip_start = 0.1, clip_end = 1000.0, shading = types.SimpleNamespace(type = "SOLID"),
+                                                                       region_3d = area.regions[0].data))
+    return area
+
+# replaces the stand-in bpy.data with object_count objects scattered over a square, sharing mesh_count meshes
+# (one mesh per object by default) of about triangle_count triangles each, returns the context to pass to the pipeline.
+# vp is the perspective matrix of the 3d view, the window holds one 3d view area unless areas are given
+def create_scene(object_count : int, triangle_count : int, resolution : tuple = (64, 64), mesh_count : int = None,
+                 viewport_dimensions : tuple = (1920, 1080), seed : int = 0, vp : np.ndarray = None, areas : list = None) -> Context:
+    bpy = install()
+    rng = np.random.default_rng(seed)
+
+    vertices, triangles = create_grid(triangle_count)
+    meshes = [StandInMesh(f"Mesh {i}", vertices, triangles) for i in range(mesh_count if mesh_count != None else object_count)]
+
+    extent = np.sqrt(object_count) * 4.0
+    objects = []
+    for i in range(object_count):
+        matrix_world = np.eye(4, dtype = np.float32)
+        matrix_world[:2, 3] = rng.uniform(-extent, extent, 2)
+        objects.append(StandInObject(f"Object {i}", meshes[i % len(meshes)], matrix_world, resolution))
+
+    bpy.data.objects = objects
+    bpy.data.meshes = meshes
+    bpy.data.images = ImageCollection()
+
+    if areas == None:
+        areas = [create_view_3d_area([(viewport_dimensions[0], viewport_dimensions[1], vp if vp is not None else np.eye(4, dtype = np.float32))])]
+
+    context = Context()
+    context.scene = Scene()
+    context.scene.frame_current = 1
+    context.view_layer = types.SimpleNamespace(name = "ViewLayer")
+    context.screen = types.SimpleNamespace(areas = areas)
+    context.window = Window()
+    context.window.screen = context.screen
+    context.window.scene = context.scene
+    context.window.view_layer = context.view_layer
+    context.window_manager = types.SimpleNamespace(windows = [context.window])
+    context.evaluated_depsgraph_get = lambda: Depsgraph(bpy.data)
+    bpy.context = context
+
+    return context
@@ -0,0 +1,151 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Sprite atlas work per frame with BAD_SPRITE_ATLAS_TEMPORAL_REUSE under a static camera where a few of the objects
+# animate: every frame the moving objects slide by a few pixels and one more object changes its colors in place (like a
+# deforming character whose silhouette stays). The numpy references of bad_cpu_backend run the full pass and the
+# incremental pass (mark dirty cells, then only their atomics and merges) on the same frames, both atlases must be
+# identical inside the cells (texels outside of every cell are only written by full passes) and so must the combined
+# renders. The frames show background between the objects, it scatters nothing and must not dirty any cell.
+#   dirty        cells flagged by the mark pass per frame
+#   atomics      scattered pixels of the full and the incremental pass
+#   merged       atlas texels merged (cleared and stored) by the full and the incremental pass
+#   full, reuse  cpu time of the full pass and of the mark + incremental pass (the numpy scatter still visits every pixel)
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_temporal_reuse.py [--moving 0 1 4 16] [--objects 50] [--frames 5] [--json results.json]
+
+import time
+
+import numpy as np
+
+from bench_common import script_arguments, write_json
+from bench_atlas_kernels import create_cell_table, bad_globals, bad_packer, bad_cpu_backend, ATLAS_WIDTH, ATLAS_HEIGHT
+from bench_pipeline import option_values
+
+WIDTH = 640
+HEIGHT = 360
+CELL_SIZE = 64
+
+# objects are textured rectangles drawn in id order so later ones cover earlier ones, about a third of the viewport is background
+def create_objects(object_count : int, rng : np.random.Generator) -> list:
+    objects = []
+    for object_id in range(1, object_count + 1):
+        w = int(rng.integers(WIDTH // 30, WIDTH // 8))
+        h = int(rng.integers(HEIGHT // 30, HEIGHT // 8))
+        objects.append({ "id" : object_id, "position" : [int(rng.integers(0, WIDTH - w)), int(rng.integers(0, HEIGHT - h))],
+                         "colors" : rng.integers(0, 256, (h, w, 4)).astype(np.float32) / np.float32(255.0) })
+    return objects
+
+def draw_frame(objects : list, background : np.ndarray):
+    object_ids = np.zeros((HEIGHT, WIDTH), dtype = np.float32)
+    colors = background.copy()
+
+    for obj in objects:
+        x, y = obj["position"]
+        h, w = obj["colors"].shape[:2]
+        object_ids[y:y + h, x:x + w] = obj["id"]
+        colors[y:y + h, x:x + w] = obj["colors"]
+
+    return object_ids, colors
+
+def animate(objects : list, moving_count : int, frame : int, rng : np.random.Generator):
+    for obj in objects[-moving_count:] if moving_count > 0 else []:
+        h, w = obj["colors"].shape[:2]
+        obj["position"][0] = int(np.clip(obj["position"][0] + rng.integers(-4, 5), 0, WIDTH - w))
+        obj["position"][1] = int(np.clip(obj["position"][1] + rng.integers(-4, 5), 0, HEIGHT - h))
+
+    # a silhouette that stays but shades differently
+    recolored = objects[frame % len(objects)]
+    recolored["colors"] = rng.integers(0, 256, recolored["colors"].shape).astype(np.float32) / np.float32(255.0)
+
+def benchmark_reuse(kernel : str, moving_count : int, object_count : int, frames : int) -> dict:
+    rng = np.random.default_rng(0)
+    objects = create_objects(object_count, rng)
+    background = rng.integers(0, 256, (HEIGHT, WIDTH, 4)).astype(np.float32) / np.float32(255.0)
+
+    packer = bad_packer.BAD_AtlasPages(bad_globals.BAD_SPRITE_ATLAS_PACKER, ATLAS_WIDTH, ATLAS_HEIGHT, bad_globals.BAD_MAX_SPRITE_ATLAS_PAGES)
+    packer.update({ object_id : (CELL_SIZE, CELL_SIZE) for object_id in range(1, object_count + 1) })
+    pages = packer.page_count()
+    cell_viewports = create_cell_table(packer, WIDTH, HEIGHT)
+    cell_owners = bad_cpu_backend.build_cell_owners(packer.m_rects, ATLAS_WIDTH, ATLAS_HEIGHT, pages)
+    backend = bad_cpu_backend.BAD_CpuBackend()
+    arguments = (cell_viewports, ATLAS_WIDTH, ATLAS_HEIGHT, pages, kernel, False, cell_owners)
+
+    # the first frame is a full pass for both
+    object_ids, colors = draw_frame(objects, background)
+    previous_keys = bad_cpu_backend.compute_pixel_keys(object_ids, colors)
+    sprite_atlas, combined = backend.render(object_ids, colors, *arguments)
+
+    totals = { "dirty" : 0, "full_atomics" : 0, "atomics" : 0, "full_merged" : 0, "merged" : 0, "full_seconds" : 0.0, "seconds" : 0.0 }
+    max_difference = 0
+
+    for frame in range(frames):
+        animate(objects, moving_count, frame, rng)
+        object_ids, colors = draw_frame(objects, background)
+
+        start = time.perf_counter()
+        full_atlas, full_combined = backend.render(object_ids, colors, *arguments)
+        totals["full_seconds"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        keys = bad_cpu_backend.compute_pixel_keys(object_ids, colors)
+        dirty_cells = bad_cpu_backend.mark_dirty_cells(previous_keys, keys, cell_viewports, cell_owners, ATLAS_WIDTH, ATLAS_HEIGHT, pages)
+        sprite_atlas, combined = backend.render(object_ids, colors, *arguments, dirty_cells, sprite_atlas)
+        totals["seconds"] += time.perf_counter() - start
+        previous_keys = keys
+
+        is_owned = cell_owners != 0.0
+        max_difference = max(max_difference, int(np.abs(full_atlas[is_owned].astype(np.int64) - sprite_atlas[is_owned]).max()),
+                             int(np.abs(full_combined.astype(np.int64) - combined).max()))
+
+        if kernel == "ATOMIC":
+            totals["full_atomics"] += len(bad_cpu_backend.scatter_rows(object_ids, colors, 0, HEIGHT, cell_viewports, ATLAS_WIDTH, ATLAS_HEIGHT, pages)[0])
+            totals["atomics"] += len(bad_cpu_backend.scatter_rows(object_ids, colors, 0, HEIGHT, cell_viewports, ATLAS_WIDTH, ATLAS_HEIGHT, pages,
+                                                                  dirty_cells, cell_owners)[0])
+
+        totals["dirty"] += int(np.count_nonzero(dirty_cells))
+        totals["full_merged"] += cell_owners.size
+        totals["merged"] += int(np.count_nonzero(dirty_cells[cell_owners.astype(np.int64)]))
+
+    result = { key : value / frames for key, value in totals.items() }
+    result.update({ "kernel" : kernel, "moving" : moving_count, "objects" : object_count, "max_difference" : max_difference })
+    return result
+
+def main(argv):
+    moving_counts = option_values(argv, "--moving", [0, 1, 4, 16])
+    object_count = option_values(argv, "--objects", [50])[0]
+    frames = option_values(argv, "--frames", [5])[0]
+
+    results = []
+
+    print(f"{'kernel':>7} {'moving':>7} {'dirty':>6} {'atomics (k)':>16} {'merged (k)':>16} {'full (ms)':>10} {'reuse (ms)':>11} {'max difference':>15}")
+
+    for kernel in ("ATOMIC", "GATHER"):
+        for moving_count in moving_counts:
+            result = benchmark_reuse(kernel, moving_count, object_count, frames)
+            results.append(result)
+
+            atomics = f"{result['full_atomics'] / 1000.0:.0f} -> {result['atomics'] / 1000.0:.0f}" if kernel == "ATOMIC" else "-"
+            print(f"{kernel:>7} {moving_count:>7} {result['dirty']:>6.1f} {atomics:>16} "
+                  f"{f'''{result['full_merged'] / 1000.0:.0f} -> {result['merged'] / 1000.0:.0f}''':>16} "
+                  f"{result['full_seconds'] * 1000.0:>10.1f} {result['seconds'] * 1000.0:>11.1f} {result['max_difference']:>15}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], { "viewport" : [WIDTH, HEIGHT], "cell_size" : CELL_SIZE, "frames" : frames, "results" : results })
+
+if __name__ == "__main__":
+    main(script_arguments())
@@ -0,0 +1,109 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Per frame cost of BAD_Pipeline.render with several 3d views (quad views of 4 regions each), with the bpy and gpu
+# stand-ins of bench_stand_ins. Every frame moves the view of the given number of active views, the other views keep
+# their textures:
+#   idle     no view moves, every frame is a cache hit
+#   one      one view moves
+#   all      every view moves
+# Reports the average frame time, the views rendered and the draw calls and dispatches per frame, the mesh buffers
+# are built once for all views.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/bench_views.py [--views 1 4 8 16] [--objects 1000] [--triangles 200] [--frames 20] [--json results.json]
+
+import time
+
+import numpy as np
+
+import bench_stand_ins
+
+bench_stand_ins.install()
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_frustum_culling import perspective_matrix
+from bench_pipeline import option_values
+
+bad_pipeline = load_addon_module("bad_pipeline")
+
+WIDTH = 960
+HEIGHT = 540
+
+def create_areas(view_count : int, extent : float) -> list:
+    regions = []
+    for i in range(view_count):
+        angle = 2.0 * np.pi * i / view_count
+        eye = np.array((np.cos(angle) * 2.0 * extent, np.sin(angle) * 2.0 * extent, extent))
+        regions.append((WIDTH, HEIGHT, perspective_matrix(50.0, WIDTH / HEIGHT, 0.1, 1000.0, eye, np.array((0.0, 0.0, 0.0)))))
+
+    return [bench_stand_ins.create_view_3d_area(regions[offset:offset + 4]) for offset in range(0, view_count, 4)]
+
+def benchmark_views(view_count : int, active_count : int, object_count : int, triangle_count : int, frames : int) -> dict:
+    extent = np.sqrt(object_count) * 4.0
+    context = bench_stand_ins.create_scene(object_count, triangle_count, areas = create_areas(view_count, extent))
+    regions = [region for area in context.screen.areas for region in area.regions]
+
+    pipeline = bad_pipeline.BAD_Pipeline()
+    pipeline.m_mesh_preparer.m_worker_count = 0
+    pipeline.initialize()
+    pipeline.render(context) # builds the meshes and renders every view once
+
+    bench_stand_ins.Counters.reset()
+    rendered_views = 0
+    start = time.perf_counter()
+
+    for frame in range(frames):
+        for region in regions[:active_count]:
+            view_matrix = region.data.view_matrix.copy()
+            view_matrix[0, 3] += 0.01
+            region.data.view_matrix = view_matrix
+
+        pipeline.render(context)
+
+        if active_count > 0:
+            rendered_views += pipeline.m_rendered_view_count
+
+    seconds = (time.perf_counter() - start) / frames
+
+    return { "views" : view_count, "active_views" : active_count, "frame_seconds" : seconds,
+             "rendered_views_per_frame" : rendered_views / frames, "draw_calls_per_frame" : bench_stand_ins.Counters.draw_calls / frames,
+             "dispatches_per_frame" : bench_stand_ins.Counters.dispatches / frames, "meshes" : len(pipeline.m_batches) }
+
+def main(argv):
+    view_counts = option_values(argv, "--views", [1, 4, 8, 16])
+    object_count = option_values(argv, "--objects", [1000])[0]
+    triangle_count = option_values(argv, "--triangles", [200])[0]
+    frames = option_values(argv, "--frames", [20])[0]
+
+    results = []
+
+    print(f"{'views':>6} {'moving':>7} {'frame (ms)':>11} {'rendered':>9} {'draws':>7} {'dispatches':>11} {'meshes':>7}")
+
+    for view_count in view_counts:
+        for name, active_count in (("idle", 0), ("one", 1), ("all", view_count)):
+            result = benchmark_views(view_count, active_count, object_count, triangle_count, frames)
+            result["case"] = name
+            results.append(result)
+
+            print(f"{view_count:>6} {name:>7} {result['frame_seconds'] * 1000.0:>11.2f} {result['rendered_views_per_frame']:>9.1f} "
+                  f"{result['draw_calls_per_frame']:>7.0f} {result['dispatches_per_frame']:>11.1f} {result['meshes']:>7}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], { "objects" : object_count, "triangles" : triangle_count, "frames" : frames, "results" : results })
+
+if __name__ == "__main__":
+    main(script_arguments())
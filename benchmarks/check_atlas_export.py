@@ -0,0 +1,235 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Check of the sprite atlas export of bad_export on a small atlas whose texels encode their own (page, x, y):
+#   - crop_frame: every "CELLS" image is its cell flipped top down, cells on pages past the atlas are left out, every
+#     "PAGES" image is its page cropped to the bounds of the cells on it and pages without cells are left out
+#   - BAD_ImageSequenceWriter writes every image of every frame to a dict sink under <name>_<frame><extension>,
+#     PNG (chunks and crcs parsed) and RAW files decode to the cropped pixels, EXR files have a valid header,
+#     a line offset table pointing at every scanline and the pixels / 255 as float channels in A, B, G, R order
+#   - BAD_AtlasExporter writes a submitted texture one frame late and converts float readbacks to 8 bit
+#   - BAD_ImageSequenceWriter raises ValueError for unknown formats and crops
+# Fails with the first mismatch, prints the checked files per format and crop otherwise.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/check_atlas_export.py [--json results.json]
+
+import io
+import struct
+import zlib
+
+import numpy as np
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_atlas_export import MemorySink
+
+bad_export = load_addon_module("bad_export")
+
+PAGES = 2
+WIDTH = 64
+HEIGHT = 48
+
+# r = x, g = y, b = page, a = 255 so every texel tells where it comes from
+def create_atlas() -> np.ndarray:
+    atlas = np.full((PAGES, HEIGHT, WIDTH, 4), 255, dtype = np.uint8)
+    atlas[..., 0] = np.arange(WIDTH)[None, None, :]
+    atlas[..., 1] = np.arange(HEIGHT)[None, :, None]
+    atlas[..., 2] = np.arange(PAGES)[:, None, None]
+    return atlas
+
+# cells of page 0 and 1 and one on page 5 which the atlas does not have
+CELLS = { 1 : (0, 0, 16, 8, 0), 2 : (20, 4, 8, 24, 0), 7 : (40, 30, 24, 18, 0), 3 : (8, 16, 32, 16, 1), 9 : (0, 0, 4, 4, 5) }
+
+def check_crop(atlas : np.ndarray):
+    images = dict(bad_export.crop_frame(atlas, CELLS, "CELLS"))
+    assert sorted(images) == ["cell_00001", "cell_00002", "cell_00003", "cell_00007"], f"cell images {sorted(images)}"
+
+    for object_id, (x, y, width, height, page) in CELLS.items():
+        if page >= PAGES:
+            continue
+
+        pixels = images[f"cell_{object_id:05d}"]
+        assert pixels.shape == (height, width, 4), f"cell {object_id} has shape {pixels.shape}"
+        # row 0 of the image is the top row of the cell, the last atlas row since the atlas has row 0 at the bottom
+        assert np.all(pixels[:, :, 0] == np.arange(x, x + width)[None, :]), f"cell {object_id} columns"
+        assert np.all(pixels[:, :, 1] == np.arange(y + height - 1, y - 1, -1)[:, None]), f"cell {object_id} rows are not flipped"
+        assert np.all(pixels[:, :, 2] == page), f"cell {object_id} page"
+
+    images = dict(bad_export.crop_frame(atlas, CELLS, "PAGES"))
+    assert sorted(images) == ["page_01", "page_02"], f"page images {sorted(images)}"
+
+    # page 0: x from 0 to 64, y from 0 to 48, page 1: the one cell
+    for name, page, (x0, y0, x1, y1) in (("page_01", 0, (0, 0, 64, 48)), ("page_02", 1, (8, 16, 40, 32))):
+        pixels = images[name]
+        assert pixels.shape == (y1 - y0, x1 - x0, 4), f"{name} has shape {pixels.shape}, bounds {(x0, y0, x1, y1)}"
+        assert np.array_equal(pixels, atlas[page, y0:y1, x0:x1][::-1]), f"{name} pixels"
+
+def decode_png(data : bytes) -> np.ndarray:
+    assert data[:8] == b"\x89PNG\r\n\x1a\n", "png signature"
+
+    chunks = []
+    offset = 8
+    while offset < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        chunk_data = data[offset + 8:offset + 8 + length]
+        crc = struct.unpack(">I", data[offset + 8 + length:offset + 12 + length])[0]
+        assert crc == zlib.crc32(chunk_type + chunk_data) & 0xFFFFFFFF, f"png {chunk_type} crc"
+        chunks.append((chunk_type, chunk_data))
+        offset += 12 + length
+
+    assert [chunk[0] for chunk in chunks] == [b"IHDR", b"IDAT", b"IEND"], f"png chunks {[chunk[0] for chunk in chunks]}"
+    width, height, depth, color_type, compression, filter_method, interlace = struct.unpack(">IIBBBBB", chunks[0][1])
+    assert (depth, color_type, compression, filter_method, interlace) == (8, 6, 0, 0, 0), "png is not 8 bit rgba"
+
+    scanlines = np.frombuffer(zlib.decompress(chunks[1][1]), dtype = np.uint8).reshape(height, 1 + width * 4)
+    assert np.all(scanlines[:, 0] == 0), "png scanline filters"
+    return scanlines[:, 1:].reshape(height, width, 4)
+
+def read_null_terminated(data : bytes, offset : int):
+    end = data.index(b"\0", offset)
+    return data[offset:end].decode(), end + 1
+
+def decode_exr(data : bytes) -> np.ndarray:
+    magic, version = struct.unpack("<ii", data[:8])
+    assert (magic, version) == (20000630, 2), f"exr magic {magic} version {version}"
+
+    attributes = {}
+    offset = 8
+    while data[offset] != 0:
+        name, offset = read_null_terminated(data, offset)
+        attribute_type, offset = read_null_terminated(data, offset)
+        size = struct.unpack("<i", data[offset:offset + 4])[0]
+        attributes[name] = (attribute_type, data[offset + 4:offset + 4 + size])
+        offset += 4 + size
+    offset += 1 # end of the header
+
+    for name in ("channels", "compression", "dataWindow", "displayWindow", "lineOrder", "pixelAspectRatio", "screenWindowCenter", "screenWindowWidth"):
+        assert name in attributes, f"exr header misses {name}"
+
+    assert attributes["compression"] == ("compression", b"\0"), "exr is compressed"
+    assert attributes["lineOrder"] == ("lineOrder", b"\0"), "exr lines are not increasing"
+
+    channels = []
+    channel_list = attributes["channels"][1]
+    channel_offset = 0
+    while channel_list[channel_offset] != 0:
+        name, channel_offset = read_null_terminated(channel_list, channel_offset)
+        pixel_type = struct.unpack("<i", channel_list[channel_offset:channel_offset + 4])[0]
+        assert pixel_type == 2, f"exr channel {name} is not float"
+        channels.append(name)
+        channel_offset += 16
+    assert channels == ["A", "B", "G", "R"], f"exr channels {channels}"
+
+    x_min, y_min, x_max, y_max = struct.unpack("<iiii", attributes["dataWindow"][1])
+    assert (x_min, y_min) == (0, 0) and attributes["displayWindow"] == attributes["dataWindow"], "exr windows"
+    width, height = x_max + 1, y_max + 1
+    line_size = width * len(channels) * 4
+
+    offsets = np.frombuffer(data[offset:offset + height * 8], dtype = "<u8")
+    assert offsets[0] == offset + height * 8, "exr first line does not follow the offset table"
+
+    values = np.empty((height, width, 4), dtype = np.float32)
+    for line, line_offset in enumerate(offsets.tolist()):
+        y, size = struct.unpack("<ii", data[line_offset:line_offset + 8])
+        assert (y, size) == (line, line_size), f"exr line {line} at {line_offset} holds line {y} of {size} bytes"
+        planes = np.frombuffer(data[line_offset + 8:line_offset + 8 + size], dtype = "<f4").reshape(len(channels), width)
+        values[line] = planes[::-1].T # A, B, G, R planes to rgba
+
+    assert offsets[-1] + 8 + line_size == len(data), "exr has trailing data"
+    return values
+
+def check_writer(atlas : np.ndarray, format : str, crop : str) -> dict:
+    sink = MemorySink()
+    writer = bad_export.BAD_ImageSequenceWriter("export", format, crop, worker_count = 2, max_pending = 2, sink = sink)
+    frames = (3, 4, 12)
+    for frame in frames:
+        writer.write_frame(frame, atlas, CELLS)
+    writer.close()
+
+    assert writer.m_errors == [], f"{format} {crop}: {writer.m_errors}"
+    extension = bad_export.BAD_ENCODERS[format][1]
+    images = bad_export.crop_frame(atlas, CELLS, crop)
+
+    expected = { f"export/{name}_{frame:05d}{extension}" : pixels for frame in frames for name, pixels in images }
+    assert sorted(sink.m_files) == sorted(expected), f"{format} {crop}: written files {sorted(sink.m_files)}"
+    assert writer.m_written_frames == len(frames), f"{format} {crop}: {writer.m_written_frames} frames written"
+    assert writer.m_written_bytes == sum(len(data) for data in sink.m_files.values()), f"{format} {crop}: written bytes"
+
+    for path, pixels in expected.items():
+        data = sink.m_files[path]
+        if format == "PNG":
+            assert np.array_equal(decode_png(data), pixels), f"{path} pixels"
+        elif format == "RAW":
+            decoded = np.load(io.BytesIO(data))
+            assert decoded.dtype == np.uint8 and np.array_equal(decoded, pixels), f"{path} pixels"
+        else:
+            assert np.array_equal(decode_exr(data), pixels.astype(np.float32) / np.float32(255.0)), f"{path} pixels"
+
+    return { "format" : format, "crop" : crop, "files" : len(sink.m_files), "bytes" : writer.m_written_bytes }
+
+class ReadbackTexture:
+
+    def __init__(self, atlas : np.ndarray):
+        self.m_atlas = atlas
+
+    # GPUTexture.read() of RGBA8 textures may come back as floats
+    def read(self):
+        return (self.m_atlas.astype(np.float32) / np.float32(255.0)).reshape(-1).tolist()
+
+def check_exporter(atlas : np.ndarray):
+    sink = MemorySink()
+    exporter = bad_export.BAD_AtlasExporter(bad_export.BAD_ImageSequenceWriter("export", "RAW", "CELLS", sink = sink))
+
+    exporter.submit_texture(ReadbackTexture(atlas), 1, CELLS, PAGES, WIDTH, HEIGHT)
+    assert len(sink.m_files) == 0 and exporter.m_writer.m_pending_count == 0, "the texture was read in the frame it was submitted"
+
+    exporter.submit_texture(ReadbackTexture(255 - atlas), 2, CELLS, PAGES, WIDTH, HEIGHT)
+    exporter.close()
+
+    for frame, frame_atlas in ((1, atlas), (2, 255 - atlas)):
+        for name, pixels in bad_export.crop_frame(frame_atlas, CELLS, "CELLS"):
+            assert np.array_equal(np.load(io.BytesIO(sink.m_files[f"export/{name}_{frame:05d}.npy"])), pixels), f"readback of frame {frame}"
+
+def check_arguments():
+    for format, crop in (("TIFF", "CELLS"), ("PNG", "OBJECTS")):
+        try:
+            bad_export.BAD_ImageSequenceWriter("export", format, crop, sink = MemorySink())
+        except ValueError as error:
+            assert repr(format if crop == "CELLS" else crop) in str(error), f"error {error} does not name the bad value"
+        else:
+            assert False, f"format {format} crop {crop} was accepted"
+
+def main(argv):
+    atlas = create_atlas()
+    results = []
+
+    check_crop(atlas)
+    check_exporter(atlas)
+    check_arguments()
+
+    print(f"{'format':>7} {'crop':>6} {'files':>6} {'bytes':>9}")
+
+    for format in bad_export.BAD_EXPORT_FORMATS:
+        for crop in bad_export.BAD_EXPORT_CROPS:
+            result = check_writer(atlas, format, crop)
+            results.append(result)
+            print(f"{format:>7} {crop:>6} {result['files']:>6} {result['bytes']:>9}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
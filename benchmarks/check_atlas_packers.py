@@ -0,0 +1,185 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Randomized check of the sprite atlas packers of bad_packer: every seed runs a sequence of random inserts, removes,
+# resizes and incremental updates on a small atlas so it fills up and fragments, and after every operation checks
+#   - placed rectangles have their requested size, lie inside the atlas (and their page) and do not overlap
+#   - the used area is the sum of the placed areas
+#   - MAXRECTS: free rectangles lie inside the atlas and never intersect a placed rectangle
+#   - SKYLINE: holes never intersect a placed rectangle, the skyline nodes cover the atlas width from left to right
+#     and no placed rectangle reaches above the skyline (the space above it is free)
+# Fails with the seed and operation of the first violation, prints the operations checked per packer otherwise.
+# Runs under plain python (no Blender needed):
+#   python benchmarks/check_atlas_packers.py [--seeds 50] [--operations 300] [--json results.json]
+
+import random
+
+from bench_common import load_addon_module, script_arguments, write_json
+from bench_pipeline import option_values
+
+bad_packer = load_addon_module("bad_packer")
+
+WIDTH = 256
+HEIGHT = 256
+MAX_PAGES = 3
+
+def random_size(rng : random.Random) -> tuple:
+    if rng.random() < 0.5:
+        return (1 << rng.randint(2, 7), 1 << rng.randint(2, 7)) # power of two cells like the pipeline's
+    return (rng.randint(1, 96), rng.randint(1, 96))
+
+def page_violations(packer, rects : dict) -> list:
+    violations = []
+    placed = list(rects.values())
+
+    for key, rect in rects.items():
+        if rect[0] < 0 or rect[1] < 0 or rect[0] + rect[2] > packer.m_width or rect[1] + rect[3] > packer.m_height:
+            violations.append(f"rect {key} {rect} outside of the atlas")
+
+    for i in range(len(placed)):
+        for j in range(i + 1, len(placed)):
+            if bad_packer.intersects(placed[i], placed[j]):
+                violations.append(f"rects {placed[i]} and {placed[j]} overlap")
+
+    if isinstance(packer, bad_packer.BAD_MaxRectsPacker):
+        for free_rect in packer.m_free_rects:
+            if not bad_packer.contains((0, 0, packer.m_width, packer.m_height), free_rect):
+                violations.append(f"free rect {free_rect} outside of the atlas")
+            for rect in placed:
+                if bad_packer.intersects(free_rect, rect):
+                    violations.append(f"free rect {free_rect} intersects rect {rect}")
+
+    if isinstance(packer, bad_packer.BAD_SkylinePacker):
+        for hole in packer.m_holes:
+            for rect in placed:
+                if bad_packer.intersects(hole, rect):
+                    violations.append(f"hole {hole} intersects rect {rect}")
+
+        x = 0
+        for node in packer.m_skyline:
+            if node[0] != x or node[2] <= 0:
+                violations.append(f"skyline {packer.m_skyline} does not cover the atlas width")
+                break
+            x += node[2]
+
+            for rect in placed:
+                if rect[0] < node[0] + node[2] and node[0] < rect[0] + rect[2] and rect[1] + rect[3] > node[1]:
+                    violations.append(f"rect {rect} reaches above skyline node {node}")
+
+        if x != packer.m_width:
+            violations.append(f"skyline {packer.m_skyline} does not cover the atlas width")
+
+    return violations
+
+def violations(packer, sizes : dict) -> list:
+    found = []
+
+    for key, rect in packer.m_rects.items():
+        if rect[2:4] != sizes[key]:
+            found.append(f"rect {key} {rect} placed with a size other than {sizes[key]}")
+
+    if sum(rect[2] * rect[3] for rect in packer.m_rects.values()) != packer.m_used_area:
+        found.append(f"used area {packer.m_used_area} is not the sum of the placed areas")
+
+    if isinstance(packer, bad_packer.BAD_AtlasPages):
+        for page_index, page in enumerate(packer.m_pages):
+            rects = { key : rect[:4] for key, rect in packer.m_rects.items() if rect[4] == page_index }
+            if rects != page.m_rects:
+                found.append(f"page {page_index} holds {page.m_rects}, the atlas {rects}")
+            found += page_violations(page, page.m_rects)
+    else:
+        found += page_violations(packer, packer.m_rects)
+
+    return found
+
+# "<kind>" or "PAGED <kind>" for the multi page atlas of the pipeline
+def create_packer(name : str):
+    if name.startswith("PAGED "):
+        return bad_packer.BAD_AtlasPages(name[len("PAGED "):], WIDTH, HEIGHT, MAX_PAGES)
+    return bad_packer.create_atlas_packer(name, WIDTH, HEIGHT)
+
+def check_packer(name : str, seed : int, operation_count : int) -> dict:
+    rng = random.Random(seed)
+    packer = create_packer(name)
+    sizes = {} # key -> size of every placed rectangle
+    next_key = 1
+    counts = { "insert" : 0, "failed" : 0, "remove" : 0, "update" : 0 }
+
+    for operation_index in range(operation_count):
+        choice = rng.random()
+
+        if choice < 0.5 or len(sizes) == 0:
+            operation = "insert"
+            size = random_size(rng)
+            if rng.random() < 0.8 or len(sizes) == 0:
+                key = next_key
+                next_key += 1
+            else:
+                key = rng.choice(list(sizes)) # resizes a placed one
+
+            sizes.pop(key, None)
+            if packer.insert(key, *size):
+                sizes[key] = size
+            else:
+                counts["failed"] += 1
+        elif choice < 0.85:
+            operation = "remove"
+            key = rng.choice(list(sizes))
+            assert packer.remove(key), f"{name} seed {seed}: remove of placed rect {key} failed"
+            del sizes[key]
+        else:
+            # the pipeline's layout rebuild: some cells resized, removed and added at once
+            operation = "update"
+            wanted = { key : (random_size(rng) if rng.random() < 0.2 else size) for key, size in sizes.items() if rng.random() < 0.9 }
+            for i in range(rng.randint(0, 4)):
+                wanted[next_key] = random_size(rng)
+                next_key += 1
+
+            failed = set(packer.update(wanted, rng.choice((0.25, 1.0))))
+            sizes = { key : size for key, size in wanted.items() if not key in failed }
+            counts["failed"] += len(failed)
+
+        counts[operation] += 1
+
+        assert set(packer.m_rects) == set(sizes), f"{name} seed {seed} {operation} #{operation_index}: placed keys differ"
+        found = violations(packer, sizes)
+        assert len(found) == 0, f"{name} seed {seed} {operation} #{operation_index}: {found[0]}"
+
+    return counts
+
+def main(argv):
+    seeds = option_values(argv, "--seeds", [50])[0]
+    operation_count = option_values(argv, "--operations", [300])[0]
+
+    results = []
+
+    print(f"{'packer':>16} {'seeds':>6} {'inserts':>8} {'failed':>7} {'removes':>8} {'updates':>8}")
+
+    for name in list(bad_packer.BAD_ATLAS_PACKERS) + [f"PAGED {kind}" for kind in bad_packer.BAD_ATLAS_PACKERS]:
+        totals = { "insert" : 0, "failed" : 0, "remove" : 0, "update" : 0 }
+        for seed in range(seeds):
+            for key, count in check_packer(name, seed, operation_count).items():
+                totals[key] += count
+
+        results.append(dict(totals, packer = name, seeds = seeds, operations = operation_count))
+        print(f"{name:>16} {seeds:>6} {totals['insert']:>8} {totals['failed']:>7} {totals['remove']:>8} {totals['update']:>8}")
+
+    if "--json" in argv:
+        write_json(argv[argv.index("--json") + 1], results)
+
+if __name__ == "__main__":
+    main(script_arguments())
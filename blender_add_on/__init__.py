@@ -20,20 +20,42 @@
 
 if "bpy" in locals():
     import importlib
+    importlib.reload(bad_cpu_backend)
+    importlib.reload(bad_export)
+    importlib.reload(bad_geometry)
     importlib.reload(bad_globals)
     importlib.reload(bad_helpers)
     importlib.reload(bad_menus)
+    importlib.reload(bad_mesh_preparer)
+    importlib.reload(bad_packer)
     importlib.reload(bad_pipeline)
+    importlib.reload(bad_profiler)
+    importlib.reload(bad_rasterizer)
+    importlib.reload(bad_render_targets)
+    importlib.reload(bad_resources)
     importlib.reload(bad_settings)
+    importlib.reload(bad_shader_cache)
     importlib.reload(bad_shaders)
+    importlib.reload(bad_views)
 
 import bpy
+from . import bad_cpu_backend
+from . import bad_export
+from . import bad_geometry
 from . import bad_globals
 from . import bad_helpers
 from . import bad_menus
+from . import bad_mesh_preparer
+from . import bad_packer
 from . import bad_pipeline
+from . import bad_profiler
+from . import bad_rasterizer
+from . import bad_render_targets
+from . import bad_resources
 from . import bad_settings
+from . import bad_shader_cache
 from . import bad_shaders
+from . import bad_views
 
 bl_info = {
     "name": "BlenderAddOn",
@@ -51,17 +73,25 @@ bl_info = {
 classes = (
     bad_settings.BAD_PROPERTYGROUP_Settings,
     bad_menus.BAD_PT_MainPanel,
+    bad_menus.BAD_OT_ExportTrace,
+    bad_menus.BAD_OT_StartAtlasExport,
+    bad_menus.BAD_OT_StopAtlasExport,
 )
 
 #keymaps = []
 
 from bpy.app.handlers import persistent
 
+# runs in the draw handler of every 3d view region, the image editors of all windows only redraw when that view
+# renders differently than at its last render so redrawing overlays or other views does not render again
 @persistent
 def trigger_render():
-    for area in bpy.context.screen.areas:
-        if area.type == "IMAGE_EDITOR":
-            area.tag_redraw()
+    pipeline = bad_pipeline.BAD_Pipeline.pipeline
+
+    if pipeline != None and pipeline.m_is_render_ready and not pipeline.is_view_changed(bpy.context):
+        return
+
+    bad_pipeline.tag_image_editors_redraw()
 
 @persistent
 def render_pipeline_handler():
@@ -70,6 +100,21 @@ def render_pipeline_handler():
 
     bad_pipeline.BAD_Pipeline.pipeline.render(bpy.context)
 
+# runs the initialization steps that fit in the budget and redraws the image editors with what is built so far
+def continue_init_pipeline():
+    pipeline = bad_pipeline.BAD_Pipeline.pipeline
+
+    if pipeline == None:
+        return None
+
+    is_initialized = pipeline.continue_initialize(bad_globals.BAD_INITIALIZE_BUDGET_MS / 1000.0)
+    bad_pipeline.tag_image_editors_redraw()
+
+    if is_initialized:
+        return None
+
+    return bad_globals.BAD_INITIALIZE_INTERVAL
+
 trigger_render_handler = None
 
 draw_handler = None
@@ -78,7 +123,17 @@ def init_pipeline():
     global trigger_render_handler
     
     global draw_handler
-    bad_pipeline.BAD_Pipeline.create_pipeline()
+
+    # the ui is not up yet right after loading
+    if len(bpy.context.window_manager.windows) == 0:
+        return bad_globals.BAD_INITIALIZE_INTERVAL
+
+    bad_pipeline.BAD_Pipeline.create_pipeline(is_time_sliced = True)
+
+    if bpy.app.timers.is_registered(continue_init_pipeline):
+        bpy.app.timers.unregister(continue_init_pipeline)
+
+    bpy.app.timers.register(continue_init_pipeline)
 
     # update the handler if it is already registered
     if bad_pipeline.mesh_update_handler in bpy.app.handlers.depsgraph_update_post:
@@ -97,8 +152,6 @@ def init_pipeline():
         "WINDOW",
         "POST_PIXEL"
     )
-    
-    # TODO: this is not correct should be for any view
 
     if trigger_render_handler != None:
         bpy.types.SpaceView3D.draw_handler_remove(trigger_render_handler,
@@ -127,7 +180,7 @@ def register():
     if "bad_settings" not in bpy.types.Object.__annotations__:
         bpy.types.Object.bad_settings = bpy.props.PointerProperty(type=bad_settings.BAD_PROPERTYGROUP_Settings)
 
-    bpy.app.timers.register(init_pipeline, first_interval = 2.0)
+    bpy.app.timers.register(init_pipeline, first_interval = bad_globals.BAD_INITIALIZE_INTERVAL)
 
 def unregister():
     # remove operators
@@ -135,6 +188,9 @@ def unregister():
         if c.is_registered:
             bpy.utils.unregister_class(c)
 
+    if bpy.app.timers.is_registered(continue_init_pipeline):
+        bpy.app.timers.unregister(continue_init_pipeline)
+
     bad_pipeline.BAD_Pipeline.delete_pipeline()
 
 # allows running addon from text editor
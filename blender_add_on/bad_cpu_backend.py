@@ -0,0 +1,321 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import numpy as np
+
+# NumPy versions of the sprite atlas compute shaders, they follow the glsl in bad_shaders texel for texel
+# so the kernels can be compared and timed without a gpu. Only numpy is needed (no bpy or gpu).
+#
+# Layouts match the gpu textures with y as the row index:
+#   object_ids      (height, width) float32, the "Object ID" texture
+#   colors          (height, width, 4) float32 in [0, 1], the "Color" texture
+#   cell_viewports  (capacity, 2, 4) float32, BAD_Pipeline.m_cell_viewports
+#   atlas textures  (pages, atlas height, atlas width[, channels])
+#   accumulator     (pages * layers per page, atlas height, atlas width) uint32, "Sprite Atlas Accumulator"
+#   pixel keys      (height, width, 2) uint32, the "pixel_keys" render target of a view
+#   dirty cells     (capacity,) bool, the "dirtyCells" image of compute_shader_source_sprite_atlas_mark_dirty_cells
+
+# sums of up to this many 8 bit values fit 16 bits
+BAD_MAX_PACKED_CONTRIBUTORS = 0xFFFF // 255
+
+# 32 bit layers per atlas page next to the RGBA8 atlas: the atomic kernel accumulates r, g, b and count,
+# in 2 layers when the sums are packed to 16 bits, the gather kernel only has the cell owner layer
+def sprite_atlas_layers_per_page(kernel : str, is_packed : bool) -> int:
+    if kernel == "GATHER":
+        return 1
+    return 2 if is_packed else 4
+
+def sprite_atlas_memory_bytes(atlas_width : int, atlas_height : int, pages : int, layers_per_page : int) -> int:
+    return atlas_width * atlas_height * pages * 4 * (layers_per_page + 1)
+
+# estimated bytes the atomic kernel moves per frame: every viewport pixel loads its id and color and does one
+# atomic (read and write) per layer, the merge pass loads and clears every layer and stores the RGBA8 atlas
+def sprite_atlas_frame_traffic_bytes(viewport_pixels : int, atlas_width : int, atlas_height : int, pages : int, layers_per_page : int) -> int:
+    scatter = viewport_pixels * (4 + 4 + layers_per_page * 8)
+    merge = atlas_width * atlas_height * pages * (layers_per_page * 8 + 4)
+    return scatter + merge
+
+# most viewport pixels that can land on one atlas texel: the footprint of the smallest cell
+def max_contributors(rects : np.ndarray, viewport_width : int, viewport_height : int) -> int:
+    if len(rects) == 0:
+        return 1
+
+    widths = np.maximum(rects[:, 2].astype(np.int64), 1)
+    heights = np.maximum(rects[:, 3].astype(np.int64), 1)
+    footprints = (-(-viewport_width // widths)) * (-(-viewport_height // heights))
+    return int(footprints.max())
+
+def cell_viewport_lookup(object_ids : np.ndarray, cell_viewports : np.ndarray):
+    ids = object_ids.astype(np.int64)
+    cells = np.where(object_ids < len(cell_viewports), ids, 0) # ids outside of the table use cell 0
+
+    rects = cell_viewports[cells, 0, :].astype(np.int64)
+    pages = cell_viewports[cells, 1, 0].astype(np.int64)
+
+    return rects, pages
+
+# uint(color * 255.0) of the shaders
+def quantize_colors(colors : np.ndarray) -> np.ndarray:
+    return np.floor(colors[..., :3].astype(np.float32) * np.float32(255.0)).astype(np.int64)
+
+# object id -> owning object id per atlas texel, 0 where no cell is placed, the gather kernel starts from the texel
+def build_cell_owners(rects : dict, atlas_width : int, atlas_height : int, pages : int) -> np.ndarray:
+    cell_owners = np.zeros((pages, atlas_height, atlas_width), dtype = np.float32)
+
+    for object_id, (x, y, width, height, page) in rects.items():
+        cell_owners[page, y:y + height, x:x + width] = float(object_id)
+
+    return cell_owners
+
+# the atlas texel the pixels (xx, yy) of object_ids scatter to, (page, y, x, whether the object has a cell, whether the texel is inside the atlas).
+# The background (id 0) and ids outside of the table have no cell, the combined render shows the background colors as they are
+def atlas_targets(object_ids : np.ndarray, xx : np.ndarray, yy : np.ndarray, viewport_width : int, viewport_height : int, cell_viewports : np.ndarray,
+                  atlas_width : int, atlas_height : int, pages : int):
+    rects, pages_of_pixels = cell_viewport_lookup(object_ids, cell_viewports)
+
+    x_atlas = (xx * rects[..., 2] + viewport_width * rects[..., 0]) // viewport_width
+    y_atlas = (yy * rects[..., 3] + viewport_height * rects[..., 1]) // viewport_height
+
+    has_cell = (rects[..., 2] != 0) & (object_ids >= 1.0) & (object_ids < len(cell_viewports))
+    is_inside = (x_atlas >= 0) & (x_atlas < atlas_width) & (y_atlas >= 0) & (y_atlas < atlas_height) & (pages_of_pixels < pages)
+
+    return pages_of_pixels, y_atlas, x_atlas, has_cell, is_inside
+
+# owner of the given atlas texels, imageLoad outside of the image returns 0
+def texel_owners(cell_owners : np.ndarray, pages : np.ndarray, y : np.ndarray, x : np.ndarray, is_inside : np.ndarray) -> np.ndarray:
+    owners = np.zeros(pages.shape, dtype = np.int64)
+    owners[is_inside] = cell_owners[pages[is_inside], y[is_inside], x[is_inside]].astype(np.int64)
+    return owners
+
+# compute_shader_source_sprite_atlas_render_channels for the viewport rows [row_start, row_start + len(object_ids)),
+# returns the flat atlas texel of every atomic and its (r, g, b, 1) values.
+# Every 4x4 block of the viewport is one invocation, the x loop bound mistakenly tests the row offset so blocks
+# on the right edge of viewports whose width is not a multiple of 4 read outside of the images (id 0, black).
+# With dirty_cells only the atomics into texels of dirty cells are done
+def scatter_rows(object_ids : np.ndarray, colors : np.ndarray, row_start : int, viewport_height : int, cell_viewports : np.ndarray,
+                 atlas_width : int, atlas_height : int, pages : int, dirty_cells : np.ndarray = None, cell_owners : np.ndarray = None):
+    rows, width = object_ids.shape
+    height = viewport_height
+    padded_width = -(-width // 4) * 4
+
+    ids = np.zeros((rows, padded_width), dtype = np.float32)
+    ids[:, :width] = object_ids
+
+    yy, xx = np.mgrid[row_start:row_start + rows, 0:padded_width]
+    processed = (xx // 4) * 4 + yy % 4 < width
+
+    pages_of_pixels, y_atlas, x_atlas, has_cell, is_inside = atlas_targets(ids, xx, yy, width, height, cell_viewports, atlas_width, atlas_height, pages)
+
+    # objects without a cell are skipped, atomics outside of the image are dropped
+    processed &= has_cell & is_inside
+
+    if dirty_cells is not None:
+        processed &= dirty_cells[texel_owners(cell_owners, pages_of_pixels, y_atlas, x_atlas, processed)]
+
+    texels = ((pages_of_pixels * atlas_height + y_atlas) * atlas_width + x_atlas)[processed]
+
+    values = np.ones((rows, padded_width, 4), dtype = np.int64)
+    values[..., :3] = 0
+    values[:, :width, :3] = quantize_colors(colors)
+
+    return texels, values[processed]
+
+# the accumulator texture after all atomics of the scattered (texels, values) parts
+def accumulate(parts : list, atlas_width : int, atlas_height : int, pages : int, is_packed : bool = False) -> np.ndarray:
+    size = pages * atlas_height * atlas_width
+    shape = (pages, atlas_height, atlas_width)
+
+    sums = []
+    for channel in range(4):
+        channel_sum = np.zeros(size, dtype = np.uint64)
+        for texels, values in parts:
+            channel_sum += np.bincount(texels, weights = values[:, channel], minlength = size).astype(np.uint64)
+        sums.append(channel_sum.reshape(shape))
+
+    # the atomics wrap around on overflow
+    if is_packed:
+        layers = [sums[0] + (sums[1] << np.uint64(16)), sums[2] + (sums[3] << np.uint64(16))]
+    else:
+        layers = sums
+
+    accumulator = np.stack([layer.astype(np.uint32) for layer in layers], axis = 1)
+    return accumulator.reshape((pages * len(layers), atlas_height, atlas_width))
+
+# compute_shader_source_sprite_atlas_render_channels, returns the accumulator texture
+def render_channels_atomic(object_ids : np.ndarray, colors : np.ndarray, cell_viewports : np.ndarray,
+                           atlas_width : int, atlas_height : int, pages : int, is_packed : bool = False,
+                           dirty_cells : np.ndarray = None, cell_owners : np.ndarray = None) -> np.ndarray:
+    part = scatter_rows(object_ids, colors, 0, object_ids.shape[0], cell_viewports, atlas_width, atlas_height, pages, dirty_cells, cell_owners)
+    return accumulate([part], atlas_width, atlas_height, pages, is_packed)
+
+# what a pixel scatters, (float bits of its id, r | g << 8 | b << 16 of its quantized color), the background is keyed black
+def compute_pixel_keys(object_ids : np.ndarray, colors : np.ndarray) -> np.ndarray:
+    quantized = (quantize_colors(colors) * (object_ids >= 1.0)[..., None]).astype(np.uint32)
+
+    keys = np.empty(object_ids.shape + (2,), dtype = np.uint32)
+    keys[..., 0] = object_ids.astype(np.float32).view(np.uint32)
+    keys[..., 1] = quantized[..., 0] | (quantized[..., 1] << 8) | (quantized[..., 2] << 16)
+    return keys
+
+# compute_shader_source_sprite_atlas_mark_dirty_cells, the cells whose texels get different sums than with
+# previous_keys: the owners of the texels every changed pixel scattered to and scatters to now.
+# Owner 0 (texels outside of every cell) is never dirty, nothing scatters to it.
+# The cell layout must be the one previous_keys were scattered with
+def mark_dirty_cells(previous_keys : np.ndarray, keys : np.ndarray, cell_viewports : np.ndarray, cell_owners : np.ndarray,
+                     atlas_width : int, atlas_height : int, pages : int) -> np.ndarray:
+    height, width = keys.shape[:2]
+    dirty_cells = np.zeros(len(cell_viewports), dtype = bool)
+
+    yy, xx = np.nonzero((previous_keys != keys).any(axis = 2))
+
+    for frame_keys in (previous_keys, keys):
+        object_ids = frame_keys[yy, xx, 0].view(np.float32)
+        pages_of_pixels, y_atlas, x_atlas, has_cell, is_inside = atlas_targets(object_ids, xx, yy, width, height, cell_viewports,
+                                                                               atlas_width, atlas_height, pages)
+
+        # targets outside of the atlas load owner 0, pixels of objects without a cell mark nothing
+        owners = texel_owners(cell_owners, pages_of_pixels, y_atlas, x_atlas, is_inside)
+        dirty_cells[owners[has_cell]] = True
+
+    dirty_cells[0] = False
+    return dirty_cells
+
+# compute_shader_source_sprite_atlas_merge_channels_to_texture, returns the (pages, h, w, 4) atlas.
+# The shader divides by zero on texels nobody wrote to, the rgba8 store of that is undefined, 0 here
+def merge_channels(accumulator : np.ndarray, is_packed : bool = False) -> np.ndarray:
+    layers = accumulator.reshape((-1, 2 if is_packed else 4) + accumulator.shape[1:])
+
+    if is_packed:
+        sums = [layers[:, 0] & 0xFFFF, layers[:, 0] >> 16, layers[:, 1] & 0xFFFF, layers[:, 1] >> 16]
+    else:
+        sums = [layers[:, channel] for channel in range(4)]
+
+    atlas = np.zeros(sums[0].shape + (4,), dtype = np.float32)
+    scale = sums[3].astype(np.float32) * np.float32(255.0)
+    written = sums[3] > 0
+
+    for channel in range(3):
+        np.divide(sums[channel].astype(np.float32), scale, out = atlas[..., channel], where = written)
+
+    atlas[..., 3] = 1.0
+    return atlas
+
+# compute_shader_source_sprite_atlas_gather, returns the (pages, h, w, 4) atlas.
+# Every atlas texel averages the viewport pixels of its owner that map onto it, the footprint of texel u of
+# a cell with width cw is x in [ceil(u * W / cw), ceil((u + 1) * W / cw)), the inverse of the atomic mapping.
+# Sums over the footprints come from a summed area table of the owner pixels, one per placed cell cropped to the
+# bounding box of its owner's pixels.
+# With dirty_cells only the cells of dirty owners are gathered, see BAD_CpuBackend.render
+def gather(object_ids : np.ndarray, colors : np.ndarray, cell_viewports : np.ndarray, cell_owners : np.ndarray,
+           dirty_cells : np.ndarray = None) -> np.ndarray:
+    height, width = object_ids.shape
+    atlas = np.zeros(cell_owners.shape + (4,), dtype = np.float32)
+    atlas[..., 3] = 1.0
+
+    quantized = quantize_colors(colors)
+
+    for object_id in np.unique(cell_owners):
+        if object_id == 0.0 or object_id >= len(cell_viewports):
+            continue
+
+        if dirty_cells is not None and not dirty_cells[int(object_id)]:
+            continue
+
+        x, y, cell_width, cell_height = cell_viewports[int(object_id), 0, :].astype(np.int64)
+        page = int(cell_viewports[int(object_id), 1, 0])
+
+        mask = object_ids == object_id
+        rows = np.flatnonzero(mask.any(axis = 1))
+        if len(rows) == 0: # nothing to gather, the cell stays black
+            continue
+
+        # the table only covers the bounding box of the owner pixels, footprint sums outside of it are 0
+        columns = np.flatnonzero(mask[rows[0]:rows[-1] + 1].any(axis = 0))
+        box_y0, box_y1 = rows[0], rows[-1] + 1
+        box_x0, box_x1 = columns[0], columns[-1] + 1
+        box_mask = mask[box_y0:box_y1, box_x0:box_x1, None]
+
+        # (count, r, g, b) summed area tables with a leading row and column of zeros
+        values = np.concatenate((box_mask.astype(np.int64), quantized[box_y0:box_y1, box_x0:box_x1] * box_mask), axis = 2)
+        table = np.zeros((box_y1 - box_y0 + 1, box_x1 - box_x0 + 1, 4), dtype = np.int64)
+        table[1:, 1:] = values.cumsum(axis = 0).cumsum(axis = 1)
+
+        u = np.arange(cell_width)
+        v = np.arange(cell_height)
+        x0 = np.clip((u * width + cell_width - 1) // cell_width - box_x0, 0, box_x1 - box_x0)
+        x1 = np.clip(((u + 1) * width + cell_width - 1) // cell_width - box_x0, 0, box_x1 - box_x0)
+        y0 = np.clip((v * height + cell_height - 1) // cell_height - box_y0, 0, box_y1 - box_y0)
+        y1 = np.clip(((v + 1) * height + cell_height - 1) // cell_height - box_y0, 0, box_y1 - box_y0)
+
+        sums = table[y1][:, x1] - table[y0][:, x1] - table[y1][:, x0] + table[y0][:, x0]
+
+        count = sums[..., 0:1].astype(np.float32)
+        cell = atlas[page, y:y + cell_height, x:x + cell_width, :3]
+        np.divide(sums[..., 1:].astype(np.float32), count * np.float32(255.0), out = cell, where = count > 0)
+
+    return atlas
+
+# compute_shader_source_combined_render, returns the (h, w, 4) combined render.
+# The sample coordinates use float32 math like the shader, imageLoad outside of the atlas returns 0
+def combined_render(object_ids : np.ndarray, colors : np.ndarray, cell_viewports : np.ndarray, atlas : np.ndarray) -> np.ndarray:
+    height, width = object_ids.shape
+    pages, atlas_height, atlas_width = atlas.shape[:3]
+
+    cells = np.where(object_ids < len(cell_viewports), object_ids.astype(np.int64), 0)
+    cell_rects = cell_viewports[cells, 0, :]
+    cell_pages = cell_viewports[cells, 1, 0].astype(np.int64)
+
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    x_sample = np.floor(xx / np.float32(width) * cell_rects[..., 2] + cell_rects[..., 0]).astype(np.int64)
+    y_sample = np.floor(yy / np.float32(height) * cell_rects[..., 3] + cell_rects[..., 1]).astype(np.int64)
+
+    inside = (x_sample >= 0) & (x_sample < atlas_width) & (y_sample >= 0) & (y_sample < atlas_height) & (cell_pages < pages)
+    sampled = np.zeros((height, width, 4), dtype = atlas.dtype)
+    sampled[inside] = atlas[cell_pages[inside], y_sample[inside], x_sample[inside]]
+
+    return np.where((object_ids == 0.0)[..., None], colors.astype(atlas.dtype), sampled)
+
+# the value an RGBA8 image stores for normalized floats
+def to_unorm8(values : np.ndarray) -> np.ndarray:
+    return np.round(np.clip(np.nan_to_num(values), 0.0, 1.0) * 255.0).astype(np.uint8)
+
+# Runs the sprite atlas passes (render channels and merge, or gather) and the combined render on the cpu with the
+# inputs of the compute shaders and returns the RGBA8 "Sprite Atlas" (pages, h, w, 4) and "Combined Render" (h, w, 4)
+class BAD_CpuBackend:
+
+    # kernel is "ATOMIC" or "GATHER", cell_owners is needed for "GATHER" and with dirty_cells.
+    # With dirty_cells (see mark_dirty_cells) only the texels owned by dirty cells are computed, the others keep
+    # their values of previous_sprite_atlas, the RGBA8 atlas of the last call with the same cell layout.
+    # Texels outside of every cell are only written by full passes
+    def render(self, object_ids : np.ndarray, colors : np.ndarray, cell_viewports : np.ndarray, atlas_width : int, atlas_height : int,
+               pages : int, kernel : str = "ATOMIC", is_packed : bool = False, cell_owners : np.ndarray = None,
+               dirty_cells : np.ndarray = None, previous_sprite_atlas : np.ndarray = None):
+        if kernel == "GATHER":
+            atlas = gather(object_ids, colors, cell_viewports, cell_owners, dirty_cells)
+        else:
+            accumulator = render_channels_atomic(object_ids, colors, cell_viewports, atlas_width, atlas_height, pages, is_packed, dirty_cells, cell_owners)
+            atlas = merge_channels(accumulator, is_packed)
+
+        # the combined render reads the atlas back from the RGBA8 image
+        sprite_atlas = to_unorm8(atlas)
+
+        if dirty_cells is not None:
+            is_texel_dirty = dirty_cells[cell_owners.astype(np.int64)]
+            sprite_atlas = np.where(is_texel_dirty[..., None], sprite_atlas, previous_sprite_atlas)
+        combined = combined_render(object_ids, colors, cell_viewports, sprite_atlas.astype(np.float32) / np.float32(255.0))
+
+        return sprite_atlas, to_unorm8(combined)
@@ -0,0 +1,216 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Writes sprite atlas frames to disk off the UI thread. BAD_ImageSequenceWriter only deals with numpy arrays and
+# can be used without Blender, BAD_AtlasExporter adds the one frame delayed readback of the atlas texture.
+# Pixels are (pages, height, width, 4) RGBA with row 0 at the bottom like GPUTexture.read(), files are written top down.
+
+BAD_EXPORT_FORMATS = ("PNG", "EXR", "RAW")
+BAD_EXPORT_CROPS = ("CELLS", "PAGES")
+
+# 8 bit RGBA png, zlib releases the gil so the pool threads compress in parallel
+def encode_png(pixels : np.ndarray, compression_level : int = 6) -> bytes:
+    height, width = pixels.shape[:2]
+    scanlines = np.empty((height, 1 + width * 4), dtype = np.uint8)
+    scanlines[:, 0] = 0 # no filter
+    scanlines[:, 1:] = pixels.reshape(height, width * 4)
+
+    def chunk(chunk_type : bytes, data : bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(scanlines.tobytes(), compression_level)) + chunk(b"IEND", b"")
+
+# uncompressed scanline RGBA openexr with 32 bit float channels, values are the atlas values in [0, 1]
+def encode_exr(pixels : np.ndarray) -> bytes:
+    height, width = pixels.shape[:2]
+    values = pixels.astype(np.float32) / np.float32(255.0) if pixels.dtype == np.uint8 else pixels.astype(np.float32)
+
+    def attribute(name : str, attribute_type : str, data : bytes) -> bytes:
+        return name.encode() + b"\0" + attribute_type.encode() + b"\0" + struct.pack("<i", len(data)) + data
+
+    # channels are stored in alphabetical order
+    channels = b"".join(name + b"\0" + struct.pack("<iB3xii", 2, 0, 1, 1) for name in (b"A", b"B", b"G", b"R")) + b"\0"
+    window = struct.pack("<iiii", 0, 0, width - 1, height - 1)
+    header = (struct.pack("<ii", 20000630, 2) +
+              attribute("channels", "chlist", channels) +
+              attribute("compression", "compression", b"\0") +
+              attribute("dataWindow", "box2i", window) +
+              attribute("displayWindow", "box2i", window) +
+              attribute("lineOrder", "lineOrder", b"\0") +
+              attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0)) +
+              attribute("screenWindowCenter", "v2f", struct.pack("<ff", 0.0, 0.0)) +
+              attribute("screenWindowWidth", "float", struct.pack("<f", 1.0)) + b"\0")
+
+    line_size = width * 4 * 4
+    first_line = len(header) + height * 8
+    offsets = first_line + np.arange(height, dtype = np.uint64) * (8 + line_size)
+
+    lines = np.empty((height, 8 + line_size), dtype = np.uint8)
+    lines[:, :4] = np.arange(height, dtype = "<i4")[:, None].view(np.uint8)
+    lines[:, 4:8] = np.frombuffer(struct.pack("<i", line_size), dtype = np.uint8)
+    lines[:, 8:] = values[:, :, [3, 2, 1, 0]].transpose(0, 2, 1).astype("<f4").reshape(height, -1).view(np.uint8)
+
+    return header + offsets.astype("<u8").tobytes() + lines.tobytes()
+
+# .npy with the shape and dtype in its header
+def encode_raw(pixels : np.ndarray) -> bytes:
+    header = np.lib.format.header_data_from_array_1_0(np.ascontiguousarray(pixels))
+    buffer = bytearray()
+
+    class Sink:
+        def write(self, data):
+            buffer.extend(data)
+
+    np.lib.format.write_array_header_1_0(Sink(), header)
+    return bytes(buffer) + np.ascontiguousarray(pixels).tobytes()
+
+BAD_ENCODERS = { "PNG" : (encode_png, ".png"), "EXR" : (encode_exr, ".exr"), "RAW" : (encode_raw, ".npy") }
+
+def write_file(path : str, data : bytes):
+    with open(path, "wb") as file:
+        file.write(data)
+
+# (name, pixels top down) of every image of a frame, cells are object id -> (x, y, width, height, page).
+# "CELLS" writes one image per cell, "PAGES" one image per page cropped to the bounds of its cells
+def crop_frame(atlas : np.ndarray, cells : dict, crop : str) -> list:
+    images = []
+
+    if crop == "CELLS":
+        for object_id, (x, y, width, height, page) in sorted(cells.items()):
+            if page < len(atlas):
+                images.append((f"cell_{object_id:05d}", atlas[page, y:y + height, x:x + width][::-1]))
+    else:
+        for page in range(len(atlas)):
+            rects = np.array([cell[:4] for cell in cells.values() if cell[4] == page], dtype = np.int64).reshape(-1, 4)
+            if len(rects) == 0:
+                continue
+            x0, y0 = rects[:, 0].min(), rects[:, 1].min()
+            x1, y1 = (rects[:, 0] + rects[:, 2]).max(), (rects[:, 1] + rects[:, 3]).max()
+            images.append((f"page_{page + 1:02d}", atlas[page, y0:y1, x0:x1][::-1]))
+
+    return images
+
+class BAD_ImageSequenceWriter:
+
+    # sink(path, bytes) writes one encoded image, files by default, anything else (a dict) for tests.
+    # At most max_pending frames are queued or being encoded, write_frame blocks the caller beyond that
+    def __init__(self, directory : str, format : str = "PNG", crop : str = "CELLS", worker_count : int = 2, max_pending : int = 4, sink = None):
+        if not format in BAD_EXPORT_FORMATS:
+            raise ValueError(f"unknown export format {format!r}, expected one of {', '.join(BAD_EXPORT_FORMATS)}")
+        if not crop in BAD_EXPORT_CROPS:
+            raise ValueError(f"unknown export crop {crop!r}, expected one of {', '.join(BAD_EXPORT_CROPS)}")
+
+        self.m_directory = directory
+        self.m_format = format
+        self.m_crop = crop
+        self.m_sink = sink if sink != None else write_file
+        self.m_executor = ThreadPoolExecutor(max_workers = worker_count, thread_name_prefix = "BAD_ImageSequenceWriter")
+        self.m_slots = threading.BoundedSemaphore(max_pending)
+        self.m_lock = threading.Lock()
+        self.m_pending_count = 0
+        self.m_written_frames = 0
+        self.m_written_bytes = 0
+        self.m_blocked_seconds = 0.0
+        self.m_errors = []
+
+        if sink == None:
+            os.makedirs(directory, exist_ok = True)
+
+    # atlas is (pages, height, width, 4) uint8, the arrays must not be changed by the caller afterwards
+    def write_frame(self, frame : int, atlas : np.ndarray, cells : dict):
+        start = time.perf_counter()
+        self.m_slots.acquire() # back-pressure, waits for a frame to finish when the disk falls behind
+        self.m_blocked_seconds += time.perf_counter() - start
+
+        with self.m_lock:
+            self.m_pending_count += 1
+
+        future = self.m_executor.submit(self.encode_frame, frame, atlas, dict(cells))
+        future.add_done_callback(self.frame_done)
+
+    def encode_frame(self, frame : int, atlas : np.ndarray, cells : dict):
+        encode, extension = BAD_ENCODERS[self.m_format]
+        written_bytes = 0
+
+        for name, pixels in crop_frame(atlas, cells, self.m_crop):
+            data = encode(np.ascontiguousarray(pixels))
+            self.m_sink(os.path.join(self.m_directory, f"{name}_{frame:05d}{extension}"), data)
+            written_bytes += len(data)
+
+        return written_bytes
+
+    def frame_done(self, future):
+        with self.m_lock:
+            self.m_pending_count -= 1
+            if future.exception() != None:
+                self.m_errors.append(future.exception())
+            else:
+                self.m_written_frames += 1
+                self.m_written_bytes += future.result()
+
+        self.m_slots.release()
+
+    # waits for every queued frame
+    def close(self):
+        self.m_executor.shutdown(wait = True)
+
+        for error in self.m_errors:
+            print(f"Warning: sprite atlas export failed: {error}\n")
+
+# Reads the atlas texture one frame late: the texture rendered in frame n is read back in frame n + 1 while the gpu
+# works on the other texture of the pair, so read() does not wait for the compute dispatches just issued.
+class BAD_AtlasExporter:
+
+    def __init__(self, writer : BAD_ImageSequenceWriter):
+        self.m_writer = writer
+        self.m_pending = None # (texture, frame, cells, pages, width, height) rendered last frame
+
+    # texture holds the atlas of frame, the caller renders the next frame into another texture
+    def submit_texture(self, texture, frame : int, cells : dict, pages : int, width : int, height : int):
+        self.flush()
+        self.m_pending = (texture, frame, dict(cells), pages, width, height)
+
+    # atlas already on the cpu (cpu backend), no readback needed
+    def submit_array(self, atlas : np.ndarray, frame : int, cells : dict):
+        self.flush()
+        self.m_writer.write_frame(frame, atlas, cells)
+
+    def flush(self):
+        if self.m_pending == None:
+            return
+
+        texture, frame, cells, pages, width, height = self.m_pending
+        self.m_pending = None
+
+        atlas = np.asarray(texture.read()).reshape(pages, height, width, 4)
+        if not np.issubdtype(atlas.dtype, np.integer): # RGBA8 textures may be read back as floats
+            atlas = np.round(np.clip(atlas, 0.0, 1.0) * 255.0)
+        self.m_writer.write_frame(frame, atlas.astype(np.uint8), cells)
+
+    def close(self):
+        self.flush()
+        self.m_writer.close()
@@ -0,0 +1,131 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import numpy as np
+
+# Bulk mesh extraction using foreach_get into preallocated arrays.
+# The returned arrays are contiguous and can be handed to GPUVertBuf.attr_fill
+# and GPUIndexBuf directly through the buffer protocol.
+
+def extract_vertex_positions(mesh) -> np.ndarray:
+    vertices = np.empty((len(mesh.vertices), 3), dtype = np.float32)
+    mesh.vertices.foreach_get("co", vertices.ravel())
+    return vertices
+
+# mesh.calc_loop_triangles() must have been called before
+def extract_triangle_indices(mesh) -> np.ndarray:
+    indices = np.empty((len(mesh.loop_triangles), 3), dtype = np.uint32)
+    # the rna property is a signed int, foreach_get only takes the fast path
+    # when the buffer format matches so fill through a signed view of the same memory
+    mesh.loop_triangles.foreach_get("vertices", indices.view(np.int32).ravel())
+    return indices
+
+# (2, 3) local space minimum and maximum corner of the vertices
+def compute_bounds(vertices : np.ndarray) -> np.ndarray:
+    if len(vertices) == 0:
+        return np.zeros((2, 3), dtype = np.float32)
+    return np.stack((vertices.min(axis = 0), vertices.max(axis = 0)))
+
+# world space aabbs (n, 2, 3) of local bounds (n, 2, 3) under (n, 4, 4) row major matrices (mathutils layout)
+def transform_bounds(bounds : np.ndarray, matrices : np.ndarray) -> np.ndarray:
+    centers = (bounds[:, 0] + bounds[:, 1]) * 0.5
+    extents = (bounds[:, 1] - bounds[:, 0]) * 0.5
+
+    rotations = matrices[:, :3, :3]
+    world_centers = np.einsum("nij,nj->ni", rotations, centers) + matrices[:, :3, 3]
+    world_extents = np.einsum("nij,nj->ni", np.abs(rotations), extents)
+
+    return np.stack((world_centers - world_extents, world_centers + world_extents), axis = 1)
+
+# (6, 4) planes (a, b, c, d) of the frustum of a row major view projection matrix, normals point inside
+def frustum_planes(matrix : np.ndarray) -> np.ndarray:
+    return np.stack((matrix[3] + matrix[0], matrix[3] - matrix[0],
+                     matrix[3] + matrix[1], matrix[3] - matrix[1],
+                     matrix[3] + matrix[2], matrix[3] - matrix[2]))
+
+# true for the aabbs (n, 2, 3) that are at least partially inside all planes
+def cull_bounds(bounds : np.ndarray, planes : np.ndarray) -> np.ndarray:
+    centers = (bounds[:, 0] + bounds[:, 1]) * 0.5
+    extents = (bounds[:, 1] - bounds[:, 0]) * 0.5
+
+    # signed distance of the box corner furthest along every plane normal
+    distances = centers @ planes[:, :3].T + extents @ np.abs(planes[:, :3]).T + planes[:, 3]
+    return np.all(distances >= 0.0, axis = 1)
+
+# (n, 2) width and height in pixels of the screen space rectangles covering the aabbs (n, 2, 3) projected with a row major
+# view projection matrix, clipped to the width x height viewport. Boxes reaching behind the camera cover the whole viewport
+def screen_extents(bounds : np.ndarray, matrix : np.ndarray, width : int, height : int) -> np.ndarray:
+    corner = np.arange(8)
+
+    corners = np.ones((len(bounds), 8, 4), dtype = np.float32)
+    corners[:, :, 0] = bounds[:, corner & 1, 0]
+    corners[:, :, 1] = bounds[:, (corner >> 1) & 1, 1]
+    corners[:, :, 2] = bounds[:, (corner >> 2) & 1, 2]
+
+    clip = corners @ matrix.T
+    w = clip[:, :, 3]
+    is_in_front = w > 1e-6
+
+    ndc = clip[:, :, :2] / np.where(is_in_front, w, 1.0)[:, :, None]
+    extents = (np.clip(ndc.max(axis = 1), -1.0, 1.0) - np.clip(ndc.min(axis = 1), -1.0, 1.0)) * np.float32(0.5) * np.array((width, height), dtype = np.float32)
+    extents[~is_in_front.all(axis = 1)] = (width, height)
+
+    return extents
+
+# pre-transforms every instance of a mesh into world space for a merged buffer, returns (n * v, 3) positions,
+# (n * v,) per vertex object ids and (n * t, 3) triangle indices starting at vertex_offset
+def merge_instances(vertices : np.ndarray, indices : np.ndarray, matrices : np.ndarray, object_ids : list, vertex_offset : int):
+    positions = np.einsum("nij,vj->nvi", matrices[:, :3, :3], vertices) + matrices[:, None, :3, 3]
+    vertex_object_ids = np.repeat(np.asarray(object_ids, dtype = np.float32), len(vertices))
+    offsets = vertex_offset + np.arange(len(matrices), dtype = np.uint32) * len(vertices)
+    merged_indices = indices[None, :, :] + offsets[:, None, None]
+
+    return positions.reshape(-1, 3).astype(np.float32), vertex_object_ids, merged_indices.reshape(-1, 3)
+
+# interleaves the low 10 bits of v with two zero bits, 3 of them make a 30 bit morton code
+def spread_bits(v : np.ndarray) -> np.ndarray:
+    v = v.astype(np.uint32) & 0x3ff
+    v = (v | (v << 16)) & 0x030000ff
+    v = (v | (v << 8)) & 0x0300f00f
+    v = (v | (v << 4)) & 0x030c30c3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+# sorts the triangles along a z-order curve of their centroids and renumbers the vertices in order of first use
+# (unused vertices go last), nearby triangles then share vertices in the post transform cache and vertex fetches
+# stay close in memory. A vectorized approximation of a vertex cache optimizer, it needs no loop per triangle.
+# Returns the reordered (n, 3) vertices and (t, 3) uint32 indices
+def reorder_for_locality(vertices : np.ndarray, indices : np.ndarray):
+    if len(indices) == 0:
+        return vertices, indices
+
+    centroids = vertices[indices].mean(axis = 1)
+    low = centroids.min(axis = 0)
+    size = np.maximum(centroids.max(axis = 0) - low, np.float32(1e-30))
+    cells = ((centroids - low) / size * 1023.0).astype(np.uint32)
+    codes = spread_bits(cells[:, 0]) | (spread_bits(cells[:, 1]) << 1) | (spread_bits(cells[:, 2]) << 2)
+    indices = indices[np.argsort(codes, kind = "stable")]
+
+    used, first_use = np.unique(indices.ravel(), return_index = True)
+    is_used = np.zeros(len(vertices), dtype = bool)
+    is_used[used] = True
+    order = np.concatenate((used[np.argsort(first_use)], np.flatnonzero(~is_used)))
+
+    remap = np.empty(len(vertices), dtype = np.uint32)
+    remap[order] = np.arange(len(vertices), dtype = np.uint32)
+
+    return vertices[order], remap[indices]
@@ -18,5 +18,89 @@
 BAD_PREFIX = "BAD_PREFIX_"
 BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH = 2048
 BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT = 2048
+BAD_SPRITE_ATLAS_PACKER = "MAXRECTS" # one of bad_packer.BAD_ATLAS_PACKERS
+BAD_SPRITE_ATLAS_REPACK_FRACTION = 0.01 # cells are packed from scratch when more of them are resized or removed at once
+BAD_MAX_SPRITE_ATLAS_PAGES = 8 # pages are layers of 2D array textures, allocated on demand
+# "ATOMIC" scatters viewport pixels into the atlas with atomics, "GATHER" lets every atlas texel average its footprint,
+# gather avoids contended atomics on large objects in small cells but reads the viewport once per placed cell
+BAD_SPRITE_ATLAS_KERNEL = "ATOMIC"
+# every view keeps what each of its pixels scattered at its last atlas pass, the next pass of the view with the same cell
+# layout only clears, accumulates and merges the cells whose pixels changed and the other cells keep their texels.
+# A different view, a new cell layout or a running export on the gpu redoes the whole atlas, texels outside of the
+# cells are only written then
+BAD_SPRITE_ATLAS_TEMPORAL_REUSE = True
 
-BAD_MAX_CELL_VIEWPORTS_SIZE = 100
\ No newline at end of file
+# "GPU" runs the sprite atlas and combined render compute shaders, "CPU" reads the object id and color
+# attachments back and runs the numpy passes of bad_cpu_backend, for machines without compute shaders and for checking
+# the shaders
+BAD_COMPUTE_BACKEND = "GPU"
+# "CPU" rasterizes the object id and linearized depth images with bad_rasterizer instead of drawing them,
+# static batches are not built then since the rasterizer draws the instances from the mesh arrays directly
+BAD_OBJECT_ID_DEPTH_BACKEND = "GPU"
+
+# stage timings of the last BAD_PROFILER_FRAMES rendered frames, averages and p95 are shown in the panel.
+# BAD_PROFILER_GPU_SYNC waits for the gpu around every stage so timings include gpu work, this stalls the pipeline
+BAD_PROFILING = True
+BAD_PROFILER_FRAMES = 240
+BAD_PROFILER_GPU_SYNC = False
+
+# sprite atlas export, format is one of bad_export.BAD_EXPORT_FORMATS and crop one of bad_export.BAD_EXPORT_CROPS.
+# Frames are encoded by a pool of threads, rendering waits when BAD_EXPORT_MAX_PENDING_FRAMES frames are not written yet
+BAD_EXPORT_FORMAT = "PNG"
+BAD_EXPORT_CROP = "CELLS"
+BAD_EXPORT_WORKERS = 2
+BAD_EXPORT_MAX_PENDING_FRAMES = 4
+
+# the pipeline is initialized from a timer in steps of at most BAD_INITIALIZE_BUDGET_MS per tick (one step can take longer),
+# ticks are BAD_INITIALIZE_INTERVAL seconds apart so the ui stays responsive on large files. It renders what is built so far
+BAD_INITIALIZE_BUDGET_MS = 8.0
+BAD_INITIALIZE_INTERVAL = 0.01
+BAD_INITIALIZE_CHUNK_OBJECTS = 1000 # objects whose view frustum test is one step
+
+# new and evicted meshes are read on the main thread and handed to a pool of BAD_MESH_PREPARE_WORKERS threads that
+# reorders them for the vertex cache (BAD_MESH_REORDER) and computes their bounds, render uploads the prepared meshes
+# within BAD_MESH_UPLOAD_BUDGET_MS per frame. Their instances are skipped until then. 0 builds them inline in render,
+# edited meshes are always rebuilt inline
+BAD_MESH_PREPARE_WORKERS = 2
+BAD_MESH_REORDER = True
+BAD_MESH_UPLOAD_BUDGET_MS = 4.0
+BAD_MESH_UPLOAD_INTERVAL = 0.02 # seconds between the redraws that upload pending meshes
+
+# viewport sized textures and framebuffers are allocated in multiples of BAD_RENDER_TARGET_GRANULARITY pixels and the
+# viewport renders into their lower left corner. They are kept while the viewport covers BAD_RENDER_TARGET_MIN_COVERAGE
+# of their area, the targets of the last BAD_RENDER_TARGET_POOL_SIZE sizes are pooled for toggling side panels
+BAD_RENDER_TARGET_GRANULARITY = 128
+BAD_RENDER_TARGET_MIN_COVERAGE = 0.5
+BAD_RENDER_TARGET_POOL_SIZE = 2
+
+# objects with m_is_auto_resolution get BAD_AUTO_RESOLUTION_SCALE texels per pixel of the screen space rectangle
+# covering their bounding box in the view they appear largest in, rounded up to a power of two and clamped by
+# their min and max power. The atlas is only repacked when one of these sizes stayed larger than the cell or more than
+# BAD_AUTO_RESOLUTION_HYSTERESIS_POWERS powers of two smaller, or the object stayed out of view,
+# for BAD_AUTO_RESOLUTION_HYSTERESIS_FRAMES frames in a row
+BAD_AUTO_RESOLUTION_SCALE = 1.0
+BAD_AUTO_RESOLUTION_HYSTERESIS_POWERS = 1
+BAD_AUTO_RESOLUTION_HYSTERESIS_FRAMES = 8
+
+# the object id -> cell table is a RGBA32F texture of 2 texels per cell, it grows by rows at runtime
+BAD_CELL_VIEWPORTS_PER_ROW = 1024
+
+# per instance data of the object id depth pass is stored in a RGBA32F texture
+# as 4 texels of model matrix columns followed by 1 texel holding the object id
+BAD_INSTANCE_DATA_TEXELS = 5
+BAD_INSTANCES_PER_ROW = 512
+
+# instances whose world space bounding box is outside of the view frustum are not drawn and get no atlas cell
+BAD_FRUSTUM_CULLING = True
+
+# opt in, meshes whose instances did not move for the given number of frames are pre-transformed into merged
+# buffers with per vertex object ids and drawn in one call per batch, moving instances go back to instanced drawing
+BAD_STATIC_BATCHING = False
+BAD_STATIC_BATCHING_FRAMES = 30
+BAD_STATIC_BATCHING_MAX_MESH_VERTICES = 10000 # bigger meshes stay instanced, merging them would copy a lot of vertices
+BAD_STATIC_BATCH_MAX_VERTICES = 4 * 1024 * 1024
+
+# per mesh vertex and index buffers are evicted least recently used first above this budget (in bytes)
+# and released when their mesh has not been drawn for the given number of frames
+BAD_MESH_BUFFERS_MEMORY_BUDGET = 512 * 1024 * 1024
+BAD_MESH_BUFFERS_MAX_UNUSED_FRAMES = 600
\ No newline at end of file
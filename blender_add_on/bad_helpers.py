@@ -4,4 +4,10 @@ def contains_prefix(name : str) -> bool:
     return name.startswith(BAD_PREFIX)
 
 def get_name_from_prefixed_name(prefixed_name : str) -> str:
-    return prefixed_name[len(BAD_PREFIX):]
\ No newline at end of file
+    return prefixed_name[len(BAD_PREFIX):]
+
+# display name of a sprite atlas page, the first page keeps the plain name
+def get_sprite_atlas_page_name(page : int) -> str:
+    if page == 0:
+        return "Sprite Atlas"
+    return f"Sprite Atlas {page + 1}"
\ No newline at end of file
@@ -18,6 +18,7 @@
 import bpy
 from . import bad_settings
 from . import bad_menus
+from . import bad_pipeline
 
 class BAD_PT_MainPanel(bpy.types.Panel):
     bl_label = 'BlenderAddOn'
@@ -32,22 +33,161 @@ class BAD_PT_MainPanel(bpy.types.Panel):
         settings = context.object.bad_settings
 
         layout.prop(settings, "m_is_enabled", text = "Is Enabled")
-        col = layout.column(align = False)
-        row = col.row(align = True)
-        if settings.m_toggle_snapping_width:
-            row.prop(settings, "m_render_resolution_width_power", text = "Resolution Width")
-        else:
-            row.prop(settings, "m_render_resolution_width", text = "Resolution Width")
-        row.prop(settings, "m_toggle_snapping_width", text = "")
-        
-        col = layout.column(align = False)
-        row = col.row(align = True)
-        if settings.m_toggle_snapping_height:
-            row.prop(settings, "m_render_resolution_height_power", text = "Resolution Height")
+        layout.prop(settings, "m_is_auto_resolution", text = "Auto Resolution")
+
+        pipeline = bad_pipeline.BAD_Pipeline.pipeline
+
+        if settings.m_is_auto_resolution:
+            col = layout.column(align = False)
+            row = col.row(align = True)
+            row.prop(settings, "m_auto_resolution_min_power", text = "Min Power")
+            row.prop(settings, "m_auto_resolution_max_power", text = "Max Power")
+
+            # the cell the pipeline chose, objects out of view have none
+            cell = pipeline.m_atlas_packer.m_rects.get(settings.m_id) if pipeline != None and pipeline.m_is_render_ready else None
+            row = col.row(align = True)
+            row.label(text = f"Resolution: {cell[2]}x{cell[3]}" if cell != None else "Resolution: Not In View")
         else:
-            row.prop(settings, "m_render_resolution_height", text = "Resolution Height")
-        row.prop(settings, "m_toggle_snapping_height", text = "")
+            col = layout.column(align = False)
+            row = col.row(align = True)
+            if settings.m_toggle_snapping_width:
+                row.prop(settings, "m_render_resolution_width_power", text = "Resolution Width")
+            else:
+                row.prop(settings, "m_render_resolution_width", text = "Resolution Width")
+            row.prop(settings, "m_toggle_snapping_width", text = "")
+
+            col = layout.column(align = False)
+            row = col.row(align = True)
+            if settings.m_toggle_snapping_height:
+                row.prop(settings, "m_render_resolution_height_power", text = "Resolution Height")
+            else:
+                row.prop(settings, "m_render_resolution_height", text = "Resolution Height")
+            row.prop(settings, "m_toggle_snapping_height", text = "")
 
         col = layout.column(align = False)
         row = col.row(align = True)
-        row.label(text = str(settings.m_id))
\ No newline at end of file
+        row.label(text = str(settings.m_id))
+
+        if pipeline != None and not pipeline.m_is_initialized:
+            col = layout.column(align = False)
+            row = col.row(align = True)
+            row.label(text = f"Initializing: {pipeline.m_initialized_objects}/{pipeline.m_initialize_object_count} Objects, {pipeline.m_initialize_seconds * 1000.0:.0f} ms in {pipeline.m_initialize_ticks} Ticks")
+
+        if pipeline != None and pipeline.m_is_render_ready:
+            col = layout.column(align = False)
+            row = col.row(align = True)
+            row.label(text = f"Atlas Occupancy: {pipeline.m_atlas_packer.occupancy() * 100.0:.1f}% ({pipeline.m_atlas_packer.page_count()} Pages)")
+            row = col.row(align = True)
+            row.label(text = f"Cell Layout Rebuilds: {pipeline.m_cell_layout_rebuild_count}")
+            row = col.row(align = True)
+            row.label(text = f"Frame Cache: {pipeline.m_frame_cache_hits} Hits, {pipeline.m_frame_cache_misses} Misses")
+            row = col.row(align = True)
+            row.label(text = f"Views: {len(pipeline.m_views)}, {pipeline.m_rendered_view_count} Rendered Last Frame, {pipeline.m_view_cache_hits} Skipped")
+            row = col.row(align = True)
+            row.label(text = f"Culling: {pipeline.m_id_pass_instances} Drawn, {pipeline.m_culled_instances} Culled, {pipeline.m_culling_seconds * 1000.0:.2f} ms")
+            if len(pipeline.m_static_uids) > 0:
+                row = col.row(align = True)
+                row.label(text = f"Static Batches: {len(pipeline.m_static_batches)} ({len(pipeline.m_static_uids)} Meshes, {pipeline.m_static_batch_rebuild_count} Rebuilds)")
+            row = col.row(align = True)
+            row.label(text = f"Cell Table: {len(pipeline.m_cell_viewports)} Cells, Upload {pipeline.m_cell_viewports_upload_seconds * 1000.0:.2f} ms")
+            preparer = pipeline.m_mesh_preparer
+            if preparer.m_worker_count > 0:
+                row = col.row(align = True)
+                row.label(text = f"Mesh Uploads: {len(pipeline.m_pending_meshes)} Pending, {preparer.m_uploaded_count} Uploaded, {pipeline.m_mesh_upload_seconds * 1000.0:.1f} ms")
+            render_target_pools = [view.m_render_targets for view in pipeline.m_views.values()]
+            row = col.row(align = True)
+            row.label(text = f"Render Targets: {', '.join(f'{view.m_render_target_dimensions[0]}x{view.m_render_target_dimensions[1]}' for view in pipeline.m_views.values())}, "
+                             f"{sum(pool.m_allocation_count for pool in render_target_pools)} Allocations ({sum(pool.m_allocation_seconds for pool in render_target_pools) * 1000.0:.0f} ms), "
+                             f"{sum(pool.m_reuse_count for pool in render_target_pools)} Reuses")
+            row = col.row(align = True)
+            row.label(text = f"Shaders: {pipeline.m_shaders.m_compiled_count} Compiled ({pipeline.m_shaders.m_compile_seconds * 1000.0:.0f} ms), {pipeline.m_shaders.m_cached_count} Cached, Initialize {pipeline.m_initialize_seconds * 1000.0:.0f} ms")
+            memory, traffic = pipeline.sprite_atlas_statistics()
+            row = col.row(align = True)
+            if traffic != None:
+                row.label(text = f"Sprite Atlas: {memory / 2**20:.0f} MB, {traffic / 2**20:.0f} MB/Frame" + (" (16 Bit Sums)" if pipeline.m_is_sprite_atlas_packed else ""))
+            else:
+                row.label(text = f"Sprite Atlas: {memory / 2**20:.0f} MB")
+            row = col.row(align = True)
+            row.label(text = f"Atlas Passes: {pipeline.m_sprite_atlas_incremental_passes} Incremental, {pipeline.m_sprite_atlas_full_passes} Full"
+                             + (f", {pipeline.m_dirty_cell_count} Dirty Cells Last Pass" if pipeline.m_dirty_cell_count != None else ""))
+            if pipeline.m_object_id_depth_backend == "CPU":
+                row = col.row(align = True)
+                row.label(text = f"Rasterizer: {pipeline.m_rasterizer_seconds * 1000.0:.1f} ms")
+            if pipeline.m_compute_backend == "CPU":
+                row = col.row(align = True)
+                row.label(text = f"CPU Backend: {pipeline.m_cpu_backend_seconds * 1000.0:.1f} ms")
+
+            col = layout.column(align = False)
+            row = col.row(align = True)
+            exporter = pipeline.m_atlas_exporter
+            if exporter != None:
+                writer = exporter.m_writer
+                row.label(text = f"Atlas Export: {writer.m_written_frames} Frames, {writer.m_written_bytes / 2**20:.1f} MB, {writer.m_pending_count} Pending, Blocked {writer.m_blocked_seconds * 1000.0:.0f} ms")
+                row = col.row(align = True)
+                row.operator(BAD_OT_StopAtlasExport.bl_idname, text = "Stop Atlas Export")
+            else:
+                row.operator(BAD_OT_StartAtlasExport.bl_idname, text = "Export Atlas Sequence")
+
+            if pipeline.m_profiler.m_is_enabled:
+                col = layout.column(align = False)
+                row = col.row(align = True)
+                row.label(text = "Stage Timings (" + ("GPU Synchronized" if pipeline.m_profiler.is_gpu_synchronized() else "CPU") + ")")
+                for name, (average, p95, frames) in pipeline.m_profiler.statistics().items():
+                    row = col.row(align = True)
+                    row.label(text = f"{name}: {average:.2f} ms Avg, {p95:.2f} ms P95")
+                row = col.row(align = True)
+                row.operator(BAD_OT_ExportTrace.bl_idname, text = "Export Trace")
+
+class BAD_OT_ExportTrace(bpy.types.Operator):
+    bl_label = 'Export Trace'
+    bl_idname = 'bad.export_trace'
+    bl_description = 'Write the stage timings of the last frames as a Chrome trace (chrome://tracing, ui.perfetto.dev)'
+
+    filepath : bpy.props.StringProperty(subtype = "FILE_PATH", default = "bad_trace.json")
+
+    def execute(self, context):
+        pipeline = bad_pipeline.BAD_Pipeline.pipeline
+        if pipeline == None:
+            return {'CANCELLED'}
+
+        pipeline.m_profiler.export_chrome_trace(bpy.path.abspath(self.filepath))
+        self.report({'INFO'}, f"Trace of {len(pipeline.m_profiler.m_frames)} frames written to {self.filepath}")
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class BAD_OT_StartAtlasExport(bpy.types.Operator):
+    bl_label = 'Export Atlas Sequence'
+    bl_idname = 'bad.start_atlas_export'
+    bl_description = 'Write the sprite atlas of every rendered frame to a directory until the export is stopped'
+
+    directory : bpy.props.StringProperty(subtype = "DIR_PATH")
+
+    def execute(self, context):
+        pipeline = bad_pipeline.BAD_Pipeline.pipeline
+        if pipeline == None:
+            return {'CANCELLED'}
+
+        pipeline.start_atlas_export(bpy.path.abspath(self.directory))
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class BAD_OT_StopAtlasExport(bpy.types.Operator):
+    bl_label = 'Stop Atlas Export'
+    bl_idname = 'bad.stop_atlas_export'
+    bl_description = 'Write the frames still queued and stop exporting the sprite atlas'
+
+    def execute(self, context):
+        pipeline = bad_pipeline.BAD_Pipeline.pipeline
+        if pipeline == None or pipeline.m_atlas_exporter == None:
+            return {'CANCELLED'}
+
+        frames = pipeline.m_atlas_exporter.m_writer.m_written_frames
+        pipeline.stop_atlas_export()
+        self.report({'INFO'}, f"Atlas export stopped after {frames} frames")
+        return {'FINISHED'}
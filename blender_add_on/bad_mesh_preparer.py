@@ -0,0 +1,156 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .bad_geometry import compute_bounds, reorder_for_locality
+
+# Prepares mesh buffer data off the UI thread. Blender data may only be read on the main thread, so the caller reads
+# the vertex positions and loop triangles into numpy arrays and the pool packs them, reorders them for the vertex
+# cache and computes their bounds. Finished meshes wait in a queue that the main thread drains under a time budget
+# to upload them. Only deals with numpy arrays and can be used without Blender.
+class BAD_MeshPreparer:
+
+    def __init__(self, worker_count : int = 2, is_reordering : bool = True):
+        self.m_worker_count = worker_count
+        self.m_is_reordering = is_reordering
+        self.m_executor = None # started on first use
+
+        # (uid, request, vertices, indices, bounds, session_uid) of prepared meshes, filled by the pool threads.
+        # The arrays are None when preparing the mesh failed
+        self.m_ready = queue.SimpleQueue()
+        # uid -> number of its newest request, results of older or cancelled requests are dropped.
+        # Only touched by the main thread
+        self.m_requests = {}
+        self.m_request_counter = 0
+
+        self.m_lock = threading.Lock()
+        self.m_prepared_count = 0
+        self.m_prepare_seconds = 0.0 # summed over the pool threads
+        self.m_uploaded_count = 0
+        self.m_dropped_count = 0
+        self.m_failed_count = 0
+        self.m_drain_seconds = 0.0 # of the last drain
+        self.m_errors = []
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        if self.m_executor == None:
+            self.m_executor = ThreadPoolExecutor(max_workers = self.m_worker_count, thread_name_prefix = "BAD_MeshPreparer")
+        return self.m_executor
+
+    def is_preparing(self, uid : int) -> bool:
+        return uid in self.m_requests
+
+    def pending_count(self) -> int:
+        return len(self.m_requests)
+
+    # vertices (n, 3) float32 and indices (t, 3) uint32 must not be changed by the caller afterwards,
+    # a newer submit of the same uid replaces the older one
+    def submit(self, uid : int, vertices : np.ndarray, indices : np.ndarray, session_uid : int = None):
+        self.m_request_counter += 1
+        self.m_requests[uid] = self.m_request_counter
+        self.get_executor().submit(self.prepare, uid, self.m_request_counter, vertices, indices, session_uid)
+
+    def cancel(self, uid : int):
+        self.m_requests.pop(uid, None)
+
+    def prepare(self, uid : int, request : int, vertices : np.ndarray, indices : np.ndarray, session_uid : int):
+        start = time.perf_counter()
+
+        try:
+            vertices = np.ascontiguousarray(vertices, dtype = np.float32)
+            indices = np.ascontiguousarray(indices, dtype = np.uint32)
+
+            if self.m_is_reordering:
+                try:
+                    vertices, indices = reorder_for_locality(vertices, indices)
+                except Exception as error: # the mesh is still uploaded, just in its original order
+                    with self.m_lock:
+                        self.m_errors.append(error)
+
+            bounds = compute_bounds(vertices)
+        except Exception as error: # the future is never looked at, drain reports the failure instead
+            with self.m_lock:
+                self.m_errors.append(error)
+            vertices = None
+            indices = None
+            bounds = None
+
+        self.m_ready.put((uid, request, vertices, indices, bounds, session_uid))
+
+        with self.m_lock:
+            self.m_prepared_count += 1
+            self.m_prepare_seconds += time.perf_counter() - start
+
+    # calls upload(uid, vertices, indices, bounds, session_uid) on the calling thread for prepared meshes until
+    # budget_seconds are used up, at least one upload per call. Meshes that failed to prepare or upload are passed to
+    # fail(uid, session_uid) instead, their requests are done either way. Returns the number of uploaded meshes
+    def drain(self, budget_seconds : float, upload, fail = None) -> int:
+        start = time.perf_counter()
+        count = 0
+
+        while count == 0 or time.perf_counter() - start < budget_seconds:
+            try:
+                uid, request, vertices, indices, bounds, session_uid = self.m_ready.get_nowait()
+            except queue.Empty:
+                break
+
+            if self.m_requests.get(uid) != request:
+                self.m_dropped_count += 1
+                continue
+
+            del self.m_requests[uid]
+
+            if vertices is None:
+                self.fail(fail, uid, session_uid)
+                continue
+
+            try:
+                upload(uid, vertices, indices, bounds, session_uid)
+            except Exception as error:
+                self.m_errors.append(error)
+                self.fail(fail, uid, session_uid)
+                continue
+
+            count += 1
+
+        self.m_uploaded_count += count
+        self.m_drain_seconds = time.perf_counter() - start
+
+        return count
+
+    def fail(self, fail, uid : int, session_uid : int):
+        self.m_failed_count += 1
+        if fail != None:
+            fail(uid, session_uid)
+
+    # drops everything not uploaded yet
+    def close(self):
+        if self.m_executor != None:
+            self.m_executor.shutdown(wait = False, cancel_futures = True)
+            self.m_executor = None
+
+        self.m_requests.clear()
+
+        for error in self.m_errors:
+            print(f"Warning: mesh preparation failed: {error}\n")
+        self.m_errors.clear()
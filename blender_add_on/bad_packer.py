@@ -0,0 +1,383 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+# Rectangle packers for the sprite atlas cells.
+# Pure python on purpose (no bpy / gpu) so they can run headless.
+# Rectangles are (x, y, width, height) in texels with the origin at the bottom left of the atlas.
+
+class BAD_AtlasPacker:
+
+    def __init__(self, width : int, height : int):
+        self.m_width = width
+        self.m_height = height
+        self.m_rects = {} # key -> (x, y, width, height)
+        self.m_used_area = 0
+        self.reset()
+
+    # packer specific free space structure
+    def reset(self):
+        pass
+
+    def find_position(self, width : int, height : int):
+        return None
+
+    def occupy(self, x : int, y : int, width : int, height : int):
+        pass
+
+    def release(self, x : int, y : int, width : int, height : int):
+        pass
+
+    def clear(self):
+        self.m_rects.clear()
+        self.m_used_area = 0
+        self.reset()
+
+    def get_rect(self, key):
+        return self.m_rects.get(key)
+
+    # returns False when the rectangle does not fit, the key is left unplaced in that case
+    def insert(self, key, width : int, height : int) -> bool:
+        self.remove(key)
+
+        if width <= 0 or height <= 0 or width > self.m_width or height > self.m_height:
+            return False
+
+        position = self.find_position(width, height)
+
+        if position == None:
+            return False
+
+        self.occupy(position[0], position[1], width, height)
+        self.m_rects[key] = (position[0], position[1], width, height)
+        self.m_used_area += width * height
+        return True
+
+    def remove(self, key) -> bool:
+        rect = self.m_rects.pop(key, None)
+
+        if rect == None:
+            return False
+
+        self.m_used_area -= rect[2] * rect[3]
+        self.release(*rect)
+        return True
+
+    # incrementally brings the packer to sizes (key -> (width, height)), only keys that were removed
+    # or whose size changed are touched, returns the keys that did not fit. When more than repack_fraction of the
+    # placed keys changed everything is packed again, removing many rectangles fragments the free space and costs more
+    def update(self, sizes : dict, repack_fraction : float = 1.0) -> list:
+        changed_keys = [key for key in self.m_rects if sizes.get(key) != self.m_rects[key][2:4]]
+
+        if len(changed_keys) > repack_fraction * len(self.m_rects):
+            self.clear()
+        else:
+            for key in changed_keys:
+                self.remove(key)
+
+        failed = []
+
+        # larger cells first, they are the hardest to place
+        for key, size in sorted(sizes.items(), key = lambda item: -max(item[1][0], item[1][1]) * (1 << 16) - item[1][0] * item[1][1]):
+            if not key in self.m_rects:
+                if not self.insert(key, size[0], size[1]):
+                    failed.append(key)
+
+        return failed
+
+    # fraction of the atlas area covered by placed rectangles
+    def occupancy(self) -> float:
+        return self.m_used_area / float(self.m_width * self.m_height)
+
+def intersects(a : tuple, b : tuple) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+def contains(a : tuple, b : tuple) -> bool:
+    return a[0] <= b[0] and a[1] <= b[1] and b[0] + b[2] <= a[0] + a[2] and b[1] + b[3] <= a[1] + a[3]
+
+def prune_free_rects(free_rects : list) -> list:
+    pruned = []
+
+    for i, a in enumerate(free_rects):
+        is_contained = False
+        for j, b in enumerate(free_rects):
+            # of two equal rectangles only the first one is kept
+            if i != j and contains(b, a) and (a != b or j < i):
+                is_contained = True
+                break
+        if not is_contained:
+            pruned.append(a)
+
+    return pruned
+
+# merges free rectangles that share a full edge, used to regrow free space after removals
+def merge_free_rects(free_rects : list) -> list:
+    is_merged = True
+
+    while is_merged:
+        is_merged = False
+        for i in range(len(free_rects)):
+            a = free_rects[i]
+            for j in range(i + 1, len(free_rects)):
+                b = free_rects[j]
+                merged = None
+                if a[1] == b[1] and a[3] == b[3] and (a[0] + a[2] == b[0] or b[0] + b[2] == a[0]):
+                    merged = (min(a[0], b[0]), a[1], a[2] + b[2], a[3])
+                elif a[0] == b[0] and a[2] == b[2] and (a[1] + a[3] == b[1] or b[1] + b[3] == a[1]):
+                    merged = (a[0], min(a[1], b[1]), a[2], a[3] + b[3])
+                if merged != None:
+                    free_rects[i] = merged
+                    del free_rects[j]
+                    is_merged = True
+                    break
+            if is_merged:
+                break
+
+    return free_rects
+
+# MaxRects with the best short side fit heuristic (Jylanki, A Thousand Ways to Pack the Bin)
+class BAD_MaxRectsPacker(BAD_AtlasPacker):
+
+    def reset(self):
+        self.m_free_rects = [(0, 0, self.m_width, self.m_height)]
+
+    def find_position(self, width : int, height : int):
+        best_position = None
+        best_short_side = None
+        best_long_side = None
+
+        for free_rect in self.m_free_rects:
+            if free_rect[2] >= width and free_rect[3] >= height:
+                leftover_horizontal = free_rect[2] - width
+                leftover_vertical = free_rect[3] - height
+                short_side = min(leftover_horizontal, leftover_vertical)
+                long_side = max(leftover_horizontal, leftover_vertical)
+
+                if best_position == None or (short_side, long_side) < (best_short_side, best_long_side):
+                    best_position = (free_rect[0], free_rect[1])
+                    best_short_side = short_side
+                    best_long_side = long_side
+
+        return best_position
+
+    def occupy(self, x : int, y : int, width : int, height : int):
+        rect = (x, y, width, height)
+        free_rects = []
+
+        for free_rect in self.m_free_rects:
+            if not intersects(free_rect, rect):
+                free_rects.append(free_rect)
+                continue
+
+            # split the free rectangle into the up to four maximal rectangles around rect
+            if x > free_rect[0]:
+                free_rects.append((free_rect[0], free_rect[1], x - free_rect[0], free_rect[3]))
+            if x + width < free_rect[0] + free_rect[2]:
+                free_rects.append((x + width, free_rect[1], free_rect[0] + free_rect[2] - x - width, free_rect[3]))
+            if y > free_rect[1]:
+                free_rects.append((free_rect[0], free_rect[1], free_rect[2], y - free_rect[1]))
+            if y + height < free_rect[1] + free_rect[3]:
+                free_rects.append((free_rect[0], y + height, free_rect[2], free_rect[1] + free_rect[3] - y - height))
+
+        self.m_free_rects = prune_free_rects(free_rects)
+
+    def release(self, x : int, y : int, width : int, height : int):
+        self.m_free_rects.append((x, y, width, height))
+        self.m_free_rects = prune_free_rects(merge_free_rects(self.m_free_rects))
+
+        if len(self.m_rects) == 0:
+            self.reset()
+
+# Skyline bottom left, space freed below the skyline is kept in a list of holes
+# that are filled first (the waste map of Jylanki's SkylineBinPack)
+class BAD_SkylinePacker(BAD_AtlasPacker):
+
+    def reset(self):
+        self.m_skyline = [[0, 0, self.m_width]] # [x, y, width] nodes from left to right
+        self.m_holes = []
+
+    # y where a rectangle of width starting at node index rests on the skyline, None if it does not fit
+    def fit(self, index : int, width : int, height : int):
+        x = self.m_skyline[index][0]
+
+        if x + width > self.m_width:
+            return None
+
+        y = 0
+        width_left = width
+
+        while width_left > 0:
+            y = max(y, self.m_skyline[index][1])
+            if y + height > self.m_height:
+                return None
+            width_left -= self.m_skyline[index][2]
+            index += 1
+
+        return y
+
+    def find_position(self, width : int, height : int):
+        best_position = None
+        best_area = None
+
+        for hole in self.m_holes:
+            if hole[2] >= width and hole[3] >= height and (best_area == None or hole[2] * hole[3] < best_area):
+                best_position = (hole[0], hole[1])
+                best_area = hole[2] * hole[3]
+
+        if best_position != None:
+            return best_position
+
+        best_top = None
+        best_node_width = None
+
+        for index, node in enumerate(self.m_skyline):
+            y = self.fit(index, width, height)
+
+            if y != None and (best_top == None or (y + height, node[2]) < (best_top, best_node_width)):
+                best_position = (node[0], y)
+                best_top = y + height
+                best_node_width = node[2]
+
+        return best_position
+
+    # makes sure a node starts at x
+    def split_at(self, x : int):
+        for index, node in enumerate(self.m_skyline):
+            if node[0] == x:
+                return
+            if node[0] < x < node[0] + node[2]:
+                self.m_skyline.insert(index + 1, [x, node[1], node[0] + node[2] - x])
+                node[2] = x - node[0]
+                return
+
+    def merge_skyline(self):
+        index = 0
+        while index + 1 < len(self.m_skyline):
+            if self.m_skyline[index][1] == self.m_skyline[index + 1][1]:
+                self.m_skyline[index][2] += self.m_skyline[index + 1][2]
+                del self.m_skyline[index + 1]
+            else:
+                index += 1
+
+    def occupy(self, x : int, y : int, width : int, height : int):
+        rect = (x, y, width, height)
+
+        for index, hole in enumerate(self.m_holes):
+            if contains(hole, rect):
+                # guillotine split of the hole into the space right of and above rect
+                del self.m_holes[index]
+                if hole[0] + hole[2] > x + width:
+                    self.m_holes.append((x + width, hole[1], hole[0] + hole[2] - x - width, height))
+                if hole[1] + hole[3] > y + height:
+                    self.m_holes.append((hole[0], y + height, hole[2], hole[1] + hole[3] - y - height))
+                return
+
+        self.split_at(x)
+        if x + width < self.m_width:
+            self.split_at(x + width)
+
+        for node in self.m_skyline:
+            if x <= node[0] < x + width:
+                # the space between the old skyline and the bottom of rect becomes a hole
+                if node[1] < y:
+                    self.m_holes.append((node[0], node[1], node[2], y - node[1]))
+                node[1] = y + height
+
+        self.merge_skyline()
+
+    def release(self, x : int, y : int, width : int, height : int):
+        if len(self.m_rects) == 0:
+            self.reset()
+            return
+
+        self.split_at(x)
+        if x + width < self.m_width:
+            self.split_at(x + width)
+
+        nodes = [node for node in self.m_skyline if x <= node[0] < x + width]
+
+        if all(node[1] == y + height for node in nodes):
+            # nothing rests on top of the rectangle, lower the skyline
+            for node in nodes:
+                node[1] = y
+        else:
+            self.m_holes.append((x, y, width, height))
+            self.m_holes = prune_free_rects(merge_free_rects(self.m_holes))
+
+        self.merge_skyline()
+
+BAD_ATLAS_PACKERS = {
+    "MAXRECTS" : BAD_MaxRectsPacker,
+    "SKYLINE" : BAD_SkylinePacker,
+}
+
+def create_atlas_packer(name : str, width : int, height : int) -> BAD_AtlasPacker:
+    return BAD_ATLAS_PACKERS[name](width, height)
+
+# Atlas made of up to max_pages pages of the same size, each page has its own packer of the given kind.
+# Pages are added on demand when a rectangle fits in none of the existing ones and trailing empty pages are dropped.
+# Rectangles are (x, y, width, height, page).
+class BAD_AtlasPages(BAD_AtlasPacker):
+
+    def __init__(self, name : str, width : int, height : int, max_pages : int):
+        self.m_name = name
+        self.m_max_pages = max_pages
+        super().__init__(width, height)
+
+    def reset(self):
+        self.m_pages = [create_atlas_packer(self.m_name, self.m_width, self.m_height)]
+
+    def page_count(self) -> int:
+        return len(self.m_pages)
+
+    def insert(self, key, width : int, height : int) -> bool:
+        self.remove(key)
+
+        for page_index, page in enumerate(self.m_pages):
+            if page.insert(key, width, height):
+                self.m_rects[key] = page.get_rect(key) + (page_index,)
+                self.m_used_area += width * height
+                return True
+
+        if len(self.m_pages) >= self.m_max_pages:
+            return False
+
+        page = create_atlas_packer(self.m_name, self.m_width, self.m_height)
+
+        if not page.insert(key, width, height):
+            return False # larger than a page
+
+        self.m_pages.append(page)
+        self.m_rects[key] = page.get_rect(key) + (len(self.m_pages) - 1,)
+        self.m_used_area += width * height
+        return True
+
+    def remove(self, key) -> bool:
+        rect = self.m_rects.pop(key, None)
+
+        if rect == None:
+            return False
+
+        self.m_used_area -= rect[2] * rect[3]
+        self.m_pages[rect[4]].remove(key)
+
+        while len(self.m_pages) > 1 and len(self.m_pages[-1].m_rects) == 0:
+            self.m_pages.pop()
+
+        return True
+
+    def occupancy(self) -> float:
+        return self.m_used_area / float(self.m_width * self.m_height * len(self.m_pages))
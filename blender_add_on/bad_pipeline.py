@@ -15,9 +15,13 @@
 #  All rights reserved.
 #  ***** GPL LICENSE BLOCK *****
 
+from collections import OrderedDict
 from math import ceil
+import time
 from .bad_globals import *
 
+import numpy as np
+
 import bpy
 import gpu
 from gpu_extras.batch import batch_for_shader
@@ -27,33 +31,77 @@ from .bad_shaders import *
 import gpu
 
 from .bad_helpers import *
+from .bad_geometry import extract_vertex_positions, extract_triangle_indices, compute_bounds, transform_bounds, \
+    frustum_planes, cull_bounds, screen_extents, merge_instances
+from .bad_resources import BAD_MeshResourceManager
+from .bad_mesh_preparer import BAD_MeshPreparer
+from .bad_views import BAD_View, find_view_regions
+from .bad_packer import BAD_AtlasPages
+from .bad_rasterizer import BAD_Rasterizer
+from .bad_profiler import BAD_Profiler
+from .bad_export import BAD_ImageSequenceWriter, BAD_AtlasExporter
+from .bad_shader_cache import BAD_ShaderDescription, BAD_ShaderLibrary
+from .bad_cpu_backend import build_cell_owners, compute_pixel_keys, mark_dirty_cells, max_contributors, sprite_atlas_layers_per_page, \
+    sprite_atlas_memory_bytes, sprite_atlas_frame_traffic_bytes, BAD_MAX_PACKED_CONTRIBUTORS, BAD_CpuBackend
 
 from bpy.app.handlers import persistent
 
-# TODO: add support for realtime mesh editing 
+# only records which meshes changed, the rebuild happens once per mesh in the next BAD_Pipeline.render
+# no matter how many depsgraph updates arrived in between
 @persistent
 def mesh_update_handler(scene, depsgraph):
+    if BAD_Pipeline.pipeline == None:
+        return
+
+    # any update (transforms, geometry, visibility, materials, bad_settings) invalidates the cached frame
+    BAD_Pipeline.pipeline.m_scene_version += 1
+
     for update in depsgraph.updates:
-        if isinstance(update.id, bpy.types.Object) and isinstance(update.id, bpy.types.Mesh):
-            mesh = update.id
-            mesh.calc_loop_triangles()
-            
-            if BAD_Pipeline.pipeline != None:
-                BAD_Pipeline.pipeline.update_vertex_buffer_data(mesh)
-                BAD_Pipeline.pipeline.update_index_buffer_data(mesh)
+        # depsgraph updates hold evaluated ids, buffers are keyed by the original mesh
+        id = update.id.original
+
+        # bad_settings changes tag the object, only those that touch the atlas layout set m_is_resolution_dirty
+        if isinstance(id, bpy.types.Object) and id.bad_settings.m_is_resolution_dirty:
+            BAD_Pipeline.pipeline.m_is_cell_layout_dirty = True
+
+        if not update.is_updated_geometry: # transform only updates do not touch the buffers
+            continue
+
+        if isinstance(id, bpy.types.Object) and isinstance(id.data, bpy.types.Mesh):
+            BAD_Pipeline.pipeline.mark_mesh_dirty(id.data)
+        elif isinstance(id, bpy.types.Mesh):
+            BAD_Pipeline.pipeline.mark_mesh_dirty(id)
 
-# does not support split views(multiple view 3ds)
-# TODO: add support for split views
+# redraws the image editors of all windows, BAD_Pipeline.render runs in their draw handler
+def tag_image_editors_redraw():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "IMAGE_EDITOR":
+                area.tag_redraw()
+
+# the image editors only redraw on user interaction, this keeps them redrawing while meshes are pending
+# so their buffers get read and uploaded by BAD_Pipeline.render
+def redraw_pending_meshes():
+    if BAD_Pipeline.pipeline == None or len(BAD_Pipeline.pipeline.m_pending_meshes) == 0:
+        return None
+
+    tag_image_editors_redraw()
+    return BAD_MESH_UPLOAD_INTERVAL
+
+# renders every 3d view of the windows showing the scene, see BAD_View for what is kept per view
 class BAD_Pipeline:
 
     pipeline = None
 
+    # time sliced pipelines are initialized by calling continue_initialize from a timer, see BAD_INITIALIZE_BUDGET_MS
     @staticmethod
-    def create_pipeline():
+    def create_pipeline(is_time_sliced : bool = False):
         if BAD_Pipeline.pipeline == None:
             BAD_Pipeline.pipeline = BAD_Pipeline()
-            BAD_Pipeline.pipeline.initialize()
+            BAD_Pipeline.pipeline.begin_initialize()
 
+            if not is_time_sliced:
+                BAD_Pipeline.pipeline.continue_initialize(float("inf"))
 
     @staticmethod
     def delete_pipeline():
@@ -63,20 +111,29 @@ class BAD_Pipeline:
 
     def __init__(self):
         self.m_object_id_counter = 1 # ids are not zero indexed, 0 means not an object
+        self.m_object_id_owners = {} # object id -> session uid of the object it was assigned to
         # any fragments with id = 0 are rendered from the original image
         # declare member variables
-        self.m_texture_color_attachment_object_id = None
-        self.m_texture_color_attachment_linearized_depth = None
-        self.m_texture_depth_attachment = None
-
         self.m_texture_sprite_atlas_r = None
         self.m_texture_sprite_atlas_g = None
         self.m_texture_sprite_atlas_b = None
         self.m_texture_sprite_atlas = None
+        self.m_texture_sprite_atlas_back = None # the other atlas of the pair while exporting, see export_sprite_atlas
+        self.m_sprite_atlas_pixels = None # RGBA8 atlas of the last frame when the cpu backend made it
+
+        # (view key, cell layout version) of the last atlas pass, the next pass of that view with that layout only redoes
+        # the dirty cells flagged in m_texture_dirty_cells, see BAD_SPRITE_ATLAS_TEMPORAL_REUSE
+        self.m_sprite_atlas_history = None
+        self.m_texture_dirty_cells = None
+        self.m_sprite_atlas_incremental_passes = 0
+        self.m_sprite_atlas_full_passes = 0
+        self.m_dirty_cell_count = None # cells redone by the last incremental pass, only known to the cpu backend
+
+        # region pointer -> BAD_View of every 3d view, views of closed areas are dropped in update_views
+        self.m_views = {}
+        self.m_rendered_view_count = 0 # views rendered by the last frame that was not a cache hit
+        self.m_view_cache_hits = 0 # views that kept their textures because their signature did not change
 
-        self.m_viewport_dimensions = (0, 0)
-        self.m_framebuffer_view_3d = None
-        self.m_framebuffer_offscreen = None
         self.m_is_in_image_debug_mode = True
         self.m_image_object_id = None
         self.m_image_depth_texture = None # uses linearized_depth to debug depth
@@ -86,13 +143,20 @@ class BAD_Pipeline:
 
         self.m_texture_name_to_display_texture_info = {}
 
-        self.m_program_object_id_depth = None
-        self.m_program_texture_display = None
-        self.m_program_sprite_atlas_render_channels = None
-        self.m_program_sprite_atlas_merge_channels_to_texture = None
-        self.m_program_combined_render = None
+        self.m_shaders = BAD_ShaderLibrary()
+
+        # initialization runs as resumable steps, see initialization_steps
+        self.m_initialization = None
+        self.m_is_render_ready = False # textures, framebuffers and shaders exist, meshes may still be pending
+        self.m_is_initialized = False
+        self.m_pending_meshes = set() # mesh uids whose buffers are not built yet, their instances are not drawn
+        self.m_failed_meshes = {} # uid -> session uid of meshes whose buffers failed to build, not drawn until edited
+        self.m_initialized_objects = 0
+        self.m_initialize_object_count = 0
+        self.m_initialize_ticks = 0
+        self.m_initialize_seconds = 0.0 # time spent in steps, not the wall time between the first and last tick
 
-        # TODO: currently we are not deleting buffers for meshes that get deleted
+        # CPU mirrors of the gpu buffers, (n, 3) float32 positions and (n, 3) uint32 triangle indices
         self.m_vertex_buffers_data = {}
         self.m_index_buffers_data = {}
         
@@ -103,18 +167,159 @@ class BAD_Pipeline:
         self.m_index_buffers = {}
         self.m_batches = {}
 
+        self.m_dirty_meshes = set() # mesh uids whose geometry changed since they were last uploaded
+
+        # releases buffers of deleted meshes and evicts unused ones to stay within the memory budget
+        self.m_mesh_resources = BAD_MeshResourceManager(BAD_MESH_BUFFERS_MEMORY_BUDGET, BAD_MESH_BUFFERS_MAX_UNUSED_FRAMES)
+        self.m_mesh_count = 0 # len(bpy.data.meshes) when deleted meshes were last looked for
+
+        # new and evicted meshes are read in render, prepared by the pool and uploaded in a later render, see BAD_MESH_PREPARE_WORKERS
+        self.m_mesh_preparer = BAD_MeshPreparer(BAD_MESH_PREPARE_WORKERS, BAD_MESH_REORDER)
+        self.m_mesh_reads = OrderedDict() # uid -> mesh waiting to be read on the main thread, in request order
+        self.m_mesh_upload_seconds = 0.0
+
+        # statistics of the object id depth passes of the last frame, summed over its rendered views
+        self.m_id_pass_draw_calls = 0
+        self.m_id_pass_instances = 0
+
+        # frustum culling, uid -> (2, 3) local bounds of the mesh and the world space aabbs of all instances of the last frame
+        self.m_mesh_bounds = {}
+        self.m_instance_bounds = np.zeros((0, 2, 3), dtype = np.float32)
+        self.m_instance_bounds_key = None # (scene version, frame, instance layout) the aabbs were computed for
+        self.m_visible_object_ids = None # objects visible in any view, None when culling is off, only they get an atlas cell
+        self.m_cell_object_ids = None # m_visible_object_ids at the last layout rebuild
+        self.m_culled_instances = 0
+        self.m_culling_seconds = 0.0
+
+        # static batching, uid -> (matrices, object ids, frames they did not change) of every drawn mesh
+        self.m_instance_history = {}
+        self.m_rebuilt_meshes = set() # uids whose buffers were (re)built in the current frame
+        self.m_static_uids = frozenset() # meshes drawn from the merged static batches
+        self.m_static_batches = []
+        self.m_static_vertex_buffer_format = GPUVertFormat()
+        self.m_static_vertex_buffer_format.attr_add(id = "pos", comp_type = "F32", len = 3, fetch_mode = "FLOAT")
+        self.m_static_vertex_buffer_format.attr_add(id = "vertexObjectID", comp_type = "F32", len = 1, fetch_mode = "FLOAT")
+        self.m_static_batch_rebuild_count = 0
+
         self.m_texture_atlas_dimensions = (BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH, BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT)
+        # object id -> cell rectangle and page, kept between frames so only changed cells get repacked
+        self.m_atlas_packer = BAD_AtlasPages(BAD_SPRITE_ATLAS_PACKER, self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1], BAD_MAX_SPRITE_ATLAS_PAGES)
+        self.m_sprite_atlas_page_count = 1 # layers allocated in the sprite atlas textures, only grows
+        self.m_sprite_atlas_kernel = BAD_SPRITE_ATLAS_KERNEL
+        self.m_texture_cell_owners = None # object id per atlas texel, used by the gather kernel and the dirty cells
+        self.m_cell_owners = None # numpy copy of m_texture_cell_owners for the cpu backend
+        # the atomic kernel packs its sums to 16 bits while no atlas texel can receive more than BAD_MAX_PACKED_CONTRIBUTORS pixels
+        self.m_is_sprite_atlas_packed = False
+        # object id -> 2 texels (x, y, width, height) and (page, 0, 0, 0), rows of BAD_CELL_VIEWPORTS_PER_ROW cells
         self.m_cell_viewports = None
-        self.m_buffer_cell_viewports = None
-        self.m_uniform_buffer_cell_viewports = None
+        self.m_cell_layout_version = 0 # bumped on every layout rebuild, the views upload the table again when it changed
+        self.m_cell_viewports_upload_seconds = 0.0
+
+        # the cell layout is only rebuilt when it is dirty, the counter shows whether steady frames do any packing
+        self.m_is_cell_layout_dirty = True
+        self.m_cell_layout_rebuild_count = 0
+        self.m_object_count = 0 # len(bpy.data.objects) at the last layout rebuild
+
+        # power of two (width, height) exponents of the screen space size of every object id, see BAD_AUTO_RESOLUTION_SCALE.
+        # The ids, (min, max) powers and chosen powers of the auto resolution objects are kept from the last layout rebuild
+        self.m_screen_resolution_powers = np.zeros((0, 2), dtype = np.int64)
+        self.m_auto_resolution_ids = np.zeros(0, dtype = np.int64)
+        self.m_auto_resolution_limits = np.zeros((0, 2), dtype = np.int64)
+        self.m_auto_resolution_powers = np.zeros((0, 2), dtype = np.int64)
+        self.m_auto_resolution_pending_frames = np.zeros(0, dtype = np.int64) # consecutive frames outside the hysteresis band
+        self.m_auto_resolution_change_count = 0 # layout rebuilds caused by objects crossing a power of two
+
+        # frames whose signature matches the last rendered one only display the cached textures
+        self.m_scene_version = 0 # bumped by every depsgraph update
+        self.m_frame_cache_hits = 0
+        self.m_frame_cache_misses = 0
+
+        # "GPU" or "CPU", see BAD_COMPUTE_BACKEND
+        self.m_compute_backend = BAD_COMPUTE_BACKEND
+        self.m_cpu_backend = BAD_CpuBackend()
+        self.m_cpu_backend_seconds = 0.0
+        # "GPU" or "CPU", see BAD_OBJECT_ID_DEPTH_BACKEND
+        self.m_object_id_depth_backend = BAD_OBJECT_ID_DEPTH_BACKEND
+        self.m_rasterizer_seconds = 0.0
+
+        self.m_profiler = BAD_Profiler(BAD_PROFILER_FRAMES, BAD_PROFILING, BAD_PROFILER_GPU_SYNC)
+
+        self.m_atlas_exporter = None # set while the atlas is exported, see start_atlas_export
 
     def initialize(self):
-        self.create_vertex_index_buffers_batches(bpy.context)
-        self.create_textures(bpy.context)
+        self.begin_initialize()
+        self.continue_initialize(float("inf"))
+
+    def begin_initialize(self):
+        self.m_initialization = self.initialization_steps()
+
+    # runs initialization steps until budget_seconds are used up, at least one step runs per call.
+    # Returns True once everything is initialized
+    def continue_initialize(self, budget_seconds : float) -> bool:
+        if self.m_initialization == None:
+            return self.m_is_initialized
+
+        start = time.perf_counter()
+        self.m_initialize_ticks += 1
+
+        for step in self.m_initialization:
+            if time.perf_counter() - start >= budget_seconds:
+                break
+        else:
+            self.m_initialization = None
+
+        self.m_initialize_seconds += time.perf_counter() - start
+
+        return self.m_is_initialized
+
+    # yields after every step, the resources needed to render come first so the pipeline renders
+    # while the mesh buffers are built one mesh per step, meshes in view of a 3d view first.
+    # The render targets of the views are allocated by their first render
+    def initialization_steps(self):
         self.create_sprite_atlas_textures()
-        self.create_framebuffers()
+        self.create_cell_viewports_table()
+        yield
         self.create_images()
-        self.create_shaders()
+        yield
+        self.create_shaders() # only descriptions, programs compile on first use
+        yield
+
+        objects = [obj for obj in bpy.data.objects if obj.type == "MESH"]
+        self.m_pending_meshes.update(obj.data.as_pointer() for obj in objects)
+        self.m_initialize_object_count = len(objects)
+        self.m_is_render_ready = True # the pending meshes are not drawn until they are built
+        yield
+
+        # reading the bounds of every object is split into chunks as well
+        priorities = []
+        for offset in range(0, len(objects), BAD_INITIALIZE_CHUNK_OBJECTS):
+            chunk = objects[offset:offset + BAD_INITIALIZE_CHUNK_OBJECTS]
+            try:
+                priorities.extend(self.mesh_object_priorities(bpy.context, chunk))
+            except ReferenceError: # an object of the chunk was deleted while initializing
+                priorities.extend([1] * len(chunk))
+            yield
+
+        order = sorted(range(len(objects)), key = lambda i: priorities[i])
+
+        for obj in (objects[i] for i in order):
+            self.m_initialized_objects += 1
+
+            try:
+                mesh = obj.data
+            except ReferenceError: # deleted while initializing
+                continue
+
+            self.assign_object_id(obj)
+
+            uid = mesh.as_pointer()
+            if uid in self.m_pending_meshes and not self.is_mesh_requested(uid):
+                self.request_mesh_buffers(mesh, bpy.context)
+            yield
+
+        # meshes of objects deleted in between were never requested
+        self.m_pending_meshes = {uid for uid in self.m_pending_meshes if self.is_mesh_requested(uid)}
+        self.m_is_initialized = True
 
     def deinitialize(self):
         self.m_vertex_buffers_data.clear()
@@ -123,42 +328,38 @@ class BAD_Pipeline:
         self.m_vertex_buffers.clear()
         self.m_index_buffers.clear()
         self.m_batches.clear()
+        self.m_dirty_meshes.clear()
+        self.m_mesh_resources.clear()
+        self.m_instance_history.clear()
+        self.m_static_batches.clear()
+        self.m_static_uids = frozenset()
+        self.m_pending_meshes.clear()
+        self.m_failed_meshes.clear()
+        self.m_initialization = None
+        self.m_mesh_preparer.close()
+        self.m_mesh_reads.clear()
+        self.stop_atlas_export()
+
+        for view in self.m_views.values():
+            view.release()
+        self.m_views.clear()
 
-        self.m_framebuffer_offscreen.free()
-
-    # TODO: currently cannot handle instanced meshes
     # function should be called from UI thread
     def render(self, context : bpy.types.Context):
-        near = None
-        far = None
-        vp = None
-        view_matrix = None
-        projection_matrix = None
-        view3d_space = None
-        view3d_window_region = None
+        if not self.m_is_render_ready:
+            return
 
-        is_render_valid = False
+        self.m_profiler.begin_frame()
+        try:
+            self.render_frame(context)
+        finally:
+            self.m_profiler.end_frame()
 
+    def render_frame(self, context : bpy.types.Context):
         texture_name = None
         image_editor_aspect_ratio = 0
         
-        # Get near and far view plane values
         for area in context.screen.areas:
-            if area.type == "VIEW_3D":
-                view3d_space = area.spaces.active
-                near = view3d_space.clip_start
-                far = view3d_space.clip_end
-                vp = view3d_space.region_3d.perspective_matrix # Window Matrix @ View Matrix
-                view_matrix = view3d_space.region_3d.view_matrix
-                projection_matrix = view3d_space.region_3d.window_matrix
-
-
-                for region in area.regions:
-                    if region.type == "WINDOW":
-                        view3d_window_region = region
-                        is_render_valid = True
-                        break
-
             if area.type == "IMAGE_EDITOR":
                 # query image selected in image editor
                 if area.height != 0:
@@ -171,262 +372,764 @@ class BAD_Pipeline:
                         if image != None:
                             if contains_prefix(image.name):
                                 texture_name = get_name_from_prefixed_name(image.name)
-                            
 
-        if not is_render_valid and texture_name == None and image_editor_aspect_ratio == 0: # do not render there is no ative VIEW_3D area active
+        views = self.update_views(context)
+        primary_view = views[0] if len(views) > 0 else None # the view shown in the image editors and exported
+
+        # built before any gpu work, views whose signature did not change keep their textures of the last frame
+        with self.m_profiler.stage("Frame Signature"):
+            changed_views = []
+            for view in views:
+                frame_signature = self.compute_frame_signature(view.m_space, view.m_region, view.m_window.scene)
+                if frame_signature == None or frame_signature != view.m_frame_signature:
+                    view.m_frame_signature = frame_signature
+                    changed_views.append(view)
+
+        self.m_view_cache_hits += len(views) - len(changed_views)
+
+        if len(changed_views) == 0:
+            self.m_frame_cache_hits += 1
+            with self.m_profiler.stage("Display"):
+                self.display_texture(primary_view, texture_name, image_editor_aspect_ratio)
             return
 
-        queried_viewport_dimensions = self.query_view_3d_dimensions(context)
+        self.m_frame_cache_misses += 1
+        self.m_rendered_view_count = len(changed_views)
+
+        # the primary view renders last so the shared sprite atlas holds its cells when it is displayed and exported
+        changed_views.sort(key = lambda view: view is primary_view)
+
+        for view in changed_views:
+            if view.is_resized():
+                # only allocates when the pooled render targets do not suit the new viewport dimensions
+                with self.m_profiler.stage("Resize"):
+                    view.update_render_targets((view.m_region.width, view.m_region.height))
+                    self.m_is_cell_layout_dirty = True # the largest view decides whether the atlas sums are packed
+
+        self.m_mesh_resources.begin_frame()
+        self.release_deleted_mesh_buffers()
+
+        with self.m_profiler.stage("Mesh Upload"):
+            self.update_mesh_uploads()
+
+        # every visible mesh instance grouped by mesh, each group is one instanced draw call.
+        # Gathered once for all views
+        with self.m_profiler.stage("Gather Instances"):
+            instance_groups = self.gather_mesh_instances(context)
+
+        if BAD_STATIC_BATCHING and self.m_object_id_depth_backend != "CPU":
+            with self.m_profiler.stage("Static Batching"):
+                self.update_static_batches(instance_groups)
+
+        self.m_id_pass_draw_calls = 0
+        self.m_id_pass_instances = 0
+        self.m_culled_instances = 0
+        self.m_culling_seconds = 0.0
+        self.m_rasterizer_seconds = 0.0
+        self.m_cpu_backend_seconds = 0.0
+
+        # static meshes are culled as well, their objects only need no atlas cell when out of view
+        with self.m_profiler.stage("Culling"):
+            view_instance_groups = [self.cull_mesh_instances(context, instance_groups, view) for view in changed_views]
+            self.update_visible_object_ids(views)
+
+        with self.m_profiler.stage("Auto Resolution"):
+            self.update_auto_resolutions(views)
+
+        # packs the cells of the objects visible in any view, the views upload the table when it changed
+        with self.m_profiler.stage("Cell Table"):
+            self.update_cell_viewports_table()
+
+        for view, visible_groups in zip(changed_views, view_instance_groups):
+            self.render_view(view, visible_groups)
+
+        # views rendered while pipeline work was pending are up to date once it is done, the next frame can be a cache hit
+        for view in changed_views:
+            if view.m_frame_signature == None:
+                view.m_frame_signature = self.compute_frame_signature(view.m_space, view.m_region, view.m_window.scene)
+
+        # buffers used this frame are never evicted so this is safe after drawing
+        for uid in self.m_mesh_resources.collect():
+            self.release_mesh_buffers(uid)
+
+        with self.m_profiler.stage("Display"):
+            self.display_texture(primary_view, texture_name, image_editor_aspect_ratio)
+
+        if self.m_atlas_exporter != None and primary_view in changed_views:
+            with self.m_profiler.stage("Atlas Export"):
+                self.export_sprite_atlas(primary_view.m_window.scene.frame_current)
+
+    # the passes of one view, everything the views share is up to date for the frame
+    def render_view(self, view : BAD_View, instance_groups : dict):
+        region_3d = view.m_region.data
+        near = view.m_space.clip_start
+        far = view.m_space.clip_end
+        vp = region_3d.perspective_matrix # Window Matrix @ View Matrix
+
+        with self.m_profiler.stage("Object ID Depth"):
+            if self.m_object_id_depth_backend == "CPU":
+                self.rasterize_object_id_depth(view, instance_groups, vp, near, far)
+            else:
+                instance_groups = { uid : group for uid, group in instance_groups.items() if not uid in self.m_static_uids }
+                self.draw_object_id_depth(view, instance_groups, vp, near, far)
+
+        with self.m_profiler.stage("Draw View3D"):
+            view.m_framebuffer_offscreen.bind()
+            view.m_framebuffer_offscreen.draw_view3d(view.m_window.scene, view.m_window.view_layer, view.m_space,
+                                                     view.m_region, region_3d.view_matrix, view.sub_rectangle_projection(region_3d.window_matrix),
+                                                     do_color_management = False,
+                                                     draw_background = True)
+            view.m_framebuffer_offscreen.unbind(restore = True)
+
+        # cell 0 is a special viewport holding the dimensions of the view
+        self.m_cell_viewports[0, 0, 2] = float(view.m_viewport_dimensions[0])
+        self.m_cell_viewports[0, 0, 3] = float(view.m_viewport_dimensions[1])
+
+        if view.m_cell_layout_version != self.m_cell_layout_version:
+            with self.m_profiler.stage("Cell Table"):
+                self.upload_cell_viewports_table(view)
+
+        is_incremental = self.is_sprite_atlas_incremental(view)
+
+        if self.m_compute_backend == "CPU":
+            with self.m_profiler.stage("CPU Backend"):
+                self.run_cpu_backend(view, is_incremental)
+        else:
+            with self.m_profiler.stage("Sprite Atlas"):
+                if BAD_SPRITE_ATLAS_TEMPORAL_REUSE:
+                    self.dispatch_sprite_atlas_mark_dirty_cells(view)
+
+                if self.m_sprite_atlas_kernel == "GATHER":
+                    self.dispatch_sprite_atlas_gather(view, is_incremental)
+                else:
+                    self.dispatch_sprite_atlas_atomic(view, is_incremental)
+
+            with self.m_profiler.stage("Combined Render"):
+                self.dispatch_combined_render(view)
+
+        self.m_sprite_atlas_history = (view.m_key, self.m_cell_layout_version)
+
+        if is_incremental:
+            self.m_sprite_atlas_incremental_passes += 1
+        else:
+            self.m_sprite_atlas_full_passes += 1
+
+        view.m_texture_name_to_display_texture_info["Object ID"]["channel_max"] = self.m_object_id_counter - 1
+        view.m_texture_name_to_display_texture_info["Depth Linearized"]["channel_min"] = near
+        view.m_texture_name_to_display_texture_info["Depth Linearized"]["channel_max"] = far
+
+        view.m_render_count += 1
+
+    # the views of all 3d views of the windows showing the scene and view layer of context (the instances are gathered
+    # from its depsgraph), views of closed areas release their render targets. The views of context.window come first
+    def update_views(self, context : bpy.types.Context) -> list:
+        views = []
+
+        for window, area, region in find_view_regions(context):
+            if window.scene != context.scene or window.view_layer != context.view_layer:
+                continue
+
+            key = region.as_pointer()
+            view = self.m_views.get(key)
+
+            if view == None:
+                view = BAD_View(key)
+                self.m_views[key] = view
+
+            view.update(window, area.spaces.active, region)
+            views.append(view)
+
+        keys = {view.m_key for view in views}
+        for key in [key for key in self.m_views if not key in keys]:
+            self.m_views.pop(key).release()
+
+        return views
+
+    # whether the 3d view drawn in context renders differently than at its last render,
+    # its draw handler only redraws the image editors then
+    def is_view_changed(self, context : bpy.types.Context) -> bool:
+        view = self.m_views.get(context.region.as_pointer())
+
+        if view == None:
+            return True
+
+        return view.m_frame_signature == None or self.compute_frame_signature(context.space_data, context.region, context.scene) != view.m_frame_signature
+
+    # draw Image 2D in Image Editor, the viewport sized textures are the ones of view
+    def display_texture(self, view : BAD_View, texture_name : str, image_editor_aspect_ratio : float):
+        if texture_name == None or image_editor_aspect_ratio == 0:
+            return
+
+        texture_info = view.m_texture_name_to_display_texture_info.get(texture_name) if view != None else None
+
+        if texture_info == None:
+            texture_info = self.m_texture_name_to_display_texture_info.get(texture_name)
+
+        if texture_info == None: # a viewport texture without a view
+            return
+
+        # viewport sized textures only hold the viewport in their lower left extent
+        texture_width, texture_height = texture_info.get("extent", (texture_info["texture"].width, texture_info["texture"].height))
+        u = texture_width / texture_info["texture"].width
+        v = texture_height / texture_info["texture"].height
+
+        # center texture with fixed aspect ratio
+        texture_aspect_ratio = texture_width / texture_height
+
+        d = texture_aspect_ratio / image_editor_aspect_ratio
+        
+        if texture_width >= texture_height:
+            pos = ((-1.0, -1.0 / d), (1.0, -1.0 / d), (1.0, 1.0 / d), (-1.0, 1.0 / d))
+        else: # texture_height > texture_width:
+            pos = ((-1.0 * d, -1.0), (1.0 * d, -1.0), (1.0 * d, 1.0), (-1.0 * d, 1.0))
+        batch = batch_for_shader(self.m_shaders.get("texture_display"), "TRI_FAN",
+                                                {
+                                                    "pos" : pos,
+                                                    "texCoord" :((0, 0), (u, 0), (u, v), (0, v))
+                                                })
+        
+        # sprite atlas textures are arrays with one layer per page
+        program_texture_display = self.m_shaders.get("texture_display")
+
+        if "layer" in texture_info:
+            program_texture_display = self.m_shaders.get("texture_array_display")
+
+        program_texture_display.bind()
+        program_texture_display.uniform_sampler("tex", texture_info["texture"])
+
+        if "layer" in texture_info:
+            program_texture_display.uniform_float("layer", texture_info["layer"])
+
+        is_multiple_channels = texture_info["is_multiple_channels"]
+        channel_min = texture_info["channel_min"]
+        channel_max = texture_info["channel_max"]
+
+        program_texture_display.uniform_float("isMultipleChannels", is_multiple_channels)
+        program_texture_display.uniform_float("channelMin", channel_min)
+        program_texture_display.uniform_float("channelMax", channel_max)
+        batch.draw(program_texture_display)
+
+    # the view of region, its dimensions and a version bumped by depsgraph updates, pending pipeline work always renders
+    def compute_frame_signature(self, view3d_space : bpy.types.SpaceView3D, region : bpy.types.Region, scene : bpy.types.Scene) -> tuple:
+        if self.m_is_cell_layout_dirty or len(self.m_dirty_meshes) > 0 or len(self.m_pending_meshes) > 0:
+            return None
+
+        region_3d = region.data # each region of a quad view has its own
+
+        return (tuple(value for row in region_3d.view_matrix for value in row),
+                tuple(value for row in region_3d.window_matrix for value in row),
+                view3d_space.clip_start,
+                view3d_space.clip_end,
+                (region.width, region.height),
+                view3d_space.shading.type,
+                scene.frame_current, # playback does not send depsgraph updates
+                self.m_scene_version)
+
+    # whether the atlas still holds the cells of the last pass of view with the current layout, the pixel keys of the view
+    # then tell which cells changed. The exported atlas textures alternate so the next one is a frame behind
+    def is_sprite_atlas_incremental(self, view : BAD_View) -> bool:
+        if not BAD_SPRITE_ATLAS_TEMPORAL_REUSE:
+            return False
+
+        if self.m_atlas_exporter != None and self.m_compute_backend != "CPU":
+            return False
+
+        return self.m_sprite_atlas_history == (view.m_key, self.m_cell_layout_version)
+
+    # compares every viewport pixel with what it scattered at the last pass and flags the cells whose texels change,
+    # the pixel keys are brought up to date for the next frame in full passes as well
+    def dispatch_sprite_atlas_mark_dirty_cells(self, view : BAD_View):
+        program_mark_dirty_cells = self.m_shaders.get("sprite_atlas_mark_dirty_cells")
+
+        self.m_texture_dirty_cells.clear(format = "UINT", value = (0,))
+
+        program_mark_dirty_cells.bind()
 
-        if(queried_viewport_dimensions[0] != self.m_viewport_dimensions[0] or queried_viewport_dimensions[1] != self.m_viewport_dimensions[1]):
-            # recreate framebuffer with new viewport dimensions
-            self.m_viewport_dimensions = queried_viewport_dimensions
-            self.create_textures(context)
-            self.create_framebuffers()
+        program_mark_dirty_cells.uniform_float("viewportWidth", float(view.m_viewport_dimensions[0]))
+        program_mark_dirty_cells.uniform_float("viewportHeight", float(view.m_viewport_dimensions[1]))
+        program_mark_dirty_cells.uniform_float("cellCount", float(len(self.m_cell_viewports)))
+        program_mark_dirty_cells.uniform_sampler("cellViewports", view.m_texture_cell_viewports)
+
+        program_mark_dirty_cells.image("objectIDs", view.m_texture_name_to_display_texture_info["Object ID"]["texture"])
+        program_mark_dirty_cells.image("colors", view.m_texture_name_to_display_texture_info["Color"]["texture"])
+        program_mark_dirty_cells.image("cellOwners", self.m_texture_cell_owners)
+        program_mark_dirty_cells.image("pixelKeys", view.m_texture_pixel_keys)
+        program_mark_dirty_cells.image("dirtyCells", self.m_texture_dirty_cells)
+
+        gpu.compute.dispatch(program_mark_dirty_cells, ceil(view.m_viewport_dimensions[0] / 8), ceil(view.m_viewport_dimensions[1] / 8), 1)
+
+    # scatters every viewport pixel into its cell with atomics, the merge pass averages and clears the accumulators.
+    # Incremental passes only scatter into and merge the texels of dirty cells
+    def dispatch_sprite_atlas_atomic(self, view : BAD_View, is_incremental : bool = False):
+        program_render_channels = self.m_shaders.get("sprite_atlas_render_channels")
+        program_merge_channels = self.m_shaders.get("sprite_atlas_merge_channels_to_texture")
+
+        program_render_channels.bind()
+
+        program_render_channels.uniform_float("viewportWidth", float(view.m_viewport_dimensions[0]))
+        program_render_channels.uniform_float("viewportHeight", float(view.m_viewport_dimensions[1]))
+        program_render_channels.uniform_int("packedSums", int(self.m_is_sprite_atlas_packed))
+        program_render_channels.uniform_int("isIncremental", int(is_incremental))
+        program_render_channels.uniform_float("cellCount", float(len(self.m_cell_viewports)))
+        program_render_channels.uniform_sampler("cellViewports", view.m_texture_cell_viewports)
+
+        program_render_channels.image("objectIDs", view.m_texture_name_to_display_texture_info["Object ID"]["texture"])
+        program_render_channels.image("colors", view.m_texture_name_to_display_texture_info["Color"]["texture"])
+        program_render_channels.image("spriteAtlasAccumulator", self.m_texture_sprite_atlas_accumulator)
+        program_render_channels.image("cellOwners", self.m_texture_cell_owners)
+        program_render_channels.image("dirtyCells", self.m_texture_dirty_cells)
+
+        gpu.compute.dispatch(program_render_channels, ceil(view.m_viewport_dimensions[0] / 32), ceil(view.m_viewport_dimensions[1] / 32), 1)
+
+        program_merge_channels.bind()
+
+        program_merge_channels.uniform_float("atlasWidth", float(self.m_texture_atlas_dimensions[0]))
+        program_merge_channels.uniform_float("atlasHeight", float(self.m_texture_atlas_dimensions[1]))
+        program_merge_channels.uniform_int("packedSums", int(self.m_is_sprite_atlas_packed))
+        program_merge_channels.uniform_int("isIncremental", int(is_incremental))
+
+        program_merge_channels.image("spriteAtlasAccumulator", self.m_texture_sprite_atlas_accumulator)
+        program_merge_channels.image("spriteAtlas", self.m_texture_name_to_display_texture_info["Sprite Atlas"]["texture"])
+        program_merge_channels.image("cellOwners", self.m_texture_cell_owners)
+        program_merge_channels.image("dirtyCells", self.m_texture_dirty_cells)
+
+        gpu.compute.dispatch(program_merge_channels, ceil((self.m_texture_atlas_dimensions[0] * self.m_texture_atlas_dimensions[1]) / 32), self.m_sprite_atlas_page_count, 1)
+
+    # every atlas texel averages its own footprint in the viewport, no accumulators, atomics or clears,
+    # but every placed cell scans the viewport pixels mapping onto it so the cost grows with the cell count
+    def dispatch_sprite_atlas_gather(self, view : BAD_View, is_incremental : bool = False):
+        program_gather = self.m_shaders.get("sprite_atlas_gather")
+
+        program_gather.bind()
+
+        program_gather.uniform_float("viewportWidth", float(view.m_viewport_dimensions[0]))
+        program_gather.uniform_float("viewportHeight", float(view.m_viewport_dimensions[1]))
+        program_gather.uniform_float("atlasWidth", float(self.m_texture_atlas_dimensions[0]))
+        program_gather.uniform_float("atlasHeight", float(self.m_texture_atlas_dimensions[1]))
+        program_gather.uniform_float("cellCount", float(len(self.m_cell_viewports)))
+        program_gather.uniform_int("isIncremental", int(is_incremental))
+        program_gather.uniform_sampler("cellViewports", view.m_texture_cell_viewports)
+
+        program_gather.image("objectIDs", view.m_texture_name_to_display_texture_info["Object ID"]["texture"])
+        program_gather.image("colors", view.m_texture_name_to_display_texture_info["Color"]["texture"])
+        program_gather.image("spriteAtlas", self.m_texture_name_to_display_texture_info["Sprite Atlas"]["texture"])
+        program_gather.image("cellOwners", self.m_texture_cell_owners)
+        program_gather.image("dirtyCells", self.m_texture_dirty_cells)
+
+        gpu.compute.dispatch(program_gather, ceil(self.m_texture_atlas_dimensions[0] / 8), ceil(self.m_texture_atlas_dimensions[1] / 8), self.m_sprite_atlas_page_count)
+
+    def dispatch_combined_render(self, view : BAD_View):
+        program_combined_render = self.m_shaders.get("combined_render")
+
+        program_combined_render.bind()
+
+        program_combined_render.uniform_float("viewportWidth", float(view.m_viewport_dimensions[0]))
+        program_combined_render.uniform_float("viewportHeight", float(view.m_viewport_dimensions[1]))
+        
+        program_combined_render.uniform_float("cellCount", float(len(self.m_cell_viewports)))
+        program_combined_render.uniform_sampler("cellViewports", view.m_texture_cell_viewports)
+        
+        program_combined_render.image("objectIDs", view.m_texture_name_to_display_texture_info["Object ID"]["texture"])
+        program_combined_render.image("colors", view.m_texture_name_to_display_texture_info["Color"]["texture"])
+        program_combined_render.image("spriteAtlas", self.m_texture_name_to_display_texture_info["Sprite Atlas"]["texture"])
+        program_combined_render.image("combinedRender", view.m_texture_name_to_display_texture_info["Combined Render"]["texture"])
+
+        gpu.compute.dispatch(program_combined_render, ceil((view.m_viewport_dimensions[0] * view.m_viewport_dimensions[1]) / 32), 1, 1)
+
+    def draw_object_id_depth(self, view : BAD_View, instance_groups : dict, vp, near : float, far : float):
+        program_object_id_depth = self.m_shaders.get("object_id_depth")
+
+        texture_instance_data = self.create_instance_data_texture(instance_groups)
 
         # bind framebuffer and render
         default_framebuffer = gpu.state.active_framebuffer_get()
 
-        with self.m_framebuffer_view_3d.bind():
+        with view.m_framebuffer_view_3d.bind():
             
             #self.render_uid_to_object_id.clear()
 
             fb = gpu.state.active_framebuffer_get()
 
             fb.clear(color = (0.0, 0.0, 0.0, 0.0), depth = 1.0)
+            fb.viewport_set(0, 0, view.m_viewport_dimensions[0], view.m_viewport_dimensions[1])
             
-            self.m_program_object_id_depth.bind()
-            
-            self.m_program_object_id_depth.uniform_float("near", near)
-            self.m_program_object_id_depth.uniform_float("far", far)
+            program_object_id_depth.bind()
             
-            for obj in context.scene.objects:
-                if isinstance(obj.data, bpy.types.Mesh) and obj.visible_get(): # and obj.bad_settings.m_is_enabled  TODO:
-                    mesh = obj.data
-                    uid = mesh.as_pointer()
+            program_object_id_depth.uniform_float("near", near)
+            program_object_id_depth.uniform_float("far", far)
+            program_object_id_depth.uniform_float("vp", vp)
+
+            if texture_instance_data != None:
+                program_object_id_depth.uniform_sampler("instanceData", texture_instance_data)
 
-                    if not uid in self.m_vertex_buffers_data:
-                        obj.bad_settings.m_id = self.m_object_id_counter
-                        self.m_object_id_counter += 1
-                        self.create_vertex_index_buffer_batch(mesh, context)
+                instance_offset = 0
+                for uid, (matrices, object_ids) in instance_groups.items():
+                    program_object_id_depth.uniform_int("instanceOffset", instance_offset)
 
-                    #self.render_uid_to_object_id[uid] = object_id
-                    settings = obj.bad_settings
-                    object_id = settings.m_id
-                    self.m_program_object_id_depth.uniform_float("id", object_id)
+                    self.m_batches[uid].draw_instanced(program_object_id_depth, instance_start = 0, instance_count = len(object_ids))
 
-                    # set MVP
-                    mvp = vp @ obj.matrix_world
+                    instance_offset += len(object_ids)
+                    self.m_id_pass_draw_calls += 1
+                    self.m_id_pass_instances += len(object_ids)
 
-                    self.m_program_object_id_depth.uniform_float("mvp", mvp)
+            if len(self.m_static_batches) > 0:
+                program_object_id_depth_static = self.m_shaders.get("object_id_depth_static")
+                program_object_id_depth_static.bind()
 
-                    self.m_batches[uid].draw(self.m_program_object_id_depth)
+                program_object_id_depth_static.uniform_float("near", near)
+                program_object_id_depth_static.uniform_float("far", far)
+                program_object_id_depth_static.uniform_float("vp", vp)
 
-        self.m_framebuffer_offscreen.bind()
-        self.m_framebuffer_offscreen.draw_view3d(context.scene, context.view_layer, view3d_space, 
-                                                   view3d_window_region, view_matrix, projection_matrix,
-                                                   do_color_management = False,
-                                                  draw_background = True)
-        self.m_framebuffer_offscreen.unbind(restore = True)
+                for batch in self.m_static_batches:
+                    batch.draw(program_object_id_depth_static)
 
+                    self.m_id_pass_draw_calls += 1
 
-        # TODO: For now update object_id_to_cell_viewport ssbo every frame optimize it to change only when needed
-        # TODO: In the future support multiple texture atlases for for faster ssbo data update
-        self.create_uniform_buffer_cell_viewports()
+    # the object id depth pass on the cpu, every visible instance (static ones too) is rasterized from the mesh arrays
+    # and the images are uploaded in place of the framebuffer attachments
+    def rasterize_object_id_depth(self, view : BAD_View, instance_groups : dict, vp, near : float, far : float):
+        start = time.perf_counter()
+
+        if view.m_rasterizer == None or (view.m_rasterizer.m_width, view.m_rasterizer.m_height) != tuple(view.m_viewport_dimensions):
+            view.m_rasterizer = BAD_Rasterizer(view.m_viewport_dimensions[0], view.m_viewport_dimensions[1])
+
+        view.m_rasterizer.clear()
+
+        vp = np.array(vp, dtype = np.float32)
+
+        for uid, (matrices, object_ids) in instance_groups.items():
+            view.m_rasterizer.draw(self.m_vertex_buffers_data[uid], self.m_index_buffers_data[uid], matrices, object_ids, vp, near, far)
+
+            self.m_id_pass_draw_calls += 1
+            self.m_id_pass_instances += len(object_ids)
+
+        object_ids = view.m_rasterizer.m_object_ids
+        linearized_depth = view.m_rasterizer.m_linearized_depth
+
+        view.m_texture_color_attachment_object_id = GPUTexture(view.m_viewport_dimensions, format = "R32F", data = Buffer("FLOAT", object_ids.size, object_ids.ravel()))
+        view.m_texture_color_attachment_linearized_depth = GPUTexture(view.m_viewport_dimensions, format = "R32F", data = Buffer("FLOAT", linearized_depth.size, linearized_depth.ravel()))
+        view.m_texture_name_to_display_texture_info["Object ID"]["texture"] = view.m_texture_color_attachment_object_id
+        view.m_texture_name_to_display_texture_info["Depth Linearized"]["texture"] = view.m_texture_color_attachment_linearized_depth
+
+        self.m_rasterizer_seconds += time.perf_counter() - start
+
+    # runs the sprite atlas and combined render passes in numpy on the read back attachments,
+    # the results replace the textures the compute shaders would have written
+    def run_cpu_backend(self, view : BAD_View, is_incremental : bool = False):
+        start = time.perf_counter()
+
+        width, height = view.m_viewport_dimensions
+        if self.m_object_id_depth_backend == "CPU":
+            object_ids = view.m_rasterizer.m_object_ids
+        else:
+            texture = view.m_texture_color_attachment_object_id
+            object_ids = np.asarray(texture.read(), dtype = np.float32).reshape(texture.height, texture.width)[:height, :width]
+        texture = view.m_texture_name_to_display_texture_info["Color"]["texture"]
+        colors = np.asarray(texture.read()).reshape(texture.height, texture.width, 4)[:height, :width]
+        if np.issubdtype(colors.dtype, np.integer): # RGBA8 attachments read back as bytes
+            colors = colors.astype(np.float32) / np.float32(255.0)
+        else:
+            colors = colors.astype(np.float32)
+
+        dirty_cells = None
+        self.m_dirty_cell_count = None
+        if BAD_SPRITE_ATLAS_TEMPORAL_REUSE:
+            pixel_keys = compute_pixel_keys(object_ids, colors)
+            if is_incremental:
+                dirty_cells = mark_dirty_cells(view.m_pixel_keys, pixel_keys, self.m_cell_viewports, self.m_cell_owners,
+                                               self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1], self.m_sprite_atlas_page_count)
+                self.m_dirty_cell_count = int(np.count_nonzero(dirty_cells))
+            view.m_pixel_keys = pixel_keys
+
+        sprite_atlas, combined_render = self.m_cpu_backend.render(object_ids, colors, self.m_cell_viewports,
+                                                                  self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1],
+                                                                  self.m_sprite_atlas_page_count, self.m_sprite_atlas_kernel,
+                                                                  self.m_is_sprite_atlas_packed, self.m_cell_owners,
+                                                                  dirty_cells, self.m_sprite_atlas_pixels)
+
+        self.m_sprite_atlas_pixels = sprite_atlas
+
+        sprite_atlas = sprite_atlas.astype(np.float32) / np.float32(255.0)
+        combined_render = combined_render.astype(np.float32) / np.float32(255.0)
+
+        self.m_texture_sprite_atlas = GPUTexture(self.m_texture_atlas_dimensions, layers = self.m_sprite_atlas_page_count, format = "RGBA8",
+                                                 data = Buffer("FLOAT", sprite_atlas.size, sprite_atlas.ravel()))
+        view.m_texture_combined_render = GPUTexture(view.m_viewport_dimensions, format = "RGBA8",
+                                                    data = Buffer("FLOAT", combined_render.size, combined_render.ravel()))
 
-        self.m_program_sprite_atlas_render_channels.bind()
+        for page in range(self.m_sprite_atlas_page_count):
+            self.m_texture_name_to_display_texture_info[get_sprite_atlas_page_name(page)]["texture"] = self.m_texture_sprite_atlas
+        view.m_texture_name_to_display_texture_info["Combined Render"]["texture"] = view.m_texture_combined_render
 
-        self.m_program_sprite_atlas_render_channels.uniform_float("viewportWidth", float(self.m_viewport_dimensions[0]))
-        self.m_program_sprite_atlas_render_channels.uniform_float("viewportHeight", float(self.m_viewport_dimensions[1]))
-        
+        self.m_cpu_backend_seconds += time.perf_counter() - start
+
+    # writes the sprite atlas of every rendered frame to directory until stop_atlas_export
+    def start_atlas_export(self, directory : str, format : str = BAD_EXPORT_FORMAT, crop : str = BAD_EXPORT_CROP):
+        self.stop_atlas_export()
+
+        writer = BAD_ImageSequenceWriter(directory, format, crop, BAD_EXPORT_WORKERS, BAD_EXPORT_MAX_PENDING_FRAMES)
+        self.m_atlas_exporter = BAD_AtlasExporter(writer)
+
+        # export the current frame as well
+        for view in self.m_views.values():
+            view.m_frame_signature = None
+
+    # reads back the last frame and waits for the queued frames to be written
+    def stop_atlas_export(self):
+        if self.m_atlas_exporter != None:
+            self.m_atlas_exporter.close()
+            self.m_atlas_exporter = None
+
+        self.m_texture_sprite_atlas_back = None
+
+    # the atlas of this frame is handed to the exporter and the next frame renders into the other texture of the pair,
+    # the exporter reads this one back in the next frame once the gpu is done with it
+    def export_sprite_atlas(self, frame : int):
+        if self.m_compute_backend == "CPU":
+            self.m_atlas_exporter.submit_array(self.m_sprite_atlas_pixels, frame, self.m_atlas_packer.m_rects)
+            return
 
-        self.m_program_sprite_atlas_render_channels.uniform_block("cellViewports", self.m_uniform_buffer_cell_viewports)
+        self.m_atlas_exporter.submit_texture(self.m_texture_sprite_atlas, frame, self.m_atlas_packer.m_rects, self.m_sprite_atlas_page_count,
+                                             self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1])
 
-        self.m_program_sprite_atlas_render_channels.image("objectIDs", self.m_texture_name_to_display_texture_info["Object ID"]["texture"])
-        self.m_program_sprite_atlas_render_channels.image("colors", self.m_texture_name_to_display_texture_info["Color"]["texture"])
-        self.m_program_sprite_atlas_render_channels.image("spriteAtlasR", self.m_texture_name_to_display_texture_info["Sprite Atlas R"]["texture"])
-        self.m_program_sprite_atlas_render_channels.image("spriteAtlasG", self.m_texture_name_to_display_texture_info["Sprite Atlas G"]["texture"])
-        self.m_program_sprite_atlas_render_channels.image("spriteAtlasB", self.m_texture_name_to_display_texture_info["Sprite Atlas B"]["texture"])
-        self.m_program_sprite_atlas_render_channels.image("spriteAtlasAverageDenominator", self.m_texture_name_to_display_texture_info["Sprite Atlas Average Denominator"]["texture"])
+        if self.m_texture_sprite_atlas_back == None:
+            self.m_texture_sprite_atlas_back = GPUTexture(self.m_texture_atlas_dimensions, layers = self.m_sprite_atlas_page_count, format = "RGBA8")
 
-        gpu.compute.dispatch(self.m_program_sprite_atlas_render_channels, ceil(self.m_viewport_dimensions[0] / 32), ceil(self.m_viewport_dimensions[1] / 32), 1)
+        self.m_texture_sprite_atlas, self.m_texture_sprite_atlas_back = self.m_texture_sprite_atlas_back, self.m_texture_sprite_atlas
 
+        for page in range(self.m_sprite_atlas_page_count):
+            self.m_texture_name_to_display_texture_info[get_sprite_atlas_page_name(page)]["texture"] = self.m_texture_sprite_atlas
 
-        
-        self.m_program_sprite_atlas_merge_channels_to_texture.bind()
+    def create_sprite_atlas_textures(self):
+        layers = self.m_sprite_atlas_page_count
 
-        self.m_program_sprite_atlas_merge_channels_to_texture.uniform_float("atlasWidth", float(self.m_texture_atlas_dimensions[0]))
-        self.m_program_sprite_atlas_merge_channels_to_texture.uniform_float("atlasHeight", float(self.m_texture_atlas_dimensions[1]))
+        self.m_texture_sprite_atlas = GPUTexture(self.m_texture_atlas_dimensions, layers = layers, format = "RGBA8")
+        self.m_texture_sprite_atlas.clear(format = "FLOAT", value = (0.0, 0.0, 0.0, 1.0))
+        self.m_texture_sprite_atlas_back = None
+        self.m_sprite_atlas_history = None # nothing to reuse in the new textures
+
+        # the gather kernel writes the atlas directly and needs no accumulators
+        if self.m_sprite_atlas_kernel == "GATHER":
+            self.m_texture_name_to_display_texture_info.pop("Sprite Atlas Accumulator", None)
+        else:
+            # r, g, b and count of every page in one image, see compute_shader_source_sprite_atlas_render_channels
+            accumulator_layers = layers * sprite_atlas_layers_per_page(self.m_sprite_atlas_kernel, self.m_is_sprite_atlas_packed)
+            self.m_texture_sprite_atlas_accumulator = GPUTexture(self.m_texture_atlas_dimensions, layers = accumulator_layers, format = "R32UI")
+            self.m_texture_sprite_atlas_accumulator.clear(format = "UINT", value = (0,))
+
+            # debug view of the first layer
+            self.m_texture_name_to_display_texture_info["Sprite Atlas Accumulator"] = { "texture" : self.m_texture_sprite_atlas_accumulator,
+                                                                                       "layer" : 0.0,
+                                                                                       "is_multiple_channels" : 0.0,
+                                                                                       "channel_min" : 0.0,
+                                                                                       "channel_max" : 255.0}
+
+        for page in range(layers):
+            self.m_texture_name_to_display_texture_info[get_sprite_atlas_page_name(page)] = { "texture" : self.m_texture_sprite_atlas,
+                                                                                              "layer" : float(page),
+                                                                                              "is_multiple_channels" : 1.0,
+                                                                                              "channel_min" : 0.0,
+                                                                                              "channel_max" : 1.0}
+
+    # (bytes of the sprite atlas textures, estimated bytes moved per frame rendering every view or None for the gather kernel)
+    def sprite_atlas_statistics(self) -> tuple:
+        layers_per_page = sprite_atlas_layers_per_page(self.m_sprite_atlas_kernel, self.m_is_sprite_atlas_packed)
+        memory = sprite_atlas_memory_bytes(self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1], self.m_sprite_atlas_page_count, layers_per_page)
+
+        # the atomic kernel reads the cell owners for the dirty cells, the gather kernel counts them as its layer
+        if self.m_sprite_atlas_kernel == "GATHER":
+            return memory, None
+
+        memory += sprite_atlas_memory_bytes(self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1], self.m_sprite_atlas_page_count, 0)
+
+        traffic = 0
+        for view in self.m_views.values():
+            traffic += sprite_atlas_frame_traffic_bytes(view.m_viewport_dimensions[0] * view.m_viewport_dimensions[1], self.m_texture_atlas_dimensions[0],
+                                                        self.m_texture_atlas_dimensions[1], self.m_sprite_atlas_page_count, layers_per_page)
+        return memory, traffic
+
+    def create_cell_viewports_table(self):
+        self.m_cell_viewports = np.zeros((BAD_CELL_VIEWPORTS_PER_ROW, 2, 4), dtype = np.float32)
+        self.m_cell_layout_version += 1
+        self.m_is_cell_layout_dirty = True
+
+    # the table is a RGBA32F texture so it grows by adding rows, the shaders only need CELL_VIEWPORTS_PER_ROW.
+    # Every view has its own copy since cell 0 holds its dimensions, the caller sets them
+    def upload_cell_viewports_table(self, view : BAD_View):
+        start = time.perf_counter()
+
+        rows = len(self.m_cell_viewports) // BAD_CELL_VIEWPORTS_PER_ROW
+        buffer_cell_viewports = Buffer("FLOAT", self.m_cell_viewports.size, self.m_cell_viewports.ravel())
+        view.m_texture_cell_viewports = GPUTexture((BAD_CELL_VIEWPORTS_PER_ROW * 2, rows), format = "RGBA32F", data = buffer_cell_viewports)
+        view.m_cell_layout_version = self.m_cell_layout_version
+
+        self.m_cell_viewports_upload_seconds = time.perf_counter() - start
+
+    # objects inside the frustum of any view get an atlas cell, views that did not render this frame keep the objects of their last render
+    def update_visible_object_ids(self, views : list):
+        visible_object_ids = None
+
+        if BAD_FRUSTUM_CULLING:
+            visible_object_ids = set()
+            for view in views:
+                if view.m_visible_object_ids != None:
+                    visible_object_ids.update(view.m_visible_object_ids)
+
+        if visible_object_ids == self.m_visible_object_ids:
+            return
 
-        self.m_program_sprite_atlas_merge_channels_to_texture.image("spriteAtlasR", self.m_texture_name_to_display_texture_info["Sprite Atlas R"]["texture"])
-        self.m_program_sprite_atlas_merge_channels_to_texture.image("spriteAtlasG", self.m_texture_name_to_display_texture_info["Sprite Atlas G"]["texture"])
-        self.m_program_sprite_atlas_merge_channels_to_texture.image("spriteAtlasB", self.m_texture_name_to_display_texture_info["Sprite Atlas B"]["texture"])
-        self.m_program_sprite_atlas_merge_channels_to_texture.image("spriteAtlas", self.m_texture_name_to_display_texture_info["Sprite Atlas"]["texture"])
-        self.m_program_sprite_atlas_merge_channels_to_texture.image("spriteAtlasAverageDenominator", self.m_texture_name_to_display_texture_info["Sprite Atlas Average Denominator"]["texture"])
+        self.m_visible_object_ids = visible_object_ids
 
-        gpu.compute.dispatch(self.m_program_sprite_atlas_merge_channels_to_texture, ceil((self.m_texture_atlas_dimensions[0] * self.m_texture_atlas_dimensions[1]) / 32), 1, 1)
+        # objects entering the views need their atlas cell right away, fixed resolution objects leaving them free theirs.
+        # Auto resolution objects leaving keep their cell until update_auto_resolutions or another rebuild drops it
+        if visible_object_ids == None or self.m_cell_object_ids == None or len(visible_object_ids - self.m_cell_object_ids) > 0:
+            self.m_is_cell_layout_dirty = True
+        elif len(self.m_cell_object_ids - visible_object_ids - set(self.m_auto_resolution_ids.tolist())) > 0:
+            self.m_is_cell_layout_dirty = True
 
-        self.m_program_combined_render.bind()
+    # the screen space power of two size of every object is its largest in any view, views that did not render this frame
+    # keep the sizes of their last render. An auto resolution object only dirties the layout once its clamped size stayed
+    # larger than its cell or more than BAD_AUTO_RESOLUTION_HYSTERESIS_POWERS smaller (or it stayed out of view) for
+    # BAD_AUTO_RESOLUTION_HYSTERESIS_FRAMES frames, so sizes going back and forth around a power of two do not repack
+    def update_auto_resolutions(self, views : list):
+        extents = np.zeros((self.m_object_id_counter, 2), dtype = np.float32)
 
-        self.m_program_combined_render.uniform_float("viewportWidth", float(self.m_viewport_dimensions[0]))
-        self.m_program_combined_render.uniform_float("viewportHeight", float(self.m_viewport_dimensions[1]))
-        
-        self.m_program_combined_render.uniform_block("cellViewports", self.m_uniform_buffer_cell_viewports)
-        
-        self.m_program_combined_render.image("objectIDs", self.m_texture_name_to_display_texture_info["Object ID"]["texture"])
-        self.m_program_combined_render.image("colors", self.m_texture_name_to_display_texture_info["Color"]["texture"])
-        self.m_program_combined_render.image("spriteAtlas", self.m_texture_name_to_display_texture_info["Sprite Atlas"]["texture"])
-        self.m_program_combined_render.image("combinedRender", self.m_texture_name_to_display_texture_info["Combined Render"]["texture"])
+        for view in views:
+            if view.m_screen_extents != None:
+                object_ids, view_extents = view.m_screen_extents
+                is_known = object_ids < self.m_object_id_counter
+                np.maximum.at(extents, object_ids[is_known], view_extents[is_known])
 
-        gpu.compute.dispatch(self.m_program_combined_render, ceil((self.m_viewport_dimensions[0] * self.m_viewport_dimensions[1]) / 32), 1, 1)
+        self.m_screen_resolution_powers = np.ceil(np.log2(np.maximum(extents * BAD_AUTO_RESOLUTION_SCALE, 1.0))).astype(np.int64)
 
-        self.m_texture_name_to_display_texture_info["Object ID"]["channel_max"] = len(self.m_vertex_buffers)
-        self.m_texture_name_to_display_texture_info["Depth Linearized"]["channel_min"] = near
-        self.m_texture_name_to_display_texture_info["Depth Linearized"]["channel_max"] = far
+        if len(self.m_auto_resolution_ids) == 0:
+            return
 
-        # draw Image 2D in Image Editor
-        # for now draw the Object ID
-        if texture_name != None and image_editor_aspect_ratio != 0:
-            texture_info = self.m_texture_name_to_display_texture_info[texture_name]
+        is_outside = self.outside_auto_resolution_band(self.m_auto_resolution_ids, self.m_auto_resolution_limits, self.m_auto_resolution_powers)
+        self.m_auto_resolution_pending_frames = np.where(is_outside, self.m_auto_resolution_pending_frames + 1, 0)
 
-            # center texture with fixed aspect ratio
-            texture_width = texture_info["texture"].width
-            texture_height = texture_info["texture"].height
-            texture_aspect_ratio = texture_width / texture_height
+        if np.any(self.m_auto_resolution_pending_frames >= BAD_AUTO_RESOLUTION_HYSTERESIS_FRAMES):
+            self.m_auto_resolution_change_count += 1
+            self.m_is_cell_layout_dirty = True
 
-            d = texture_aspect_ratio / image_editor_aspect_ratio
-            
-            if texture_width >= texture_height:
-                pos = ((-1.0, -1.0 / d), (1.0, -1.0 / d), (1.0, 1.0 / d), (-1.0, 1.0 / d))
-            else: # texture_height > texture_width:
-                pos = ((-1.0 * d, -1.0), (1.0 * d, -1.0), (1.0 * d, 1.0), (-1.0 * d, 1.0))
-            batch = batch_for_shader(self.m_program_texture_display, "TRI_FAN",
-                                                    {
-                                                        "pos" : pos,
-                                                        "texCoord" :((0, 0), (1, 0), (1, 1), (0, 1))
-                                                    })
-            
-            self.m_program_texture_display.bind()
-            self.m_program_texture_display.uniform_sampler("tex", texture_info["texture"])
-
-            is_multiple_channels = texture_info["is_multiple_channels"]
-            channel_min = texture_info["channel_min"]
-            channel_max = texture_info["channel_max"]
-
-            self.m_program_texture_display.uniform_float("isMultipleChannels", is_multiple_channels)
-            self.m_program_texture_display.uniform_float("channelMin", channel_min)
-            self.m_program_texture_display.uniform_float("channelMax", channel_max)
-            batch.draw(self.m_program_texture_display)
-    
-    def create_textures(self, context : bpy.types.Context):
-        self.m_viewport_dimensions = self.query_view_3d_dimensions(context)
-        self.m_texture_color_attachment_object_id = GPUTexture(self.m_viewport_dimensions, format = "R32F")
-        self.m_texture_color_attachment_object_id.clear(format = "FLOAT", value = (0.0,))
-        self.m_texture_color_attachment_linearized_depth = GPUTexture(self.m_viewport_dimensions, format = "R32F")
-        self.m_texture_color_attachment_linearized_depth.clear(format = "FLOAT", value = (0.0,))
-        self.m_texture_depth_attachment = GPUTexture(self.m_viewport_dimensions, format = "DEPTH_COMPONENT24")
-        self.m_texture_depth_attachment.clear(format = "FLOAT", value = (1.0,))
-        self.m_texture_combined_render = GPUTexture(self.m_viewport_dimensions, format = "RGBA8")
-        self.m_texture_combined_render.clear(format = "FLOAT", value = (0.0, 0.0, 0.0, 1.0))
-
-        self.m_texture_name_to_display_texture_info["Object ID"] = { "texture" : self.m_texture_color_attachment_object_id,
-                                                                     "is_multiple_channels" : 0.0,
-                                                                     "channel_min" : 0.0,
-                                                                     "channel_max" : 0.0} # set to default values they are going to be updated in render
-        self.m_texture_name_to_display_texture_info["Depth Linearized"] = { "texture" : self.m_texture_color_attachment_linearized_depth,
-                                                                            "is_multiple_channels" : 0.0,
-                                                                            "channel_min" : 0.0, # set to default values they are going to be updated in render
-                                                                            "channel_max" : 0.0}
-        self.m_texture_name_to_display_texture_info["Combined Render"] = { "texture" : self.m_texture_combined_render,
-                                                                           "is_multiple_channels" : 1.0,
-                                                                           "channel_min" : 0.0,
-                                                                           "channel_max" : 1.0}
+    # (n,) whether the auto resolution objects object_ids with cells of (n, 2) powers are out of view or want a size
+    # outside of the hysteresis band of their cell. The band only reaches below the cell, a cell smaller than the object
+    # on screen shows and is grown once the frames passed while a larger one only wastes texels
+    def outside_auto_resolution_band(self, object_ids : np.ndarray, limits : np.ndarray, powers : np.ndarray) -> np.ndarray:
+        differences = self.auto_resolution_powers(object_ids, limits) - powers
+        is_outside = np.any((differences > 0) | (differences < -BAD_AUTO_RESOLUTION_HYSTERESIS_POWERS), axis = 1)
 
-    def create_sprite_atlas_textures(self):
-        self.m_texture_sprite_atlas_r = GPUTexture(self.m_texture_atlas_dimensions, format = "R32UI")
-        self.m_texture_sprite_atlas_r.clear(format = "UINT", value = (0,))
-        self.m_texture_sprite_atlas_g = GPUTexture(self.m_texture_atlas_dimensions, format = "R32UI")
-        self.m_texture_sprite_atlas_g.clear(format = "UINT", value = (0,))
-        self.m_texture_sprite_atlas_b = GPUTexture(self.m_texture_atlas_dimensions, format = "R32UI")
-        self.m_texture_sprite_atlas_b.clear(format = "UINT", value = (0,))
-        self.m_texture_sprite_atlas_average_denominator = GPUTexture(self.m_texture_atlas_dimensions, format = "R32UI")
-        self.m_texture_sprite_atlas_average_denominator.clear(format = "UINT", value = (0,))
-        self.m_texture_sprite_atlas = GPUTexture(self.m_texture_atlas_dimensions, format = "RGBA8")
-        self.m_texture_sprite_atlas.clear(format = "FLOAT", value = (0.0, 0.0, 0.0, 1.0))
-        
+        if self.m_visible_object_ids != None:
+            is_outside |= ~np.isin(object_ids, list(self.m_visible_object_ids))
 
-        self.m_texture_name_to_display_texture_info["Sprite Atlas R"] = { "texture" : self.m_texture_sprite_atlas_r,
-                                                                     "is_multiple_channels" : 0.0,
-                                                                     "channel_min" : 0.0,
-                                                                     "channel_max" : 255.0}
-        self.m_texture_name_to_display_texture_info["Sprite Atlas G"] = { "texture" : self.m_texture_sprite_atlas_g,
-                                                                            "is_multiple_channels" : 0.0,
-                                                                            "channel_min" : 0.0,
-                                                                            "channel_max" : 255.0}
-        
-        self.m_texture_name_to_display_texture_info["Sprite Atlas B"] = { "texture" : self.m_texture_sprite_atlas_b,
-                                                                     "is_multiple_channels" : 0.0,
-                                                                     "channel_min" : 0.0,
-                                                                     "channel_max" : 255.0}
-        self.m_texture_name_to_display_texture_info["Sprite Atlas Average Denominator"] = { "texture" : self.m_texture_sprite_atlas_average_denominator,
-                                                                     "is_multiple_channels" : 0.0,
-                                                                     "channel_min" : 0.0,
-                                                                     "channel_max" : 255.0}
-        self.m_texture_name_to_display_texture_info["Sprite Atlas"] = { "texture" : self.m_texture_sprite_atlas,
-                                                                            "is_multiple_channels" : 1.0,
-                                                                            "channel_min" : 0.0,
-                                                                            "channel_max" : 1.0}
-
-    def create_uniform_buffer_cell_viewports(self):
-        self.m_cell_viewports = [[0.0, 0.0, 0.0, 0.0] for i in range(BAD_MAX_CELL_VIEWPORTS_SIZE)]
+        return is_outside
 
-        for obj in bpy.data.objects:
-            if obj.bad_settings.m_is_enabled:
-                self.m_cell_viewports[obj.bad_settings.m_id][2] = float(obj.bad_settings.m_render_resolution_width)
-                self.m_cell_viewports[obj.bad_settings.m_id][3] = float(obj.bad_settings.m_render_resolution_height)
-
-        width_counter = 0
-        height_counter = 0
-        max_resolution_height = 0
-        #max_resolution_width = 0
-
-        # cell_viewports[0] is a special viewport holding the view 3d viewport
-        self.m_cell_viewports[0][2] = float(self.m_viewport_dimensions[0]) 
-        self.m_cell_viewports[0][3] = float(self.m_viewport_dimensions[1])
-
-        for i in range(1, self.m_object_id_counter):
-            if i >= BAD_MAX_CELL_VIEWPORTS_SIZE:
-                print(f"Warning: Uniform Buffer is full more than:{BAD_MAX_CELL_VIEWPORTS_SIZE} objects exist\n")
-                break # uniform  buffer is full
-            self.m_cell_viewports[i][0] = float(width_counter)
-            self.m_cell_viewports[i][1] = float(height_counter)
-            width_counter = width_counter + self.m_cell_viewports[i][2]
-            if max_resolution_height < height_counter + self.m_cell_viewports[i][3]:
-                max_resolution_height = height_counter + self.m_cell_viewports[i][3]
-            if width_counter >= BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH:
-                width_counter = 0
-                height_counter = max_resolution_height
-                if height_counter >= BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT:
-                    print(f"Warning: Texture atlas with size({BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH}, {BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT}) is full, reduce resolutions\n")
-                    break # texture atlas is full #TODO: Create new texture atlas and put it into texture atlas map and map all ids 
-            #if max_resolution_width < width_counter + self.m_cell_viewports[i][2]:
-            #    max_resolution_width = width_counter + self.m_cell_viewports[i][2]
-
-        self.m_buffer_cell_viewports = Buffer("FLOAT", (BAD_MAX_CELL_VIEWPORTS_SIZE, 4), self.m_cell_viewports)
-        self.m_uniform_buffer_cell_viewports = GPUUniformBuf(self.m_buffer_cell_viewports)
-
-    def create_framebuffers(self):
-        self.m_framebuffer_view_3d = GPUFrameBuffer(depth_slot = self.m_texture_depth_attachment, color_slots = (self.m_texture_color_attachment_object_id, self.m_texture_color_attachment_linearized_depth))
-        
-        if self.m_framebuffer_offscreen != None:
-            self.m_framebuffer_offscreen.free()
-        
-        self.m_framebuffer_offscreen = GPUOffScreen(self.m_viewport_dimensions[0], self.m_viewport_dimensions[1], format = "RGBA8")
+    # (n, 2) power of two exponents of the cells of object_ids, their screen space size clamped to their (n, 2) (min, max) powers
+    def auto_resolution_powers(self, object_ids : np.ndarray, limits : np.ndarray) -> np.ndarray:
+        powers = np.zeros((len(object_ids), 2), dtype = np.int64)
+        is_known = object_ids < len(self.m_screen_resolution_powers)
+        powers[is_known] = self.m_screen_resolution_powers[object_ids[is_known]]
+
+        return np.minimum(np.maximum(powers, limits[:, 0:1]), limits[:, 1:2])
+
+    # repacks the cells and bumps the layout version, only when the layout is dirty:
+    # a m_is_resolution_dirty object setting (resolution or m_is_enabled changed), objects added or removed,
+    # new object ids or a viewport resize. The views upload the table before their next atlas pass
+    def update_cell_viewports_table(self):
+        if len(bpy.data.objects) != self.m_object_count:
+            self.m_object_count = len(bpy.data.objects)
+            self.m_is_cell_layout_dirty = True
+
+        if not self.m_is_cell_layout_dirty:
+            return
 
-        self.m_texture_name_to_display_texture_info["Color"] = { "texture" : self.m_framebuffer_offscreen.texture_color,
-                                                                 "is_multiple_channels" : 1.0,
-                                                                 "channel_min" : 0.0,
-                                                                 "channel_max" : 1.0}
+        self.m_is_cell_layout_dirty = False
+        self.m_cell_layout_rebuild_count += 1
+        self.m_cell_object_ids = self.m_visible_object_ids
+
+        cell_sizes = {}
+        auto_resolution_ids = []
+        auto_resolution_limits = []
+
+        for obj in bpy.data.objects:
+            settings = obj.bad_settings
+            if settings.m_is_resolution_dirty:
+                settings.m_is_resolution_dirty = False
+            is_visible = self.m_visible_object_ids == None or settings.m_id in self.m_visible_object_ids
+            if settings.m_is_enabled and is_visible and 0 < settings.m_id < self.m_object_id_counter:
+                if settings.m_is_auto_resolution:
+                    auto_resolution_ids.append(settings.m_id)
+                    auto_resolution_limits.append((settings.m_auto_resolution_min_power, settings.m_auto_resolution_max_power))
+                else:
+                    cell_sizes[settings.m_id] = (settings.m_render_resolution_width, settings.m_render_resolution_height)
+
+        # objects inside the hysteresis band keep the size of their cell, the rest take their screen space size even when
+        # they have not been outside of the band for long since the layout is rebuilt anyway
+        previous_powers = dict(zip(self.m_auto_resolution_ids.tolist(), self.m_auto_resolution_powers.tolist()))
+        object_ids = np.array(auto_resolution_ids, dtype = np.int64)
+        limits = np.array(auto_resolution_limits, dtype = np.int64).reshape(-1, 2)
+        powers = self.auto_resolution_powers(object_ids, limits)
+
+        is_kept = np.array([object_id in previous_powers for object_id in auto_resolution_ids], dtype = bool)
+        if np.any(is_kept):
+            kept_powers = np.array([previous_powers[object_id] for object_id in object_ids[is_kept].tolist()], dtype = np.int64).reshape(-1, 2)
+            kept_powers = np.minimum(np.maximum(kept_powers, limits[is_kept, 0:1]), limits[is_kept, 1:2]) # the limits may have changed
+            is_inside = ~self.outside_auto_resolution_band(object_ids[is_kept], limits[is_kept], kept_powers)
+            powers[np.flatnonzero(is_kept)[is_inside]] = kept_powers[is_inside]
+
+        self.m_auto_resolution_ids = object_ids
+        self.m_auto_resolution_limits = limits
+        self.m_auto_resolution_powers = powers
+        self.m_auto_resolution_pending_frames = np.zeros(len(object_ids), dtype = np.int64)
+
+        for object_id, (width_power, height_power) in zip(auto_resolution_ids, self.m_auto_resolution_powers.tolist()):
+            cell_sizes[object_id] = (1 << width_power, 1 << height_power)
+
+        # only cells that were added, removed or resized are touched
+        failed_ids = self.m_atlas_packer.update(cell_sizes, BAD_SPRITE_ATLAS_REPACK_FRACTION)
+
+        if len(failed_ids) > 0:
+            print(f"Warning: Texture atlas with {BAD_MAX_SPRITE_ATLAS_PAGES} pages of size({BAD_MAX_TEXTURE_SPRITE_ATLAS_WIDTH}, {BAD_MAX_TEXTURE_SPRITE_ATLAS_HEIGHT}) is full, {len(failed_ids)} cells do not fit, reduce resolutions\n")
+
+        rects = np.array(list(self.m_atlas_packer.m_rects.values()), dtype = np.int64).reshape(-1, 5)
+        # any view may render into the atlas, the largest one bounds the contributors
+        width = max((view.m_viewport_dimensions[0] for view in self.m_views.values()), default = 1)
+        height = max((view.m_viewport_dimensions[1] for view in self.m_views.values()), default = 1)
+        is_packed = self.m_sprite_atlas_kernel != "GATHER" and max_contributors(rects, width, height) <= BAD_MAX_PACKED_CONTRIBUTORS
+
+        if self.m_atlas_packer.page_count() > self.m_sprite_atlas_page_count or is_packed != self.m_is_sprite_atlas_packed:
+            # the atlas is recomputed every frame so nothing has to be copied to the new textures
+            self.m_sprite_atlas_page_count = max(self.m_sprite_atlas_page_count, self.m_atlas_packer.page_count())
+            self.m_is_sprite_atlas_packed = is_packed
+            self.create_sprite_atlas_textures()
+            self.create_sprite_atlas_page_images()
+
+        # the gather kernel starts from the owners, the atomic kernel only uses them for the dirty cells
+        cell_owners = build_cell_owners(self.m_atlas_packer.m_rects, self.m_texture_atlas_dimensions[0], self.m_texture_atlas_dimensions[1], self.m_sprite_atlas_page_count)
+        self.m_cell_owners = cell_owners
+        buffer_cell_owners = Buffer("FLOAT", cell_owners.size, cell_owners.ravel())
+        self.m_texture_cell_owners = GPUTexture(self.m_texture_atlas_dimensions, layers = self.m_sprite_atlas_page_count, format = "R32F", data = buffer_cell_owners)
+
+        # grow by doubling the rows so adding objects one by one does not reallocate every time
+        capacity = len(self.m_cell_viewports)
+        while capacity < self.m_object_id_counter:
+            capacity *= 2
+
+        if capacity != len(self.m_cell_viewports):
+            self.m_cell_viewports = np.zeros((capacity, 2, 4), dtype = np.float32)
+        else:
+            self.m_cell_viewports.fill(0.0)
+
+        # one flag per cell laid out like the table, cleared before every atlas pass
+        if self.m_texture_dirty_cells == None or self.m_texture_dirty_cells.height != capacity // BAD_CELL_VIEWPORTS_PER_ROW:
+            self.m_texture_dirty_cells = GPUTexture((BAD_CELL_VIEWPORTS_PER_ROW, capacity // BAD_CELL_VIEWPORTS_PER_ROW), format = "R32UI")
+
+        if len(rects) > 0:
+            object_ids = np.fromiter(self.m_atlas_packer.m_rects.keys(), dtype = np.int64, count = len(rects))
+            self.m_cell_viewports[object_ids, 0, :] = rects[:, :4]
+            self.m_cell_viewports[object_ids, 1, 0] = rects[:, 4]
+
+        self.m_cell_layout_version += 1
 
     def create_images(self):
         if ((BAD_PREFIX + "Object ID") in bpy.data.images):
@@ -447,16 +1150,35 @@ class BAD_Pipeline:
         self.m_image_sprite_atlas = bpy.data.images.new(BAD_PREFIX + "Sprite Atlas", 1, 1)
         self.m_image_combined_render = bpy.data.images.new(BAD_PREFIX + "Combined Render", 1, 1)
 
+        self.create_sprite_atlas_page_images()
+
+    # page 0 uses the "Sprite Atlas" image, images of the other pages are added when the atlas grows
+    def create_sprite_atlas_page_images(self):
+        for page in range(1, self.m_sprite_atlas_page_count):
+            if not (BAD_PREFIX + get_sprite_atlas_page_name(page)) in bpy.data.images:
+                bpy.data.images.new(BAD_PREFIX + get_sprite_atlas_page_name(page), 1, 1)
+
+    # only describes the programs, they are compiled on first use by self.m_shaders
     def create_shaders(self):
-        shader_create_info_object_id_depth = GPUShaderCreateInfo()
+        shader_create_info_object_id_depth = BAD_ShaderDescription()
+
+        shader_create_info_object_id_depth.define("INSTANCES_PER_ROW", str(BAD_INSTANCES_PER_ROW))
+        shader_create_info_object_id_depth.define("INSTANCE_DATA_TEXELS", str(BAD_INSTANCE_DATA_TEXELS))
 
         shader_create_info_object_id_depth.push_constant("FLOAT", "near")
         shader_create_info_object_id_depth.push_constant("FLOAT", "far")
-        shader_create_info_object_id_depth.push_constant("FLOAT", "id")
+        shader_create_info_object_id_depth.push_constant("INT", "instanceOffset")
 
         shader_create_info_object_id_depth.vertex_in(0, "VEC3", "pos")
 
-        shader_create_info_object_id_depth.push_constant("MAT4", "mvp")
+        shader_create_info_object_id_depth.push_constant("MAT4", "vp")
+
+        shader_create_info_object_id_depth.sampler(0, "FLOAT_2D", "instanceData")
+
+        object_id_depth_out = BAD_ShaderDescription("object_id_depth_interface")
+        object_id_depth_out.flat("FLOAT", "instanceObjectID")
+
+        shader_create_info_object_id_depth.vertex_out(object_id_depth_out)
         
         shader_create_info_object_id_depth.fragment_out(0, "FLOAT", "objectID")
         shader_create_info_object_id_depth.fragment_out(1, "FLOAT", "linearizedDepth")
@@ -464,11 +1186,32 @@ class BAD_Pipeline:
         shader_create_info_object_id_depth.vertex_source(vertex_shader_source_object_id_depth)
         shader_create_info_object_id_depth.fragment_source(fragment_shader_source_object_id_depth)
 
-        self.m_program_object_id_depth = gpu.shader.create_from_info(shader_create_info_object_id_depth)
+        self.m_shaders.add("object_id_depth", shader_create_info_object_id_depth)
 
         del shader_create_info_object_id_depth
 
-        shader_create_info_texture_display = GPUShaderCreateInfo()
+        shader_create_info_object_id_depth_static = BAD_ShaderDescription()
+
+        shader_create_info_object_id_depth_static.push_constant("FLOAT", "near")
+        shader_create_info_object_id_depth_static.push_constant("FLOAT", "far")
+        shader_create_info_object_id_depth_static.push_constant("MAT4", "vp")
+
+        shader_create_info_object_id_depth_static.vertex_in(0, "VEC3", "pos")
+        shader_create_info_object_id_depth_static.vertex_in(1, "FLOAT", "vertexObjectID")
+
+        shader_create_info_object_id_depth_static.vertex_out(object_id_depth_out)
+
+        shader_create_info_object_id_depth_static.fragment_out(0, "FLOAT", "objectID")
+        shader_create_info_object_id_depth_static.fragment_out(1, "FLOAT", "linearizedDepth")
+
+        shader_create_info_object_id_depth_static.vertex_source(vertex_shader_source_object_id_depth_static)
+        shader_create_info_object_id_depth_static.fragment_source(fragment_shader_source_object_id_depth)
+
+        self.m_shaders.add("object_id_depth_static", shader_create_info_object_id_depth_static)
+
+        del shader_create_info_object_id_depth_static
+
+        shader_create_info_texture_display = BAD_ShaderDescription()
 
         shader_create_info_texture_display.push_constant("FLOAT", "isMultipleChannels")
         shader_create_info_texture_display.push_constant("FLOAT", "channelMin")
@@ -479,7 +1222,7 @@ class BAD_Pipeline:
         shader_create_info_texture_display.vertex_in(0, "VEC2", "pos")
         shader_create_info_texture_display.vertex_in(1, "VEC2", "texCoord")
 
-        vertex_out = GPUStageInterfaceInfo("texture_display_interface")
+        vertex_out = BAD_ShaderDescription("texture_display_interface")
         vertex_out.smooth("VEC2", "fragTex")
 
         shader_create_info_texture_display.vertex_out(vertex_out)
@@ -489,101 +1232,510 @@ class BAD_Pipeline:
         shader_create_info_texture_display.vertex_source(vertex_shader_source_texture_display)
         shader_create_info_texture_display.fragment_source(fragment_shader_source_texture_display)
 
-        self.m_program_texture_display = gpu.shader.create_from_info(shader_create_info_texture_display)
+        self.m_shaders.add("texture_display", shader_create_info_texture_display)
 
         del shader_create_info_texture_display
 
-        shader_create_info_sprite_atlas_render_channels = GPUShaderCreateInfo()
+        shader_create_info_texture_array_display = BAD_ShaderDescription()
+
+        shader_create_info_texture_array_display.push_constant("FLOAT", "layer")
+        shader_create_info_texture_array_display.push_constant("FLOAT", "isMultipleChannels")
+        shader_create_info_texture_array_display.push_constant("FLOAT", "channelMin")
+        shader_create_info_texture_array_display.push_constant("FLOAT", "channelMax")
+
+        shader_create_info_texture_array_display.sampler(0, "FLOAT_2D_ARRAY", "tex")
+
+        shader_create_info_texture_array_display.vertex_in(0, "VEC2", "pos")
+        shader_create_info_texture_array_display.vertex_in(1, "VEC2", "texCoord")
+
+        shader_create_info_texture_array_display.vertex_out(vertex_out)
+
+        shader_create_info_texture_array_display.fragment_out(0, "VEC4", "fragOut")
+
+        shader_create_info_texture_array_display.vertex_source(vertex_shader_source_texture_display)
+        shader_create_info_texture_array_display.fragment_source(fragment_shader_source_texture_array_display)
+
+        self.m_shaders.add("texture_array_display", shader_create_info_texture_array_display)
+
+        del shader_create_info_texture_array_display
+
+        shader_create_info_sprite_atlas_render_channels = BAD_ShaderDescription()
         shader_create_info_sprite_atlas_render_channels.compute_source(compute_shader_source_sprite_atlas_render_channels)
-        shader_create_info_sprite_atlas_render_channels.define("MAX_CELL_VIEWPORTS", str(BAD_MAX_CELL_VIEWPORTS_SIZE))
+        shader_create_info_sprite_atlas_render_channels.define("CELL_VIEWPORTS_PER_ROW", str(BAD_CELL_VIEWPORTS_PER_ROW))
         shader_create_info_sprite_atlas_render_channels.local_group_size(8, 8, 1)
 
         shader_create_info_sprite_atlas_render_channels.push_constant("FLOAT", "viewportWidth")
         shader_create_info_sprite_atlas_render_channels.push_constant("FLOAT", "viewportHeight")
+        shader_create_info_sprite_atlas_render_channels.push_constant("FLOAT", "cellCount")
+        shader_create_info_sprite_atlas_render_channels.push_constant("INT", "packedSums")
+        shader_create_info_sprite_atlas_render_channels.push_constant("INT", "isIncremental")
 
-        shader_create_info_sprite_atlas_render_channels.uniform_buf(0, "vec4[" + str(BAD_MAX_CELL_VIEWPORTS_SIZE) + "]", "cellViewports")
+        shader_create_info_sprite_atlas_render_channels.sampler(0, "FLOAT_2D", "cellViewports")
         shader_create_info_sprite_atlas_render_channels.image(1, "R32F", "FLOAT_2D", "objectIDs", qualifiers = {"READ"})
         shader_create_info_sprite_atlas_render_channels.image(2, "RGBA8", "FLOAT_2D", "colors", qualifiers = {"READ"})
-        shader_create_info_sprite_atlas_render_channels.image(3, "R32UI", "UINT_2D", "spriteAtlasR", qualifiers = {"READ", "WRITE"})
-        shader_create_info_sprite_atlas_render_channels.image(4, "R32UI", "UINT_2D", "spriteAtlasG", qualifiers = {"READ", "WRITE"})
-        shader_create_info_sprite_atlas_render_channels.image(5, "R32UI", "UINT_2D", "spriteAtlasB", qualifiers = {"READ", "WRITE"})
-        shader_create_info_sprite_atlas_render_channels.image(6, "R32UI", "UINT_2D", "spriteAtlasAverageDenominator", qualifiers = {"READ", "WRITE"})
+        shader_create_info_sprite_atlas_render_channels.image(3, "R32UI", "UINT_2D_ARRAY", "spriteAtlasAccumulator", qualifiers = {"READ", "WRITE"})
+        shader_create_info_sprite_atlas_render_channels.image(8, "R32F", "FLOAT_2D_ARRAY", "cellOwners", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_render_channels.image(9, "R32UI", "UINT_2D", "dirtyCells", qualifiers = {"READ"})
+
+        self.m_shaders.add("sprite_atlas_render_channels", shader_create_info_sprite_atlas_render_channels)
+
+        shader_create_info_sprite_atlas_mark_dirty_cells = BAD_ShaderDescription()
+        shader_create_info_sprite_atlas_mark_dirty_cells.compute_source(compute_shader_source_sprite_atlas_mark_dirty_cells)
+        shader_create_info_sprite_atlas_mark_dirty_cells.define("CELL_VIEWPORTS_PER_ROW", str(BAD_CELL_VIEWPORTS_PER_ROW))
+        shader_create_info_sprite_atlas_mark_dirty_cells.local_group_size(8, 8, 1)
+
+        shader_create_info_sprite_atlas_mark_dirty_cells.push_constant("FLOAT", "viewportWidth")
+        shader_create_info_sprite_atlas_mark_dirty_cells.push_constant("FLOAT", "viewportHeight")
+        shader_create_info_sprite_atlas_mark_dirty_cells.push_constant("FLOAT", "cellCount")
 
-        self.m_program_sprite_atlas_render_channels = gpu.shader.create_from_info(shader_create_info_sprite_atlas_render_channels)
+        shader_create_info_sprite_atlas_mark_dirty_cells.sampler(0, "FLOAT_2D", "cellViewports")
+        shader_create_info_sprite_atlas_mark_dirty_cells.image(1, "R32F", "FLOAT_2D", "objectIDs", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_mark_dirty_cells.image(2, "RGBA8", "FLOAT_2D", "colors", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_mark_dirty_cells.image(8, "R32F", "FLOAT_2D_ARRAY", "cellOwners", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_mark_dirty_cells.image(9, "R32UI", "UINT_2D", "dirtyCells", qualifiers = {"WRITE"})
+        shader_create_info_sprite_atlas_mark_dirty_cells.image(10, "RG32UI", "UINT_2D", "pixelKeys", qualifiers = {"READ", "WRITE"})
 
-        shader_create_info_sprite_atlas_merge_channels_to_texture = GPUShaderCreateInfo()
+        self.m_shaders.add("sprite_atlas_mark_dirty_cells", shader_create_info_sprite_atlas_mark_dirty_cells)
+
+        shader_create_info_sprite_atlas_merge_channels_to_texture = BAD_ShaderDescription()
         shader_create_info_sprite_atlas_merge_channels_to_texture.compute_source(compute_shader_source_sprite_atlas_merge_channels_to_texture)
+        shader_create_info_sprite_atlas_merge_channels_to_texture.define("CELL_VIEWPORTS_PER_ROW", str(BAD_CELL_VIEWPORTS_PER_ROW))
 
         shader_create_info_sprite_atlas_merge_channels_to_texture.local_group_size(32, 1, 1)
         
         shader_create_info_sprite_atlas_merge_channels_to_texture.push_constant("FLOAT", "atlasWidth")
         shader_create_info_sprite_atlas_merge_channels_to_texture.push_constant("FLOAT", "atlasHeight")
-
-        shader_create_info_sprite_atlas_merge_channels_to_texture.image(3, "R32UI", "UINT_2D", "spriteAtlasR", qualifiers = {"READ", "WRITE"})
-        shader_create_info_sprite_atlas_merge_channels_to_texture.image(4, "R32UI", "UINT_2D", "spriteAtlasG", qualifiers = {"READ", "WRITE"})
-        shader_create_info_sprite_atlas_merge_channels_to_texture.image(5, "R32UI", "UINT_2D", "spriteAtlasB", qualifiers = {"READ", "WRITE"})
-        shader_create_info_sprite_atlas_merge_channels_to_texture.image(6, "RGBA8", "FLOAT_2D", "spriteAtlas", qualifiers = {"WRITE"})
-        shader_create_info_sprite_atlas_merge_channels_to_texture.image(7, "R32UI", "UINT_2D", "spriteAtlasAverageDenominator", qualifiers = {"READ", "WRITE"})
-
-        self.m_program_sprite_atlas_merge_channels_to_texture = gpu.shader.create_from_info(shader_create_info_sprite_atlas_merge_channels_to_texture)
+        shader_create_info_sprite_atlas_merge_channels_to_texture.push_constant("INT", "packedSums")
+        shader_create_info_sprite_atlas_merge_channels_to_texture.push_constant("INT", "isIncremental")
+
+        shader_create_info_sprite_atlas_merge_channels_to_texture.image(3, "R32UI", "UINT_2D_ARRAY", "spriteAtlasAccumulator", qualifiers = {"READ", "WRITE"})
+        shader_create_info_sprite_atlas_merge_channels_to_texture.image(6, "RGBA8", "FLOAT_2D_ARRAY", "spriteAtlas", qualifiers = {"WRITE"})
+        shader_create_info_sprite_atlas_merge_channels_to_texture.image(8, "R32F", "FLOAT_2D_ARRAY", "cellOwners", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_merge_channels_to_texture.image(9, "R32UI", "UINT_2D", "dirtyCells", qualifiers = {"READ"})
+
+        self.m_shaders.add("sprite_atlas_merge_channels_to_texture", shader_create_info_sprite_atlas_merge_channels_to_texture)
+
+        shader_create_info_sprite_atlas_gather = BAD_ShaderDescription()
+        shader_create_info_sprite_atlas_gather.compute_source(compute_shader_source_sprite_atlas_gather)
+        shader_create_info_sprite_atlas_gather.define("CELL_VIEWPORTS_PER_ROW", str(BAD_CELL_VIEWPORTS_PER_ROW))
+        shader_create_info_sprite_atlas_gather.local_group_size(8, 8, 1)
+
+        shader_create_info_sprite_atlas_gather.push_constant("FLOAT", "viewportWidth")
+        shader_create_info_sprite_atlas_gather.push_constant("FLOAT", "viewportHeight")
+        shader_create_info_sprite_atlas_gather.push_constant("FLOAT", "atlasWidth")
+        shader_create_info_sprite_atlas_gather.push_constant("FLOAT", "atlasHeight")
+        shader_create_info_sprite_atlas_gather.push_constant("FLOAT", "cellCount")
+        shader_create_info_sprite_atlas_gather.push_constant("INT", "isIncremental")
+
+        shader_create_info_sprite_atlas_gather.sampler(0, "FLOAT_2D", "cellViewports")
+        shader_create_info_sprite_atlas_gather.image(1, "R32F", "FLOAT_2D", "objectIDs", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_gather.image(2, "RGBA8", "FLOAT_2D", "colors", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_gather.image(6, "RGBA8", "FLOAT_2D_ARRAY", "spriteAtlas", qualifiers = {"WRITE"})
+        shader_create_info_sprite_atlas_gather.image(8, "R32F", "FLOAT_2D_ARRAY", "cellOwners", qualifiers = {"READ"})
+        shader_create_info_sprite_atlas_gather.image(9, "R32UI", "UINT_2D", "dirtyCells", qualifiers = {"READ"})
+
+        self.m_shaders.add("sprite_atlas_gather", shader_create_info_sprite_atlas_gather)
        
-        shader_create_info_combined_render = GPUShaderCreateInfo()
+        shader_create_info_combined_render = BAD_ShaderDescription()
         shader_create_info_combined_render.compute_source(compute_shader_source_combined_render)
-        shader_create_info_combined_render.define("MAX_CELL_VIEWPORTS", str(BAD_MAX_CELL_VIEWPORTS_SIZE))
+        shader_create_info_combined_render.define("CELL_VIEWPORTS_PER_ROW", str(BAD_CELL_VIEWPORTS_PER_ROW))
         shader_create_info_combined_render.local_group_size(32, 1, 1)
         shader_create_info_combined_render.push_constant("FLOAT", "viewportWidth")
         shader_create_info_combined_render.push_constant("FLOAT", "viewportHeight")
-        shader_create_info_combined_render.uniform_buf(0, "vec4[" + str(BAD_MAX_CELL_VIEWPORTS_SIZE) + "]", "cellViewports")
+        shader_create_info_combined_render.push_constant("FLOAT", "cellCount")
+        shader_create_info_combined_render.sampler(0, "FLOAT_2D", "cellViewports")
         shader_create_info_combined_render.image(1, "R32F", "FLOAT_2D", "objectIDs", qualifiers = {"READ"})
         shader_create_info_combined_render.image(2, "RGBA8", "FLOAT_2D", "colors", qualifiers = {"READ"})
-        shader_create_info_combined_render.image(6, "RGBA8", "FLOAT_2D", "spriteAtlas", qualifiers = {"READ"})
+        shader_create_info_combined_render.image(6, "RGBA8", "FLOAT_2D_ARRAY", "spriteAtlas", qualifiers = {"READ"})
         shader_create_info_combined_render.image(7, "RGBA8", "FLOAT_2D", "combinedRender", qualifiers = {"WRITE"})
         
-        self.m_program_combined_render = gpu.shader.create_from_info(shader_create_info_combined_render)
+        self.m_shaders.add("combined_render", shader_create_info_combined_render)
 
-    def create_vertex_index_buffers_batches(self, context : bpy.context):
-        for obj in bpy.data.objects:
-            if obj.type == "MESH":
-                obj.bad_settings.m_id = self.m_object_id_counter
-                self.m_object_id_counter += 1
-                mesh = obj.data
-                self.create_vertex_index_buffer_batch(mesh, context)
+    # build order of the buffers of mesh objects: 0 inside the view frustum of any 3d view, 1 visible elsewhere, 2 hidden
+    def mesh_object_priorities(self, context : bpy.types.Context, objects : list) -> list:
+        if len(objects) == 0:
+            return []
 
-    def create_vertex_index_buffer_batch(self, mesh : bpy.types.Mesh, context : bpy.context):
-        mesh.calc_loop_triangles()
-        
-        self.update_vertex_buffer_data(mesh)
-        self.update_index_buffer_data(mesh)
+        is_in_view = np.zeros(len(objects), dtype = bool)
+        view_regions = find_view_regions(context)
 
+        if len(view_regions) > 0:
+            # bound_box is in object space and known before the mesh is read
+            corners = np.array([obj.bound_box for obj in objects], dtype = np.float32)
+            local_bounds = np.stack((corners.min(axis = 1), corners.max(axis = 1)), axis = 1)
+            matrices = np.array([obj.matrix_world for obj in objects], dtype = np.float32)
+            bounds = transform_bounds(local_bounds, matrices)
+
+            for window, area, region in view_regions:
+                is_in_view |= cull_bounds(bounds, frustum_planes(np.array(region.data.perspective_matrix, dtype = np.float32)))
+
+        return [0 if in_view else (1 if obj.visible_get() else 2) for obj, in_view in zip(objects, is_in_view)]
+
+    # builds the buffers inline without workers, otherwise queues the mesh to be read in the next render,
+    # its instances are left out of the frames until the prepared buffers are uploaded
+    def request_mesh_buffers(self, mesh : bpy.types.Mesh, context : bpy.context):
         uid = mesh.as_pointer()
 
-        self.m_vertex_buffers[uid] = GPUVertBuf(self.m_vertex_buffer_format, len(self.m_vertex_buffers_data[uid]))
-        self.m_vertex_buffers[uid].attr_fill(id = "pos", data = self.m_vertex_buffers_data[uid])
-        self.m_index_buffers[uid] = GPUIndexBuf(type = "TRIS", seq = self.m_index_buffers_data[uid])
+        if self.m_mesh_preparer.m_worker_count == 0:
+            self.create_vertex_index_buffer_batch(mesh, context)
+            self.m_pending_meshes.discard(uid)
+            return
+
+        self.m_pending_meshes.add(uid)
+        self.m_mesh_reads[uid] = mesh
+
+        if not bpy.app.timers.is_registered(redraw_pending_meshes):
+            bpy.app.timers.register(redraw_pending_meshes, first_interval = BAD_MESH_UPLOAD_INTERVAL)
+
+    def is_mesh_requested(self, uid : int) -> bool:
+        return uid in self.m_mesh_reads or self.m_mesh_preparer.is_preparing(uid)
+
+    # the main thread half of the mesh preparation: uploads prepared meshes, then reads queued meshes for the pool,
+    # both within BAD_MESH_UPLOAD_BUDGET_MS and at least one of each per frame
+    def update_mesh_uploads(self):
+        start = time.perf_counter()
+        budget_seconds = BAD_MESH_UPLOAD_BUDGET_MS / 1000.0
+
+        if self.m_mesh_preparer.pending_count() > 0:
+            self.m_mesh_preparer.drain(budget_seconds, self.upload_mesh_buffers, self.fail_mesh_buffers)
+
+        is_first_read = True
+        while len(self.m_mesh_reads) > 0 and (is_first_read or time.perf_counter() - start < budget_seconds):
+            uid, mesh = self.m_mesh_reads.popitem(last = False)
+            is_first_read = False
+
+            try:
+                mesh.calc_loop_triangles()
+                vertices = extract_vertex_positions(mesh)
+                indices = extract_triangle_indices(mesh)
+                session_uid = mesh.session_uid
+            except ReferenceError: # deleted before it was read
+                self.m_pending_meshes.discard(uid)
+                continue
+
+            self.m_mesh_preparer.submit(uid, vertices, indices, session_uid)
+
+        self.m_mesh_upload_seconds = time.perf_counter() - start
+
+    # uid defaults to the pointer of mesh, it is passed explicitly when mesh is a temporary evaluated copy
+    def create_vertex_index_buffer_batch(self, mesh : bpy.types.Mesh, context : bpy.context, uid : int = None):
+        mesh.calc_loop_triangles()
+
+        session_uid = None
+
+        if uid == None:
+            uid = mesh.as_pointer()
+            session_uid = mesh.session_uid
+
+        vertices = extract_vertex_positions(mesh)
+        self.upload_mesh_buffers(uid, vertices, extract_triangle_indices(mesh), compute_bounds(vertices), session_uid)
+
+    # reads the edit mesh of obj through a temporary mesh so the arrays are filled by foreach_get like in object mode
+    def create_edit_mesh_buffers(self, obj : bpy.types.Object, uid : int):
+        mesh = obj.to_mesh()
+
+        try:
+            mesh.calc_loop_triangles()
+            vertices = extract_vertex_positions(mesh)
+            indices = extract_triangle_indices(mesh)
+        finally:
+            obj.to_mesh_clear()
+
+        self.upload_mesh_buffers(uid, vertices, indices, compute_bounds(vertices))
+
+    # session_uid = None keeps the one already known, see BAD_MeshResourceManager.add
+    def upload_mesh_buffers(self, uid : int, vertices : np.ndarray, indices : np.ndarray, bounds : np.ndarray, session_uid : int = None):
+        self.m_vertex_buffers_data[uid] = vertices
+        self.m_index_buffers_data[uid] = indices
+
+        self.m_vertex_buffers[uid] = GPUVertBuf(self.m_vertex_buffer_format, len(vertices))
+        self.m_vertex_buffers[uid].attr_fill(id = "pos", data = vertices)
+        self.m_index_buffers[uid] = GPUIndexBuf(type = "TRIS", seq = indices)
 
         self.m_batches[uid] = GPUBatch(type = "TRIS", buf = self.m_vertex_buffers[uid], elem = self.m_index_buffers[uid])
 
-    # this function is called after depsgraph update post handler is called for a specific object and mesh
-    def update_vertex_buffer_data(self, mesh : bpy.types.Mesh):
-        vertices = []
-        for mesh_vertex in mesh.vertices:
-            vertices.append(mesh_vertex.co.to_tuple())
-    
-        self.m_vertex_buffers_data[mesh.as_pointer()] = vertices
-    
-    def update_index_buffer_data(self, mesh : bpy.types.Mesh):
-        indices = []
-        for triangle in mesh.loop_triangles:
-            # triangle vertices give indices for every triangle vertex
-            indices.append(triangle.vertices)
-    
-        self.m_index_buffers_data[mesh.as_pointer()] = indices
-
-    def query_view_3d_dimensions(self, context : bpy.types.Context) -> (int, int):
-
-        if context == None:
-            return (1, 1)
+        self.m_mesh_bounds[uid] = bounds
+
+        self.m_mesh_resources.add(uid, vertices.nbytes + indices.nbytes, session_uid)
+        self.m_pending_meshes.discard(uid)
+
+    # drops what was uploaded of a mesh the preparer failed on, it is not requested again until it is edited
+    def fail_mesh_buffers(self, uid : int, session_uid : int):
+        self.release_mesh_buffers(uid)
+        self.m_failed_meshes[uid] = session_uid
+
+    def release_mesh_buffers(self, uid : int):
+        self.m_vertex_buffers_data.pop(uid, None)
+        self.m_index_buffers_data.pop(uid, None)
+        self.m_vertex_buffers.pop(uid, None)
+        self.m_index_buffers.pop(uid, None)
+        self.m_batches.pop(uid, None)
+        self.m_mesh_bounds.pop(uid, None)
+        self.m_dirty_meshes.discard(uid)
+        self.m_mesh_preparer.cancel(uid)
+        self.m_mesh_reads.pop(uid, None)
+        self.m_pending_meshes.discard(uid)
+        self.m_failed_meshes.pop(uid, None)
+
+    def release_deleted_mesh_buffers(self):
+        # meshes can only be deleted when their count changes, pointers reused in between are caught by the session uid
+        if len(bpy.data.meshes) == self.m_mesh_count:
+            return
 
-        for area in context.screen.areas:
-            if area.type == "VIEW_3D":
-                return (area.width, area.height)
\ No newline at end of file
+        self.m_mesh_count = len(bpy.data.meshes)
+        alive_uids = {mesh.as_pointer() for mesh in bpy.data.meshes}
+
+        for uid in self.m_mesh_resources.forget_missing(alive_uids):
+            self.release_mesh_buffers(uid)
+
+        # deleted before their buffers were uploaded
+        for uid in [uid for uid in self.m_pending_meshes if not uid in alive_uids]:
+            self.release_mesh_buffers(uid)
+
+    # gives obj its own id and atlas cell the first time it is seen. A stored id is stale when it is 0, from before the
+    # pipeline was created (ids are saved with the file) or copied from another object along with its settings (Shift+D)
+    def assign_object_id(self, obj : bpy.types.Object):
+        settings = obj.bad_settings
+
+        if 0 < settings.m_id < self.m_object_id_counter and self.m_object_id_owners.get(settings.m_id) == obj.session_uid:
+            return
+
+        settings.m_id = self.m_object_id_counter
+        self.m_object_id_owners[settings.m_id] = obj.session_uid
+        self.m_object_id_counter += 1
+
+        # the new object gets its atlas cell in the next render
+        self.m_is_cell_layout_dirty = True
+
+    # returns uid -> ((n, 4, 4) matrix_world, [object_id]) for plain objects as well as collection, particle
+    # and geometry nodes instances, creates or rebuilds the buffers of every mesh that is going to be drawn
+    def gather_mesh_instances(self, context : bpy.types.Context) -> dict:
+        depsgraph = context.evaluated_depsgraph_get()
+
+        instance_groups = {}
+        uid_to_object = {}
+
+        for instance in depsgraph.object_instances:
+            if not instance.is_instance and not instance.show_self:
+                continue
+
+            obj = instance.object.original
+
+            if obj.type != "MESH":
+                continue
+
+            # geometry instanced inside geometry nodes reports the generator object as original but has no mesh of its own,
+            # drawing it with the generator's mesh would be wrong so it is left out
+            if instance.is_instance and instance.parent.original == obj:
+                continue
+
+            uid = obj.data.as_pointer()
+
+            # not built yet by the time sliced initialization, drawn once it is
+            if uid in self.m_pending_meshes:
+                continue
+
+            if not uid in instance_groups:
+                instance_groups[uid] = ([], [])
+                uid_to_object[uid] = obj
+
+            matrices, objects = instance_groups[uid]
+            matrices.append(instance.matrix_world.copy()) # the iterator reuses its memory for every instance
+            objects.append(obj)
+
+        self.m_rebuilt_meshes.clear()
+
+        # buffers are touched after iterating since the depsgraph iterator must not be interleaved with data changes
+        for uid, obj in uid_to_object.items():
+            mesh = obj.data
+
+            if self.m_failed_meshes.get(uid) == mesh.session_uid:
+                del instance_groups[uid]
+                continue
+
+            if not self.m_mesh_resources.is_known(uid, mesh.session_uid):
+                # a new mesh or a deleted mesh's pointer reused by a new one
+                self.release_mesh_buffers(uid)
+                self.request_mesh_buffers(mesh, context)
+                self.m_rebuilt_meshes.add(uid)
+            elif not self.m_mesh_resources.is_resident(uid):
+                # evicted, rebuild lazily and keep the id
+                self.request_mesh_buffers(mesh, context)
+            elif uid in self.m_dirty_meshes:
+                self.m_rebuilt_meshes.add(uid)
+
+                if obj.mode == "EDIT":
+                    # edit mode changes live in the edit mesh, read without modifiers like obj.data in object mode since the
+                    # buffers are shared by the linked duplicates. to_mesh without a depsgraph applies no modifiers and, unlike
+                    # update_from_editmode, does not tag the depsgraph which would mark the mesh dirty again
+                    self.create_edit_mesh_buffers(obj, uid)
+                else:
+                    self.create_vertex_index_buffer_batch(mesh, context)
+
+            self.m_dirty_meshes.discard(uid)
+
+            # prepared in the background, drawn from the frame its buffers are uploaded in
+            if uid in self.m_pending_meshes:
+                del instance_groups[uid]
+                continue
+
+            self.m_mesh_resources.touch(uid)
+
+            # ids are assigned after iterating as well, linked duplicates share the mesh but not the id
+            matrices, objects = instance_groups[uid]
+            for instance_object in objects:
+                self.assign_object_id(instance_object)
+
+            instance_groups[uid] = (np.array(matrices, dtype = np.float32).reshape(-1, 4, 4), [instance_object.bad_settings.m_id for instance_object in objects])
+
+        return instance_groups
+
+    # drops the instances whose world space aabb is outside of the view frustum with one vectorized test,
+    # the aabbs are only recomputed when the scene changed so moving the view only reruns the test, they are shared by the views.
+    # Returns the instance groups with only the instances visible in view
+    def cull_mesh_instances(self, context : bpy.types.Context, instance_groups : dict, view : BAD_View) -> dict:
+        start = time.perf_counter()
+
+        matrices = [group_matrices for group_matrices, object_ids in instance_groups.values()]
+        counts = [len(object_ids) for group_matrices, object_ids in instance_groups.values()]
+
+        key = (self.m_scene_version, context.scene.frame_current, tuple(zip(instance_groups.keys(), counts)))
+
+        if key != self.m_instance_bounds_key:
+            if len(matrices) > 0:
+                local_bounds = np.concatenate([np.broadcast_to(self.m_mesh_bounds[uid], (count, 2, 3)) for uid, count in zip(instance_groups.keys(), counts)])
+                self.m_instance_bounds = transform_bounds(local_bounds, np.concatenate(matrices))
+            else:
+                self.m_instance_bounds = np.zeros((0, 2, 3), dtype = np.float32)
+            self.m_instance_bounds_key = key
+
+        vp = np.array(view.m_region.data.perspective_matrix, dtype = np.float32)
+
+        if BAD_FRUSTUM_CULLING:
+            is_visible = cull_bounds(self.m_instance_bounds, frustum_planes(vp))
+        else:
+            is_visible = np.ones(len(self.m_instance_bounds), dtype = bool)
+
+        # the size of every visible instance on screen, see update_auto_resolutions
+        instance_object_ids = np.fromiter((object_id for group_matrices, object_ids in instance_groups.values() for object_id in object_ids),
+                                          dtype = np.int64, count = len(is_visible))
+        view.m_screen_extents = (instance_object_ids[is_visible],
+                                 screen_extents(self.m_instance_bounds[is_visible], vp, view.m_viewport_dimensions[0], view.m_viewport_dimensions[1]))
+
+        visible_groups = {}
+        visible_object_ids = set()
+        offset = 0
+
+        for (uid, (group_matrices, object_ids)), count in zip(instance_groups.items(), counts):
+            group_is_visible = is_visible[offset:offset + count]
+            offset += count
+
+            if not group_is_visible.any():
+                continue
+
+            visible_ids = [object_id for object_id, visible in zip(object_ids, group_is_visible) if visible]
+            visible_groups[uid] = (group_matrices[group_is_visible], visible_ids)
+            visible_object_ids.update(visible_ids)
+
+        if not BAD_FRUSTUM_CULLING:
+            visible_object_ids = None
+
+        view.m_visible_object_ids = visible_object_ids
+
+        self.m_culled_instances += int(len(is_visible) - np.count_nonzero(is_visible))
+        self.m_culling_seconds += time.perf_counter() - start
+
+        return visible_groups
+
+    # meshes whose instances kept their matrices and ids for BAD_STATIC_BATCHING_FRAMES frames are static, the merged
+    # batches are rebuilt whenever a mesh becomes static or stops being static (moved, edited, hidden or deleted)
+    def update_static_batches(self, instance_groups : dict):
+        history = {}
+
+        for uid, (matrices, object_ids) in instance_groups.items():
+            previous = self.m_instance_history.get(uid)
+            unchanged_frames = 0
+
+            if previous != None and not uid in self.m_rebuilt_meshes and previous[1] == object_ids and np.array_equal(previous[0], matrices):
+                unchanged_frames = previous[2] + 1
+
+            history[uid] = (matrices, object_ids, unchanged_frames)
+
+        # groups missing this frame are gone from the drawn instances
+        self.m_instance_history = history
+
+        static_uids = frozenset(uid for uid, (matrices, object_ids, unchanged_frames) in history.items()
+                                if unchanged_frames >= BAD_STATIC_BATCHING_FRAMES and len(self.m_vertex_buffers_data[uid]) <= BAD_STATIC_BATCHING_MAX_MESH_VERTICES)
+
+        if static_uids != self.m_static_uids:
+            self.m_static_uids = static_uids
+            self.create_static_batches()
+
+    def create_static_batches(self):
+        self.m_static_batches = []
+        self.m_static_batch_rebuild_count += 1
+
+        chunks = []
+        vertex_count = 0
+
+        for uid in self.m_static_uids:
+            matrices, object_ids, unchanged_frames = self.m_instance_history[uid]
+            vertices = self.m_vertex_buffers_data[uid]
+
+            if vertex_count > 0 and vertex_count + len(vertices) * len(matrices) > BAD_STATIC_BATCH_MAX_VERTICES:
+                self.m_static_batches.append(self.create_static_batch(chunks))
+                chunks = []
+                vertex_count = 0
+
+            chunks.append(merge_instances(vertices, self.m_index_buffers_data[uid], matrices, object_ids, vertex_count))
+            vertex_count += len(vertices) * len(matrices)
+
+        if len(chunks) > 0:
+            self.m_static_batches.append(self.create_static_batch(chunks))
+
+    def create_static_batch(self, chunks : list) -> GPUBatch:
+        positions = np.concatenate([chunk[0] for chunk in chunks])
+        vertex_object_ids = np.concatenate([chunk[1] for chunk in chunks])
+        indices = np.concatenate([chunk[2] for chunk in chunks])
+
+        vertex_buffer = GPUVertBuf(self.m_static_vertex_buffer_format, len(positions))
+        vertex_buffer.attr_fill(id = "pos", data = positions)
+        vertex_buffer.attr_fill(id = "vertexObjectID", data = vertex_object_ids)
+        index_buffer = GPUIndexBuf(type = "TRIS", seq = indices)
+
+        return GPUBatch(type = "TRIS", buf = vertex_buffer, elem = index_buffer)
+
+    # packs the instance groups in iteration order so every group occupies a contiguous range of instances
+    def create_instance_data_texture(self, instance_groups : dict) -> GPUTexture:
+        instance_count = sum(len(object_ids) for matrices, object_ids in instance_groups.values())
+
+        if instance_count == 0:
+            return None
+
+        rows = ceil(instance_count / BAD_INSTANCES_PER_ROW)
+        instance_data = np.zeros((rows * BAD_INSTANCES_PER_ROW, BAD_INSTANCE_DATA_TEXELS, 4), dtype = np.float32)
+
+        instance_offset = 0
+        for matrices, object_ids in instance_groups.values():
+            count = len(object_ids)
+            # mathutils matrices are row major, glsl builds mat4 from columns
+            instance_data[instance_offset:instance_offset + count, :4, :] = np.array(matrices, dtype = np.float32).transpose(0, 2, 1)
+            instance_data[instance_offset:instance_offset + count, 4, 0] = object_ids
+            instance_offset += count
+
+        buffer_instance_data = Buffer("FLOAT", instance_data.size, instance_data.ravel())
+
+        return GPUTexture((BAD_INSTANCES_PER_ROW * BAD_INSTANCE_DATA_TEXELS, rows), format = "RGBA32F", data = buffer_instance_data)
+
+    def mark_mesh_dirty(self, mesh : bpy.types.Mesh):
+        uid = mesh.as_pointer()
+
+        # meshes without buffers get created on first draw anyway
+        if uid in self.m_vertex_buffers:
+            self.m_dirty_meshes.add(uid)
+        elif self.m_mesh_preparer.is_preparing(uid):
+            # read again, the buffers being prepared are outdated
+            self.m_mesh_reads[uid] = mesh
+        elif uid in self.m_failed_meshes:
+            # tried again in the next render
+            del self.m_failed_meshes[uid]
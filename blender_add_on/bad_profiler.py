@@ -0,0 +1,147 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+# Per frame stage timings of BAD_Pipeline.render kept in a ring buffer of the last frames.
+# Stages are timed on the cpu with perf_counter_ns. Blender's python gpu module has no timer queries,
+# with gpu synchronization a stage waits for the gpu to finish its work (glFinish through bgl, where it
+# still exists) before it is timed, so the timings include the gpu work at the cost of stalling the pipeline.
+# When disabled stage() returns one shared context manager that does nothing.
+
+class BAD_NullStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        return False
+
+BAD_NULL_STAGE = BAD_NullStage()
+
+class BAD_ProfilerStage:
+
+    def __init__(self, profiler, name : str):
+        self.m_profiler = profiler
+        self.m_name = name
+        self.m_start = 0
+
+    def __enter__(self):
+        self.m_profiler.synchronize()
+        self.m_start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.m_profiler.synchronize()
+        self.m_profiler.m_frame_stages.append((self.m_name, self.m_start, time.perf_counter_ns() - self.m_start))
+        return False
+
+class BAD_Profiler:
+
+    def __init__(self, frame_count : int, is_enabled : bool = True, is_gpu_synchronized : bool = False):
+        self.m_frames = deque(maxlen = frame_count) # (frame start ns, frame duration ns, [(stage, start ns, duration ns)])
+        self.m_frame_start = None
+        self.m_frame_stages = []
+        self.m_is_enabled = is_enabled
+        self.m_finish = None
+        self.set_gpu_synchronized(is_gpu_synchronized)
+
+    # True when the gpu can be waited for and timings include the gpu work
+    def set_gpu_synchronized(self, is_gpu_synchronized : bool) -> bool:
+        self.m_finish = None
+
+        if is_gpu_synchronized:
+            try:
+                import bgl
+                self.m_finish = bgl.glFinish
+            except (ImportError, AttributeError):
+                print("Warning: gpu synchronization is not available, stage timings are cpu timings\n")
+
+        return self.m_finish != None
+
+    def is_gpu_synchronized(self) -> bool:
+        return self.m_finish != None
+
+    def synchronize(self):
+        if self.m_finish != None:
+            self.m_finish()
+
+    def begin_frame(self):
+        if not self.m_is_enabled:
+            return
+
+        self.m_frame_stages = []
+        self.m_frame_start = time.perf_counter_ns()
+
+    def end_frame(self):
+        if not self.m_is_enabled or self.m_frame_start == None:
+            return
+
+        self.m_frames.append((self.m_frame_start, time.perf_counter_ns() - self.m_frame_start, self.m_frame_stages))
+        self.m_frame_start = None
+
+    def stage(self, name : str):
+        if not self.m_is_enabled or self.m_frame_start == None:
+            return BAD_NULL_STAGE
+        return BAD_ProfilerStage(self, name)
+
+    def clear(self):
+        self.m_frames.clear()
+
+    # stage name -> (average ms, p95 ms, frames) over the frames in the ring buffer, "Frame" is the whole render call,
+    # a stage entered several times in a frame counts with its summed duration
+    def statistics(self) -> dict:
+        durations = { "Frame" : [] }
+
+        for frame_start, frame_duration, stages in self.m_frames:
+            durations["Frame"].append(frame_duration)
+
+            frame_durations = {}
+            for name, start, duration in sorted(stages, key = lambda stage: stage[1]):
+                frame_durations[name] = frame_durations.get(name, 0) + duration
+
+            for name, duration in frame_durations.items():
+                durations.setdefault(name, []).append(duration)
+
+        statistics = {}
+        for name, values in durations.items():
+            if len(values) > 0:
+                values = np.array(values, dtype = np.float64) / 1.0e6
+                statistics[name] = (float(values.mean()), float(np.percentile(values, 95.0)), len(values))
+
+        return statistics
+
+    # Chrome trace event format, opens in chrome://tracing and ui.perfetto.dev
+    def export_chrome_trace(self, path : str):
+        events = [{ "name" : "process_name", "ph" : "M", "pid" : 0, "tid" : 0, "args" : { "name" : "BlenderAddOn" } },
+                  { "name" : "thread_name", "ph" : "M", "pid" : 0, "tid" : 0, "args" : { "name" : "BAD_Pipeline.render" } }]
+
+        for index, (frame_start, frame_duration, stages) in enumerate(self.m_frames):
+            events.append({ "name" : "Frame", "cat" : "frame", "ph" : "X", "pid" : 0, "tid" : 0,
+                            "ts" : frame_start / 1000.0, "dur" : frame_duration / 1000.0, "args" : { "frame" : index } })
+
+            for name, start, duration in stages:
+                events.append({ "name" : name, "cat" : "stage", "ph" : "X", "pid" : 0, "tid" : 0,
+                                "ts" : start / 1000.0, "dur" : duration / 1000.0 })
+
+        with open(path, "w") as file:
+            json.dump({ "traceEvents" : events, "displayTimeUnit" : "ms",
+                        "otherData" : { "timings" : "gpu synchronized" if self.is_gpu_synchronized() else "cpu" } }, file)
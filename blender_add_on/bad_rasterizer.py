@@ -0,0 +1,259 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import numpy as np
+
+# Software rasterizer producing the object id and linearized depth images of the object id depth pass
+# (vertex_shader_source_object_id_depth, fragment_shader_source_object_id_depth) without a gpu.
+# Images are (height, width) float32 with row 0 at the bottom like GPUTexture.read().
+# Triangles are clipped against the near plane, fragments outside of the far plane are discarded,
+# pixel centers are sampled with a top left fill rule and window depth is interpolated linearly in screen space.
+# Triangles that cover no pixel center of their bounding box (sub-pixel or outside of the viewport) or lie behind the
+# far plane are culled first. The others are cut into blocks (their bounding box, or tiles of BAD_RASTERIZER_TILE_SIZE
+# for large triangles) and blocks of the same width and height are evaluated together with batched edge functions.
+# The fragments of every batch are resolved against the depth buffer at once, the depth buffer holds
+# (window depth bits << 32 | draw order) keys so np.minimum.at does the depth test with the draw order tie break.
+# About 1M triangles of mostly 1 to 3 pixels still take more than a second, the rasterizer is meant for checking the
+# gpu pass and for small scenes on machines without one, not for interactive use of large scenes
+
+BAD_RASTERIZER_TILE_SIZE = 32
+BAD_RASTERIZER_BATCH_SAMPLES = 1024 * 1024 # edge function evaluations per batch
+BAD_RASTERIZER_BATCH_TRIANGLES = 256 * 1024
+
+class BAD_Rasterizer:
+
+    # depth_test is "LESS" or "NONE" (later draws overwrite earlier ones)
+    def __init__(self, width : int, height : int, depth_test : str = "LESS"):
+        self.m_width = width
+        self.m_height = height
+        self.m_depth_test = depth_test
+        self.m_object_ids = np.zeros((height, width), dtype = np.float32)
+        self.m_linearized_depth = np.zeros((height, width), dtype = np.float32)
+        # per pixel the key of the fragment that was kept, see resolve
+        self.m_fragment_keys = np.full(height * width, self.cleared_key(), dtype = np.uint64)
+        self.m_triangle_count = 0
+
+    def clear(self):
+        self.m_object_ids.fill(0.0)
+        self.m_linearized_depth.fill(0.0)
+        self.m_fragment_keys.fill(self.cleared_key())
+        self.m_triangle_count = 0
+
+    # "LESS" keeps the smallest (depth bits << 32 | draw order), the cleared depth of 1.0 wins every tie.
+    # "NONE" keeps the largest draw order + 1
+    def cleared_key(self) -> int:
+        return (int(np.float32(1.0).view(np.uint32)) << 32 | 0xFFFFFFFF) if self.m_depth_test == "LESS" else 0
+
+    # one instanced draw: vertices (v, 3), indices (t, 3), row major model matrices (n, 4, 4), one object id per instance,
+    # vp is the row major view projection matrix, near and far the clip planes used by LinearizeDepth
+    def draw(self, vertices : np.ndarray, indices : np.ndarray, matrices : np.ndarray, object_ids, vp, near : float, far : float):
+        if len(vertices) == 0 or len(indices) == 0 or len(matrices) == 0:
+            return
+
+        positions = np.empty((len(vertices), 4), dtype = np.float64)
+        positions[:, :3] = vertices
+        positions[:, 3] = 1.0
+
+        mvps = np.asarray(vp, dtype = np.float64)[None, :, :] @ np.asarray(matrices, dtype = np.float64)
+        object_ids = np.asarray(object_ids, dtype = np.float32)
+        indices = np.asarray(indices, dtype = np.int64)
+
+        # instances are drawn in order, every batch holds whole instances
+        instances_per_batch = max(1, BAD_RASTERIZER_BATCH_TRIANGLES // len(indices))
+        for first in range(0, len(mvps), instances_per_batch):
+            clip = np.einsum("nij,vj->nvi", mvps[first:first + instances_per_batch], positions)
+            triangles = clip[:, indices, :].reshape(-1, 3, 4)
+            triangle_ids = np.repeat(object_ids[first:first + instances_per_batch], len(indices))
+
+            self.rasterize(triangles, triangle_ids, near, far)
+
+    # triangles (t, 3, 4) in clip space, one object id per triangle, in draw order
+    def rasterize(self, triangles : np.ndarray, triangle_ids : np.ndarray, near : float, far : float):
+        first_order = self.m_triangle_count
+        self.m_triangle_count += len(triangles)
+
+        triangles, triangle_ids, sources = clip_near_plane(triangles, triangle_ids)
+        if len(triangles) == 0:
+            return
+
+        # viewport transform to window coordinates, z in [0, 1]
+        w = triangles[:, :, 3]
+        x = (triangles[:, :, 0] / w * 0.5 + 0.5) * self.m_width
+        y = (triangles[:, :, 1] / w * 0.5 + 0.5) * self.m_height
+        z = triangles[:, :, 2] / w * 0.5 + 0.5
+
+        # pixel centers inside the bounding box, reductions over the 3 vertices are done column by column since
+        # numpy reduces short rows slowly
+        x_min = np.clip(np.ceil(np.minimum(np.minimum(x[:, 0], x[:, 1]), x[:, 2]) - 0.5), 0, self.m_width).astype(np.int64)
+        x_max = np.clip(np.floor(np.maximum(np.maximum(x[:, 0], x[:, 1]), x[:, 2]) - 0.5) + 1, 0, self.m_width).astype(np.int64)
+        y_min = np.clip(np.ceil(np.minimum(np.minimum(y[:, 0], y[:, 1]), y[:, 2]) - 0.5), 0, self.m_height).astype(np.int64)
+        y_max = np.clip(np.floor(np.maximum(np.maximum(y[:, 0], y[:, 1]), y[:, 2]) - 0.5) + 1, 0, self.m_height).astype(np.int64)
+        z_min = np.minimum(np.minimum(z[:, 0], z[:, 1]), z[:, 2])
+
+        # no pixel center in the viewport part of the bounding box, or every vertex behind the far plane
+        keep = np.flatnonzero((x_min < x_max) & (y_min < y_max) & (z_min <= 1.0))
+        x, y, z = x[keep], y[keep], z[keep]
+        order = first_order + sources[keep]
+        triangle_ids = triangle_ids[keep]
+        x_min, x_max, y_min, y_max = x_min[keep], x_max[keep], y_min[keep], y_max[keep]
+
+        # edge i is opposite of vertex i, e_i(p) = a_i * px + b_i * py + c_i
+        x1, x2 = x[:, [1, 2, 0]], x[:, [2, 0, 1]]
+        y1, y2 = y[:, [1, 2, 0]], y[:, [2, 0, 1]]
+        a = y1 - y2
+        b = x2 - x1
+        c = x1 * y2 - x2 * y1
+        area = c[:, 0] + c[:, 1] + c[:, 2] # twice the signed area
+
+        keep = np.flatnonzero(area != 0.0)
+        # either winding is drawn (no face culling), flip clockwise triangles so the inside is positive
+        sign = np.where(area < 0.0, -1.0, 1.0)[:, None]
+        a, b, c = a * sign, b * sign, c * sign
+        # top left rule, samples exactly on an edge belong to top (horizontal, inside below) or left edges only
+        bias = np.where((a > 0.0) | ((a == 0.0) & (b < 0.0)), 0.0, -1.0e-9 * np.abs(area)[:, None])
+
+        edges = np.stack((a, b, c + bias), axis = 2)[keep] / np.abs(area)[keep, None, None]
+        z = z[keep]
+        order = order[keep]
+        triangle_ids = triangle_ids[keep]
+        x_min, x_max, y_min, y_max = x_min[keep], x_max[keep], y_min[keep], y_max[keep]
+
+        # blocks: small triangles are one block of their bounding box, larger ones are binned into the tiles they overlap
+        tile = BAD_RASTERIZER_TILE_SIZE
+        block_width = np.minimum(x_max - x_min, tile)
+        block_height = np.minimum(y_max - y_min, tile)
+
+        is_binned = (x_max - x_min > tile) | (y_max - y_min > tile)
+        blocks = [(np.flatnonzero(~is_binned), x_min[~is_binned], y_min[~is_binned])]
+
+        binned = np.flatnonzero(is_binned)
+        if len(binned) > 0:
+            block_width[binned] = tile
+            block_height[binned] = tile
+            tiles_x = (x_max[binned] - 1) // tile - x_min[binned] // tile + 1
+            tiles_y = (y_max[binned] - 1) // tile - y_min[binned] // tile + 1
+            counts = tiles_x * tiles_y
+            owners = np.repeat(np.arange(len(binned)), counts)
+            local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            blocks.append((binned[owners],
+                           (x_min[binned] // tile)[owners] * tile + local % tiles_x[owners] * tile,
+                           (y_min[binned] // tile)[owners] * tile + local // tiles_x[owners] * tile))
+
+        triangle_index = np.concatenate([block[0] for block in blocks])
+        block_x = np.concatenate([block[1] for block in blocks])
+        block_y = np.concatenate([block[2] for block in blocks])
+        block_shape = block_width[triangle_index] * (tile + 1) + block_height[triangle_index]
+
+        for shape in np.flatnonzero(np.bincount(block_shape)):
+            width, height = divmod(int(shape), tile + 1)
+            selected = np.flatnonzero(block_shape == shape)
+            blocks_per_batch = max(1, BAD_RASTERIZER_BATCH_SAMPLES // (width * height))
+
+            offsets = np.arange(width * height)
+            offset_x, offset_y = offsets % width, offsets // width
+
+            for first in range(0, len(selected), blocks_per_batch):
+                batch = selected[first:first + blocks_per_batch]
+                i = triangle_index[batch]
+
+                px = block_x[batch, None] + offset_x[None, :]
+                py = block_y[batch, None] + offset_y[None, :]
+
+                sample_x = px + 0.5
+                sample_y = py + 0.5
+                barycentrics = edges[i, :, None, 0] * sample_x[:, None, :] + edges[i, :, None, 1] * sample_y[:, None, :] + edges[i, :, None, 2]
+                inside = (barycentrics[:, 0] >= 0.0) & (barycentrics[:, 1] >= 0.0) & (barycentrics[:, 2] >= 0.0)
+                if width == tile or height == tile: # tiles reach past the bounding box of their triangle
+                    inside &= (px < x_max[i, None]) & (py < y_max[i, None])
+
+                depth = np.einsum("bkp,bk->bp", barycentrics, z[i])
+                inside &= (depth >= 0.0) & (depth <= 1.0)
+
+                covered_blocks, covered_samples = np.nonzero(inside)
+                self.resolve(py[covered_blocks, covered_samples] * self.m_width + px[covered_blocks, covered_samples],
+                             depth[covered_blocks, covered_samples], order[i[covered_blocks]], triangle_ids[i[covered_blocks]], near, far)
+
+    # writes the fragments (flat pixel, window depth, draw order, object id) that pass the depth test,
+    # blocks are not evaluated in draw order so the draw order in the keys decides what the gpu would have kept
+    def resolve(self, pixels : np.ndarray, depths : np.ndarray, order : np.ndarray, object_ids : np.ndarray, near : float, far : float):
+        depths = depths.astype(np.float32)
+
+        if self.m_depth_test == "LESS":
+            # a depth of 1.0 never passes against the cleared buffer or anything drawn, the bits of the other
+            # depths in [0, 1) sort like the depths
+            is_nearer = depths < 1.0
+            pixels, depths, order, object_ids = pixels[is_nearer], depths[is_nearer], order[is_nearer], object_ids[is_nearer]
+            keys = (depths.view(np.uint32).astype(np.uint64) << np.uint64(32)) | order.astype(np.uint64)
+            np.minimum.at(self.m_fragment_keys, pixels, keys)
+        else:
+            keys = order.astype(np.uint64) + np.uint64(1)
+            np.maximum.at(self.m_fragment_keys, pixels, keys)
+
+        # every triangle covers a pixel at most once so the kept key belongs to one fragment
+        passed = self.m_fragment_keys[pixels] == keys
+        pixels = pixels[passed]
+
+        self.m_object_ids.reshape(-1)[pixels] = object_ids[passed]
+        self.m_linearized_depth.reshape(-1)[pixels] = linearize_depth(depths[passed], near, far)
+
+# fragment_shader_source_object_id_depth LinearizeDepth, window depth in [0, 1] to view distance in [near, far]
+def linearize_depth(depth : np.ndarray, near : float, far : float) -> np.ndarray:
+    ndc = np.float32(2.0) * depth - np.float32(1.0)
+    return (np.float32(2.0 * near * far) / (np.float32(far + near) - ndc * np.float32(far - near))).astype(np.float32)
+
+# clips triangles (t, 3, 4) against the near plane z = -w, triangles with one vertex in front become one triangle,
+# triangles with two vertices in front become two, returns the triangles, their object ids and source triangle indices
+def clip_near_plane(triangles : np.ndarray, triangle_ids : np.ndarray):
+    distance = triangles[:, :, 2] + triangles[:, :, 3]
+    is_inside = distance >= 0.0
+
+    # usually nothing crosses the near plane
+    if is_inside.all():
+        return triangles, triangle_ids, np.arange(len(triangles))
+
+    inside_count = is_inside.sum(axis = 1)
+
+    results = [triangles[inside_count == 3]]
+    result_ids = [triangle_ids[inside_count == 3]]
+    result_order = [np.flatnonzero(inside_count == 3)]
+
+    for count in (1, 2):
+        selected = np.flatnonzero(inside_count == count)
+        if len(selected) == 0:
+            continue
+
+        # rotate so vertex 0 is the lone vertex, inside for count 1 and outside for count 2
+        lone = np.argmax(is_inside[selected] if count == 1 else ~is_inside[selected], axis = 1)
+        rotation = (lone[:, None] + np.arange(3)[None, :]) % 3
+        t = np.take_along_axis(triangles[selected], rotation[:, :, None], axis = 1)
+        d = np.take_along_axis(distance[selected], rotation, axis = 1)
+
+        p01 = t[:, 0] + (d[:, 0] / (d[:, 0] - d[:, 1]))[:, None] * (t[:, 1] - t[:, 0])
+        p02 = t[:, 0] + (d[:, 0] / (d[:, 0] - d[:, 2]))[:, None] * (t[:, 2] - t[:, 0])
+
+        if count == 1:
+            results.append(np.stack((t[:, 0], p01, p02), axis = 1))
+            result_ids.append(triangle_ids[selected])
+            result_order.append(selected)
+        else:
+            results.append(np.stack((p01, t[:, 1], t[:, 2]), axis = 1))
+            results.append(np.stack((p01, t[:, 2], p02), axis = 1))
+            result_ids += [triangle_ids[selected], triangle_ids[selected]]
+            result_order += [selected, selected]
+
+    sources = np.concatenate(result_order)
+    return np.concatenate(results), np.concatenate(result_ids), sources
@@ -0,0 +1,91 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+from collections import OrderedDict
+from math import ceil
+import time
+
+# Keeps viewport sized render targets across resizes. Sizes are rounded up to multiples of granularity and
+# the viewport renders into the (0, 0, width, height) sub-rectangle of its targets. The current targets are kept
+# while the viewport fits in them and covers at least min_coverage of their area, so a resize drag or a toggled
+# side panel only reallocates when a bucket boundary is crossed. The last max_sets target sets are pooled by size.
+# Does not know what a target set is: create(width, height) makes one and release(targets) frees it.
+class BAD_RenderTargetPool:
+
+    def __init__(self, create, release, granularity : int = 128, min_coverage : float = 0.5, max_sets : int = 2):
+        self.m_create = create
+        self.m_release = release
+        self.m_granularity = granularity
+        self.m_min_coverage = min_coverage
+        self.m_max_sets = max_sets
+
+        self.m_sets = OrderedDict() # (width, height) -> target set, least recently used first
+        self.m_current_size = None
+
+        self.m_allocation_count = 0
+        self.m_allocation_seconds = 0.0
+        self.m_reuse_count = 0 # acquires served by existing targets
+        self.m_release_count = 0
+
+    def bucket_size(self, width : int, height : int) -> tuple:
+        return (max(1, ceil(width / self.m_granularity)) * self.m_granularity, max(1, ceil(height / self.m_granularity)) * self.m_granularity)
+
+    # the bucket of the size itself always is, small viewports can not cover min_coverage of a bucket
+    def is_suitable(self, size : tuple, width : int, height : int) -> bool:
+        if size == self.bucket_size(width, height):
+            return True
+        return width <= size[0] and height <= size[1] and width * height >= self.m_min_coverage * size[0] * size[1]
+
+    # returns (targets, (target width, target height)) to render a width x height viewport into
+    def acquire(self, width : int, height : int) -> tuple:
+        size = self.m_current_size
+
+        if size != None and self.is_suitable(size, width, height):
+            self.m_reuse_count += 1
+        else:
+            suitable = [pooled_size for pooled_size in self.m_sets if self.is_suitable(pooled_size, width, height)]
+
+            if len(suitable) > 0:
+                size = min(suitable, key = lambda pooled_size: pooled_size[0] * pooled_size[1])
+                self.m_reuse_count += 1
+            else:
+                size = self.bucket_size(width, height)
+
+                start = time.perf_counter()
+                self.m_sets[size] = self.m_create(size[0], size[1])
+                self.m_allocation_seconds += time.perf_counter() - start
+                self.m_allocation_count += 1
+
+                while len(self.m_sets) > self.m_max_sets:
+                    oldest_size, targets = self.m_sets.popitem(last = False)
+                    self.m_release(targets)
+                    self.m_release_count += 1
+
+            self.m_current_size = size
+
+        self.m_sets.move_to_end(size)
+
+        return self.m_sets[size], size
+
+    def pixel_count(self) -> int:
+        return sum(width * height for width, height in self.m_sets)
+
+    def clear(self):
+        for targets in self.m_sets.values():
+            self.m_release(targets)
+        self.m_sets.clear()
+        self.m_current_size = None
@@ -0,0 +1,122 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+from collections import OrderedDict
+
+# Book keeping for the per mesh gpu buffers, it does not own any gpu resource itself.
+# It decides which mesh uids should have their buffers released and the owner frees them.
+# A mesh is either resident (buffers exist) or evicted (buffers were released but the mesh is still known
+# and gets rebuilt lazily on next use), deleted meshes are forgotten completely.
+class BAD_MeshResourceManager:
+
+    def __init__(self, memory_budget : int, max_unused_frames : int):
+        self.m_memory_budget = memory_budget # in bytes
+        self.m_max_unused_frames = max_unused_frames
+
+        self.m_frame = 0
+
+        # uid -> [size in bytes, last frame the buffers were used], least recently used first
+        self.m_resident = OrderedDict()
+        self.m_resident_bytes = 0
+
+        # uid -> session uid of every known mesh, used to detect pointers reused by a different mesh
+        self.m_session_uids = {}
+
+        self.m_eviction_count = 0
+
+    def clear(self):
+        self.m_resident.clear()
+        self.m_resident_bytes = 0
+        self.m_session_uids.clear()
+
+    def begin_frame(self):
+        self.m_frame += 1
+
+    def is_known(self, uid : int, session_uid : int) -> bool:
+        return self.m_session_uids.get(uid) == session_uid
+
+    def is_resident(self, uid : int) -> bool:
+        return uid in self.m_resident
+
+    # registers newly created or rebuilt buffers, session_uid = None keeps the one already known
+    def add(self, uid : int, size : int, session_uid : int = None):
+        if session_uid != None:
+            self.m_session_uids[uid] = session_uid
+
+        if uid in self.m_resident:
+            self.m_resident_bytes -= self.m_resident[uid][0]
+
+        self.m_resident[uid] = [size, self.m_frame]
+        self.m_resident.move_to_end(uid)
+        self.m_resident_bytes += size
+
+    def touch(self, uid : int):
+        entry = self.m_resident.get(uid)
+
+        if entry != None and entry[1] != self.m_frame:
+            entry[1] = self.m_frame
+            self.m_resident.move_to_end(uid)
+
+    # the mesh is gone, returns whether it had buffers that have to be freed
+    def forget(self, uid : int) -> bool:
+        self.m_session_uids.pop(uid, None)
+        return self.evict(uid)
+
+    def evict(self, uid : int) -> bool:
+        entry = self.m_resident.pop(uid, None)
+
+        if entry == None:
+            return False
+
+        self.m_resident_bytes -= entry[0]
+        return True
+
+    # keeps only alive uids known, returns the uids whose buffers have to be freed
+    def forget_missing(self, alive_uids : set) -> list:
+        released = []
+
+        for uid in [uid for uid in self.m_session_uids if not uid in alive_uids]:
+            if self.forget(uid):
+                released.append(uid)
+
+        return released
+
+    # returns the uids whose buffers have to be freed: buffers unused for more than m_max_unused_frames and
+    # least recently used buffers until the memory budget is met, buffers used in the current frame are never evicted
+    def collect(self) -> list:
+        evicted = []
+
+        for uid, (size, last_used_frame) in self.m_resident.items():
+            if self.m_frame - last_used_frame <= self.m_max_unused_frames:
+                break # the rest was used more recently
+            evicted.append(uid)
+
+        for uid in evicted:
+            self.evict(uid)
+
+        while self.m_resident_bytes > self.m_memory_budget and len(self.m_resident) > 0:
+            uid, (size, last_used_frame) = next(iter(self.m_resident.items()))
+
+            if last_used_frame == self.m_frame:
+                break # everything left is needed by the current frame
+
+            self.evict(uid)
+            evicted.append(uid)
+
+        self.m_eviction_count += len(evicted)
+
+        return evicted
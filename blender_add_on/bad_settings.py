@@ -68,6 +68,14 @@ class BAD_PROPERTYGROUP_Settings(bpy.types.PropertyGroup):
         if not self.guard:
             self.set_render_resolution_height_power(self.m_render_resolution_height_power)
 
+    def update_is_enabled(self, context):
+        # enabling or disabling adds or removes the object's atlas cell
+        self.m_is_resolution_dirty = True
+
+    def update_auto_resolution(self, context):
+        # the cell size switches between the fixed and the screen space resolution
+        self.m_is_resolution_dirty = True
+
     m_is_resolution_dirty : BoolProperty (
         name = "Is Resolution Dirty",
         default = True,
@@ -83,7 +91,8 @@ class BAD_PROPERTYGROUP_Settings(bpy.types.PropertyGroup):
     m_is_enabled : BoolProperty (
         name = "Enable",
         default = False,
-        description = "Enable Compositor Parameters"
+        description = "Enable Compositor Parameters",
+        update = update_is_enabled
     )
 
     m_render_resolution_width : IntProperty (
@@ -127,6 +136,34 @@ class BAD_PROPERTYGROUP_Settings(bpy.types.PropertyGroup):
         update = update_render_resolution_height_power
     )
 
+    # the resolution follows the size of the object on screen, in the power of 2 steps of m_render_resolution_*_power
+    m_is_auto_resolution : BoolProperty (
+        name = "Auto Resolution",
+        default = False,
+        description = "Derive the Render Resolution from the size of the Object on screen, in powers of 2",
+        update = update_auto_resolution
+    )
+
+    m_auto_resolution_min_power : IntProperty (
+        name = "Auto Resolution Min Power of 2",
+        default = 3,
+        description = "Smallest Render Resolution (in powers of 2) chosen by Auto Resolution",
+        min = 3,
+        max = 9,
+        step = 1,
+        update = update_auto_resolution
+    )
+
+    m_auto_resolution_max_power : IntProperty (
+        name = "Auto Resolution Max Power of 2",
+        default = 9,
+        description = "Largest Render Resolution (in powers of 2) chosen by Auto Resolution",
+        min = 3,
+        max = 9,
+        step = 1,
+        update = update_auto_resolution
+    )
+
     m_toggle_snapping_width : BoolProperty (
         name = "Toggle Snapping Width",
         default = True,
@@ -0,0 +1,114 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+import hashlib
+import time
+
+import gpu
+from gpu.types import GPUShaderCreateInfo, GPUStageInterfaceInfo
+
+# Compiled programs keyed by a hash of everything that went into their GPUShaderCreateInfo (sources, defines,
+# push constants, bindings, interfaces). The cache is module level and is not reset by importlib.reload
+# (reloadscript.reload and the reload block of __init__.py) so unchanged shaders are never compiled twice in a session.
+try:
+    BAD_SHADER_CACHE
+except NameError:
+    BAD_SHADER_CACHE = {}
+
+# records the calls made on it so they can be hashed and replayed on a GPUShaderCreateInfo or GPUStageInterfaceInfo
+class BAD_ShaderDescription:
+
+    def __init__(self, name : str = None):
+        self.m_name = name
+        self.m_calls = []
+
+    def __getattr__(self, method : str):
+        if method.startswith("__"):
+            raise AttributeError(method)
+
+        def record(*args, **kwargs):
+            self.m_calls.append((method, args, kwargs))
+
+        return record
+
+    def key(self) -> tuple:
+        def normalize(value):
+            if isinstance(value, BAD_ShaderDescription):
+                return ("interface", value.m_name, value.key())
+            if isinstance(value, (set, frozenset)):
+                return tuple(sorted(value))
+            if isinstance(value, dict):
+                return tuple(sorted((k, normalize(v)) for k, v in value.items()))
+            if isinstance(value, (list, tuple)):
+                return tuple(normalize(v) for v in value)
+            return value
+
+        return tuple((method, normalize(args), normalize(kwargs)) for method, args, kwargs in self.m_calls)
+
+    def hash(self) -> str:
+        return hashlib.sha256(repr(self.key()).encode()).hexdigest()
+
+# the programs of one pipeline, compiled (or taken from BAD_SHADER_CACHE) on first use
+class BAD_ShaderLibrary:
+
+    def __init__(self):
+        self.m_descriptions = {} # name -> (BAD_ShaderDescription, hash)
+        self.m_programs = {}
+        self.m_compiled_count = 0
+        self.m_cached_count = 0
+        self.m_compile_seconds = 0.0
+
+    def add(self, name : str, description : BAD_ShaderDescription):
+        self.m_descriptions[name] = (description, description.hash())
+        self.m_programs.pop(name, None)
+
+    def get(self, name : str):
+        program = self.m_programs.get(name)
+        if program != None:
+            return program
+
+        description, key = self.m_descriptions[name]
+        program = BAD_SHADER_CACHE.get(key)
+
+        if program == None:
+            start = time.perf_counter()
+            program = gpu.shader.create_from_info(create_shader_info(description))
+            self.m_compile_seconds += time.perf_counter() - start
+            self.m_compiled_count += 1
+            BAD_SHADER_CACHE[key] = program
+        else:
+            self.m_cached_count += 1
+
+        self.m_programs[name] = program
+        return program
+
+def create_shader_info(description : BAD_ShaderDescription) -> GPUShaderCreateInfo:
+    shader_create_info = GPUShaderCreateInfo()
+
+    for method, args, kwargs in description.m_calls:
+        args = [create_interface_info(arg) if isinstance(arg, BAD_ShaderDescription) else arg for arg in args]
+        getattr(shader_create_info, method)(*args, **kwargs)
+
+    return shader_create_info
+
+def create_interface_info(description : BAD_ShaderDescription) -> GPUStageInterfaceInfo:
+    interface_info = GPUStageInterfaceInfo(description.m_name)
+
+    for method, args, kwargs in description.m_calls:
+        getattr(interface_info, method)(*args, **kwargs)
+
+    return interface_info
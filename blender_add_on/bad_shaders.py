@@ -18,20 +18,51 @@
 vertex_shader_source_object_id_depth = """
 //layout(location = 0) in vec3 pos;
 
-// uniform mat4 mvp;
+// #define INSTANCES_PER_ROW 512
+// #define INSTANCE_DATA_TEXELS 5
+// uniform mat4 vp;
+// uniform int instanceOffset; // first instance of the drawn mesh inside instanceData
+// uniform sampler2D instanceData; // per instance: 4 texels of model matrix columns followed by (id, 0, 0, 0)
+
+// flat out float instanceObjectID;
+
+void main() {
+    int instance = instanceOffset + gl_InstanceID;
+    ivec2 texel = ivec2((instance % INSTANCES_PER_ROW) * INSTANCE_DATA_TEXELS, instance / INSTANCES_PER_ROW);
+
+    mat4 model = mat4(texelFetch(instanceData, texel, 0),
+                      texelFetch(instanceData, texel + ivec2(1, 0), 0),
+                      texelFetch(instanceData, texel + ivec2(2, 0), 0),
+                      texelFetch(instanceData, texel + ivec2(3, 0), 0));
+
+    instanceObjectID = texelFetch(instanceData, texel + ivec2(4, 0), 0).r;
+    gl_Position = vp * model * vec4(pos, 1.0f);
+}
+"""
+
+vertex_shader_source_object_id_depth_static = """
+// merged static meshes, positions are already in world space and every vertex carries its object id
+//layout(location = 0) in vec3 pos;
+//layout(location = 1) in float vertexObjectID;
+
+// uniform mat4 vp;
+
+// flat out float instanceObjectID;
 
 void main() {
-    gl_Position = mvp * vec4(pos, 1.0f);
+    instanceObjectID = vertexObjectID;
+    gl_Position = vp * vec4(pos, 1.0f);
 }
 """
 
 fragment_shader_source_object_id_depth = """
+//flat in float instanceObjectID;
+
 //layout(location = 0) out float objectID;
 //layout(location = 1) out float linearizedDepth;
 
 //uniform float near; // Near and far plane values in projection matrix
 //uniform float far;
-//uniform float id;
 
 float LinearizeDepth(float d) {
     // Normalize Depth to NDC space[-1, 1] from clip space [0, 1]
@@ -42,7 +73,7 @@ float LinearizeDepth(float d) {
 
 void main() {
     float depthLinear = LinearizeDepth(gl_FragCoord.z);
-    objectID = id;
+    objectID = instanceObjectID;
     linearizedDepth = depthLinear;
 }
 """
@@ -93,10 +124,44 @@ void main() {
 }
 """
 
+# same as fragment_shader_source_texture_display for 2D array textures (sprite atlas pages)
+fragment_shader_source_texture_array_display = """
+//in vec2 fragTex;
+
+//layout(location = 0) out vec4 fragOut; 
+
+//uniform sampler2DArray tex;
+//uniform float layer;
+//uniform float isMultipleChannels; // 1.0f or 0.0f
+// if normalization is not desired because it already displays color data specify max = 1.0 and min = 0.0
+//uniform float channelMin;
+//uniform float channelMax; 
+
+float NormalizeChannel(float c) {
+    return (c - channelMin) / (channelMax - channelMin);
+}
+
+void main() {
+    vec4 texel = texture(tex, vec3(fragTex.x, fragTex.y, layer));
+    
+    float rNormalized = NormalizeChannel(texel.r);
+    float gNormalized = NormalizeChannel(texel.g);
+    float bNormalized = NormalizeChannel(texel.b);
+    float aNormalized = NormalizeChannel(texel.a);
+
+    // single channel display as grayscale value
+    vec4 singleChannel = vec4(rNormalized, rNormalized, rNormalized, 1.0f);
+    // multiple channels display as color value
+    vec4 multipleChannels = vec4(rNormalized, gNormalized, bNormalized, aNormalized);
+
+    fragOut = singleChannel * (1.0f - isMultipleChannels) + multipleChannels * isMultipleChannels;
+}
+"""
+
 compute_shader_source_sprite_atlas_render_channels = """
 //#version 430 core
 
-// #define MAX_CELL_VIEWPORTS 100
+// #define CELL_VIEWPORTS_PER_ROW 1024
 //layout(local_size_x = 8, local_size_y = 8, local_size_z = 1) in;
 //uniform float viewportWidth;
 //uniform float viewportHeight;
@@ -107,17 +172,36 @@ compute_shader_source_sprite_atlas_render_channels = """
 //    // (x, y, width, height)
 //};
 
-//layout(binding = 0, std140) uniform cellViewports {
-//    vec4[MAX_CELL_VIEWPORTS] _cellViewports;
-//};
+// cell table indexed by object id, grows at runtime without recompiling
+// every cell is 2 texels: (x, y, width, height) and (page, 0, 0, 0)
+//uniform sampler2D cellViewports;
+//uniform float cellCount; // ids outside of the table use cell 0
+
+// 1: every page has 2 accumulator layers of 16 bit sums (r | g << 16) and (b | count << 16)
+// 0: every page has 4 accumulator layers of 32 bit sums r, g, b and count
+//uniform int packedSums;
+
+// 1: only atomics into texels whose owner is set in dirtyCells, see compute_shader_source_sprite_atlas_mark_dirty_cells
+//uniform int isIncremental;
 
 // Images
 //layout(binding = 1, r32f) uniform readonly image2D objectIDs;
 //layout(binding = 2, rgba8) uniform readonly image2D colors;
-//layout(binding = 3, r32ui) uniform uimage2D spriteAtlasR;
-//layout(binding = 4, r32ui) uniform uimage2D spriteAtlasG;
-//layout(binding = 5, r32ui) uniform uimage2D spriteAtlasB;
-//layout(binding = 6, r32ui) uniform uimage2D spriteAtlasAverageDenominator;
+//layout(binding = 3, r32ui) uniform uimage2DArray spriteAtlasAccumulator;
+//layout(binding = 8, r32f) uniform readonly image2DArray cellOwners;
+//layout(binding = 9, r32ui) uniform readonly uimage2D dirtyCells;
+
+vec4 CellViewport(int cell) {
+    return texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2, cell / CELL_VIEWPORTS_PER_ROW), 0);
+}
+
+int CellPage(int cell) {
+    return int(texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2 + 1, cell / CELL_VIEWPORTS_PER_ROW), 0).x);
+}
+
+bool IsCellDirty(int cell) {
+    return imageLoad(dirtyCells, ivec2(cell % CELL_VIEWPORTS_PER_ROW, cell / CELL_VIEWPORTS_PER_ROW)).r != 0u;
+}
 
 void main() {
     if(gl_GlobalInvocationID.x * 4 >= viewportWidth || gl_GlobalInvocationID.y * 4 >= viewportHeight) {
@@ -131,7 +215,13 @@ void main() {
             int yy = int(gl_GlobalInvocationID.y) * 4 + y;
             int xx = int(gl_GlobalInvocationID.x) * 4 + x;
             float id = imageLoad(objectIDs, ivec2(xx, yy)).r;
-            vec4 cellViewport = _cellViewports[min(int(id), MAX_CELL_VIEWPORTS - 1)];
+            int cell = int(id) * int(id < cellCount);
+            vec4 cellViewport = CellViewport(cell);
+            int page = CellPage(cell);
+
+            if(cell == 0 || cellViewport.z == 0.0f) {
+                continue; // the background, ids outside of the table and objects without a cell scatter nothing
+            }
 
             // map (xx, yy) to (xxAtlas, yyAtlas)
 
@@ -146,30 +236,112 @@ void main() {
             int xxAtlas = int(floor(float(int(xx) * int(cellViewport.z) + int(viewportWidth) * int(cellViewport.x)) / float(viewportWidth)));
             int yyAtlas = int(floor(float(int(yy) * int(cellViewport.w) + int(viewportHeight) * int(cellViewport.y)) / float(viewportHeight)));
 
-            vec4 color = vec4(0.0, 0.0, 0.0, 1.0) * max(1.0f - id, 0.0f) + min(id, 1.0f) * imageLoad(colors, ivec2(xx, yy));
+            // clean cells keep their atlas texels and zeroed accumulators
+            if(isIncremental == 1 && !IsCellDirty(int(imageLoad(cellOwners, ivec3(xxAtlas, yyAtlas, page)).r))) {
+                continue;
+            }
+
+            vec4 color = imageLoad(colors, ivec2(xx, yy));
 
-            imageAtomicAdd(spriteAtlasR, ivec2(xxAtlas, yyAtlas), uint(color.r * 255.0f));
-            imageAtomicAdd(spriteAtlasG, ivec2(xxAtlas, yyAtlas), uint(color.g * 255.0f));
-            imageAtomicAdd(spriteAtlasB, ivec2(xxAtlas, yyAtlas), uint(color.b * 255.0f));
-            imageAtomicAdd(spriteAtlasAverageDenominator, ivec2(xxAtlas, yyAtlas), 1);
+            uvec3 quantized = uvec3(color.rgb * 255.0f);
+
+            if(packedSums == 1) {
+                imageAtomicAdd(spriteAtlasAccumulator, ivec3(xxAtlas, yyAtlas, page * 2), quantized.r | (quantized.g << 16));
+                imageAtomicAdd(spriteAtlasAccumulator, ivec3(xxAtlas, yyAtlas, page * 2 + 1), quantized.b | (1u << 16));
+            } else {
+                imageAtomicAdd(spriteAtlasAccumulator, ivec3(xxAtlas, yyAtlas, page * 4), quantized.r);
+                imageAtomicAdd(spriteAtlasAccumulator, ivec3(xxAtlas, yyAtlas, page * 4 + 1), quantized.g);
+                imageAtomicAdd(spriteAtlasAccumulator, ivec3(xxAtlas, yyAtlas, page * 4 + 2), quantized.b);
+                imageAtomicAdd(spriteAtlasAccumulator, ivec3(xxAtlas, yyAtlas, page * 4 + 3), 1u);
+            }
         }
     }
 }
 """
 
+compute_shader_source_sprite_atlas_mark_dirty_cells = """
+// #define CELL_VIEWPORTS_PER_ROW 1024
+
+//layout(local_size_x = 8, local_size_y = 8, local_size_z = 1) in;
+//uniform float viewportWidth;
+//uniform float viewportHeight;
+
+// cell table indexed by object id, every cell is 2 texels: (x, y, width, height) and (page, 0, 0, 0)
+//uniform sampler2D cellViewports;
+//uniform float cellCount; // ids outside of the table use cell 0
+
+//layout(binding = 1, r32f) uniform readonly image2D objectIDs;
+//layout(binding = 2, rgba8) uniform readonly image2D colors;
+//layout(binding = 8, r32f) uniform readonly image2DArray cellOwners;
+// what every pixel scattered at the last atlas pass of this view: (id bits, quantized r | g << 8 | b << 16)
+//layout(binding = 10, rg32ui) uniform uimage2D pixelKeys;
+// 1 for every cell whose texels get different sums, cleared before the dispatch, laid out like the cell table.
+// Texels outside of every cell (owner 0) are left to full passes
+//layout(binding = 9, r32ui) uniform writeonly uimage2D dirtyCells;
+
+vec4 CellViewport(int cell) {
+    return texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2, cell / CELL_VIEWPORTS_PER_ROW), 0);
+}
+
+int CellPage(int cell) {
+    return int(texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2 + 1, cell / CELL_VIEWPORTS_PER_ROW), 0).x);
+}
+
+// marks the owner of the texel a pixel of id scatters to, the mapping of compute_shader_source_sprite_atlas_render_channels
+void MarkTarget(float id, ivec2 coords) {
+    int cell = int(id) * int(id < cellCount);
+    vec4 cellViewport = CellViewport(cell);
+
+    if(cell == 0 || cellViewport.z == 0.0f) {
+        return; // scatters nothing, see compute_shader_source_sprite_atlas_render_channels
+    }
+
+    int xxAtlas = int(floor(float(coords.x * int(cellViewport.z) + int(viewportWidth) * int(cellViewport.x)) / float(viewportWidth)));
+    int yyAtlas = int(floor(float(coords.y * int(cellViewport.w) + int(viewportHeight) * int(cellViewport.y)) / float(viewportHeight)));
+    int owner = int(imageLoad(cellOwners, ivec3(xxAtlas, yyAtlas, CellPage(cell))).r);
+
+    if(owner != 0) {
+        imageStore(dirtyCells, ivec2(owner % CELL_VIEWPORTS_PER_ROW, owner / CELL_VIEWPORTS_PER_ROW), uvec4(1u));
+    }
+}
+
+void main() {
+    ivec2 coords = ivec2(gl_GlobalInvocationID.xy);
+
+    if(coords.x >= int(viewportWidth) || coords.y >= int(viewportHeight)) {
+        return;
+    }
+
+    float id = imageLoad(objectIDs, coords).r;
+    vec4 color = vec4(0.0, 0.0, 0.0, 1.0) * max(1.0f - id, 0.0f) + min(id, 1.0f) * imageLoad(colors, coords);
+    uvec3 quantized = uvec3(color.rgb * 255.0f);
+    uvec2 key = uvec2(floatBitsToUint(id), quantized.r | (quantized.g << 8) | (quantized.b << 16));
+    uvec2 previousKey = imageLoad(pixelKeys, coords).rg;
+
+    // the sums of the texel the pixel scattered to and of the one it scatters to now change
+    if(key != previousKey) {
+        MarkTarget(uintBitsToFloat(previousKey.x), coords);
+        MarkTarget(id, coords);
+        imageStore(pixelKeys, coords, uvec4(key, 0u, 0u));
+    }
+}
+"""
+
 compute_shader_source_sprite_atlas_merge_channels_to_texture = """
 //#version 430 core
 
 //layout(local_size_x = 32, local_size_y = 1, local_size_z = 1) in;
+// dispatched with one row of work groups per atlas page
 //uniform float atlasWidth;
 //uniform float atlasHeight;
+//uniform int packedSums; // accumulator layout, see compute_shader_source_sprite_atlas_render_channels
+//uniform int isIncremental; // 1: only texels whose owner is set in dirtyCells
 
 // Images
-//layout(binding = 3, r32ui) uniform readwrite uimage2D spriteAtlasR;
-//layout(binding = 4, r32ui) uniform readwrite uimage2D spriteAtlasG;
-//layout(binding = 5, r32ui) uniform readwrite uimage2D spriteAtlasB;
-//layout(binding = 6, rgba8) uniform writeonly image2D spriteAtlas;
-//layout(binding = 7, r32ui) uniform readonly uimage2D spriteAtlasAverageDenominator;
+//layout(binding = 3, r32ui) uniform uimage2DArray spriteAtlasAccumulator;
+//layout(binding = 6, rgba8) uniform writeonly image2DArray spriteAtlas;
+//layout(binding = 8, r32f) uniform readonly image2DArray cellOwners;
+//layout(binding = 9, r32ui) uniform readonly uimage2D dirtyCells;
 
 void main() {
     if(gl_GlobalInvocationID.x >= atlasWidth * atlasHeight) {
@@ -177,47 +349,154 @@ void main() {
     }
 
     // copy atlas channels to atlas texture
-    ivec2 coords = ivec2(int(mod(float(gl_GlobalInvocationID.x), atlasWidth)), ceil(float(gl_GlobalInvocationID.x) / atlasWidth));
-    float d = imageLoad(spriteAtlasAverageDenominator, coords).r;
-    float r = imageLoad(spriteAtlasR, coords).r / (d * 255.0f);
-    float g = imageLoad(spriteAtlasG, coords).r / (d * 255.0f);
-    float b = imageLoad(spriteAtlasB, coords).r / (d * 255.0f);
+    int page = int(gl_GlobalInvocationID.y);
+    ivec2 coords = ivec2(int(gl_GlobalInvocationID.x) % int(atlasWidth), int(gl_GlobalInvocationID.x) / int(atlasWidth));
+    uvec4 sums; // r, g, b, count
+
+    if(isIncremental == 1) {
+        int owner = int(imageLoad(cellOwners, ivec3(coords, page)).r);
+
+        if(imageLoad(dirtyCells, ivec2(owner % CELL_VIEWPORTS_PER_ROW, owner / CELL_VIEWPORTS_PER_ROW)).r == 0u) {
+            return; // keeps the texel of the last frame
+        }
+    }
+
+    // load and clear the accumulators
+    if(packedSums == 1) {
+        uint rg = imageLoad(spriteAtlasAccumulator, ivec3(coords, page * 2)).r;
+        uint bd = imageLoad(spriteAtlasAccumulator, ivec3(coords, page * 2 + 1)).r;
+        sums = uvec4(rg & 0xFFFFu, rg >> 16, bd & 0xFFFFu, bd >> 16);
+
+        imageStore(spriteAtlasAccumulator, ivec3(coords, page * 2), uvec4(0));
+        imageStore(spriteAtlasAccumulator, ivec3(coords, page * 2 + 1), uvec4(0));
+    } else {
+        for(int channel = 0; channel < 4; ++channel) {
+            sums[channel] = imageLoad(spriteAtlasAccumulator, ivec3(coords, page * 4 + channel)).r;
+            imageStore(spriteAtlasAccumulator, ivec3(coords, page * 4 + channel), uvec4(0));
+        }
+    }
+
+    float d = float(sums.a);
+    vec4 color = vec4(vec3(sums.rgb) / (d * 255.0f), 1.0f);
+    imageStore(spriteAtlas, ivec3(coords, page), color);
+}
+"""
+
+compute_shader_source_sprite_atlas_gather = """
+// #define CELL_VIEWPORTS_PER_ROW 1024
+
+//layout(local_size_x = 8, local_size_y = 8, local_size_z = 1) in;
+// dispatched over the atlas texels with one layer of work groups per atlas page
+//uniform float viewportWidth;
+//uniform float viewportHeight;
+//uniform float atlasWidth;
+//uniform float atlasHeight;
+
+// cell table indexed by object id, grows at runtime without recompiling
+// every cell is 2 texels: (x, y, width, height) and (page, 0, 0, 0)
+//uniform sampler2D cellViewports;
+//uniform float cellCount;
+//uniform int isIncremental; // 1: only texels whose owner is set in dirtyCells
+
+//layout(binding = 1, r32f) uniform readonly image2D objectIDs;
+//layout(binding = 2, rgba8) uniform readonly image2D colors;
+//layout(binding = 6, rgba8) uniform writeonly image2DArray spriteAtlas;
+// object id owning each atlas texel, 0 where no cell is placed
+//layout(binding = 8, r32f) uniform readonly image2DArray cellOwners;
+//layout(binding = 9, r32ui) uniform readonly uimage2D dirtyCells;
+
+vec4 CellViewport(int cell) {
+    return texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2, cell / CELL_VIEWPORTS_PER_ROW), 0);
+}
+
+void main() {
+    ivec3 coords = ivec3(gl_GlobalInvocationID.xyz);
+
+    if(coords.x >= int(atlasWidth) || coords.y >= int(atlasHeight)) {
+        return;
+    }
+
+    float id = imageLoad(cellOwners, coords).r;
+
+    if(isIncremental == 1 && imageLoad(dirtyCells, ivec2(int(id) % CELL_VIEWPORTS_PER_ROW, int(id) / CELL_VIEWPORTS_PER_ROW)).r == 0u) {
+        return; // keeps the texel of the last frame
+    }
+
+    vec3 sum = vec3(0.0f);
+    float count = 0.0f;
+
+    if(id != 0.0f && id < cellCount) {
+        vec4 cellViewport = CellViewport(int(id));
+        int width = int(viewportWidth);
+        int height = int(viewportHeight);
+        int cellWidth = int(cellViewport.z);
+        int cellHeight = int(cellViewport.w);
+        int u = coords.x - int(cellViewport.x);
+        int v = coords.y - int(cellViewport.y);
+
+        // the viewport pixels the atomic kernel maps onto this texel: floor(xx * cellWidth / width) == u
+        int x0 = (u * width + cellWidth - 1) / cellWidth;
+        int x1 = min(((u + 1) * width + cellWidth - 1) / cellWidth, width);
+        int y0 = (v * height + cellHeight - 1) / cellHeight;
+        int y1 = min(((v + 1) * height + cellHeight - 1) / cellHeight, height);
+
+        for(int yy = y0; yy < y1; ++yy) {
+            for(int xx = x0; xx < x1; ++xx) {
+                if(imageLoad(objectIDs, ivec2(xx, yy)).r == id) {
+                    // same quantization as the atomic kernel so both produce the same atlas
+                    sum += floor(imageLoad(colors, ivec2(xx, yy)).rgb * 255.0f);
+                    count += 1.0f;
+                }
+            }
+        }
+    }
+
+    vec4 color = vec4(0.0f, 0.0f, 0.0f, 1.0f);
+
+    if(count > 0.0f) {
+        color.rgb = sum / (count * 255.0f);
+    }
 
-    vec4 color = vec4(r, g, b, 1.0f);
     imageStore(spriteAtlas, coords, color);
-    // clear sprite atlases
-    imageStore(spriteAtlasAverageDenominator, coords, uvec4(0));
-    imageStore(spriteAtlasR, coords, uvec4(0));
-    imageStore(spriteAtlasB, coords, uvec4(0));
-    imageStore(spriteAtlasG, coords, uvec4(0));
 }
 """
 
 compute_shader_source_combined_render = """
-// #define MAX_CELL_VIEWPORTS 100
+// #define CELL_VIEWPORTS_PER_ROW 1024
 
 // layout(local_size_x = 32, local_size_y = 1, local_size_z = 1) in;
 //uniform float viewportWidth;
 //uniform float viewportHeight;
 
-//layout(binding = 0, std140) uniform cellViewports {
-//    vec4[MAX_CELL_VIEWPORTS] _cellViewports;
-//};
+// cell table indexed by object id, grows at runtime without recompiling
+// every cell is 2 texels: (x, y, width, height) and (page, 0, 0, 0)
+//uniform sampler2D cellViewports;
+//uniform float cellCount; // ids outside of the table use cell 0
 
 //layout(binding = 1, r32f) uniform readonly image2D objectIDs;
 //layout(binding = 2, rgba8) uniform readonly image2D colors;
-//layout(binding = 6, rgba8) uniform readonly image2D spriteAtlas;
+//layout(binding = 6, rgba8) uniform readonly image2DArray spriteAtlas;
 //layout(binding = 7, rgba8) uniform writeonly image2D combinedRender;
 
+vec4 CellViewport(int cell) {
+    return texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2, cell / CELL_VIEWPORTS_PER_ROW), 0);
+}
+
+int CellPage(int cell) {
+    return int(texelFetch(cellViewports, ivec2((cell % CELL_VIEWPORTS_PER_ROW) * 2 + 1, cell / CELL_VIEWPORTS_PER_ROW), 0).x);
+}
+
 void main() {
     if(gl_GlobalInvocationID.x >= viewportWidth * viewportHeight) {
         return;
     }
 
     // combine spriteAtlas with colors using objectIDs
-    ivec2 coords = ivec2(int(mod(float(gl_GlobalInvocationID.x), viewportWidth)), ceil((float(gl_GlobalInvocationID.x) / viewportWidth)));
+    ivec2 coords = ivec2(int(gl_GlobalInvocationID.x) % int(viewportWidth), int(gl_GlobalInvocationID.x) / int(viewportWidth));
     float id = imageLoad(objectIDs, coords).r;
-    vec4 cellViewport = _cellViewports[min(int(id), MAX_CELL_VIEWPORTS - 1)];
+    int cell = int(id) * int(id < cellCount);
+    vec4 cellViewport = CellViewport(cell);
+    int page = CellPage(cell);
     vec4 color = vec4(0.0, 0.0, 0.0, 1.0);
 
     ivec2 sampleCoords = ivec2(
@@ -229,7 +508,7 @@ void main() {
         color = imageLoad(colors, coords);
     } else {
         // get it from the spriteAtlas
-        color = imageLoad(spriteAtlas, sampleCoords);
+        color = imageLoad(spriteAtlas, ivec3(sampleCoords, page));
     }
     
     // write color to combinedRender
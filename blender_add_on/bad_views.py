@@ -0,0 +1,176 @@
+#  ***** GPL LICENSE BLOCK *****
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#  All rights reserved.
+#  ***** GPL LICENSE BLOCK *****
+
+from .bad_globals import *
+
+import bpy
+from gpu.types import GPUTexture, GPUFrameBuffer, GPUOffScreen
+
+from .bad_render_targets import BAD_RenderTargetPool
+
+# (window, area, region) of the WINDOW region of every 3d view in all windows, the views of context.window first.
+# A quad view has 4 WINDOW regions, each with its own RegionView3D in region.data
+def find_view_regions(context : bpy.types.Context) -> list:
+    windows = list(context.window_manager.windows)
+    window = getattr(context, "window", None)
+
+    if window != None and window in windows:
+        windows.remove(window)
+        windows.insert(0, window)
+
+    view_regions = []
+
+    for window in windows:
+        for area in window.screen.areas:
+            if area.type != "VIEW_3D":
+                continue
+
+            for region in area.regions:
+                if region.type == "WINDOW" and region.data != None and region.width > 0 and region.height > 0:
+                    view_regions.append((window, area, region))
+
+    return view_regions
+
+# one set of viewport sized render targets, allocated by BAD_View.m_render_targets in bucket sizes
+def create_render_targets(width : int, height : int) -> dict:
+    texture_object_id = GPUTexture((width, height), format = "R32F")
+    texture_object_id.clear(format = "FLOAT", value = (0.0,))
+    texture_linearized_depth = GPUTexture((width, height), format = "R32F")
+    texture_linearized_depth.clear(format = "FLOAT", value = (0.0,))
+    texture_depth = GPUTexture((width, height), format = "DEPTH_COMPONENT24")
+    texture_depth.clear(format = "FLOAT", value = (1.0,))
+    texture_combined_render = GPUTexture((width, height), format = "RGBA8")
+    texture_combined_render.clear(format = "FLOAT", value = (0.0, 0.0, 0.0, 1.0))
+    texture_pixel_keys = GPUTexture((width, height), format = "RG32UI")
+    texture_pixel_keys.clear(format = "UINT", value = (0, 0))
+
+    return { "object_id" : texture_object_id,
+             "linearized_depth" : texture_linearized_depth,
+             "depth" : texture_depth,
+             "combined_render" : texture_combined_render,
+             "pixel_keys" : texture_pixel_keys,
+             "framebuffer" : GPUFrameBuffer(depth_slot = texture_depth, color_slots = (texture_object_id, texture_linearized_depth)),
+             "offscreen" : GPUOffScreen(width, height, format = "RGBA8") }
+
+def release_render_targets(targets : dict):
+    targets["offscreen"].free()
+
+# render state of one 3d view region, keyed by the region pointer. Mesh buffers, static batches, shaders, the cell
+# layout and the sprite atlas are shared by all views and belong to BAD_Pipeline
+class BAD_View:
+
+    def __init__(self, key : int):
+        self.m_key = key
+
+        # set by update every frame, only valid during the frame that set them since screen data has no reference counting
+        self.m_window = None
+        self.m_space = None
+        self.m_region = None
+
+        self.m_viewport_dimensions = (0, 0)
+        # the viewport is the (0, 0, width, height) sub-rectangle of the pooled render targets, see BAD_RENDER_TARGET_GRANULARITY
+        self.m_render_target_dimensions = (0, 0)
+        self.m_render_targets = BAD_RenderTargetPool(create_render_targets, release_render_targets, BAD_RENDER_TARGET_GRANULARITY,
+                                                     BAD_RENDER_TARGET_MIN_COVERAGE, BAD_RENDER_TARGET_POOL_SIZE)
+        self.m_texture_color_attachment_object_id = None
+        self.m_texture_color_attachment_linearized_depth = None
+        self.m_texture_depth_attachment = None
+        self.m_texture_combined_render = None
+        self.m_texture_pixel_keys = None # what every pixel scattered at the last atlas pass, see BAD_SPRITE_ATLAS_TEMPORAL_REUSE
+        self.m_pixel_keys = None # the cpu backend copy of m_texture_pixel_keys
+        self.m_framebuffer_view_3d = None
+        self.m_framebuffer_offscreen = None
+
+        # the viewport sized textures, the image editors look the atlas textures up in the pipeline
+        self.m_texture_name_to_display_texture_info = {}
+
+        # the shared cell table with cell 0 holding the dimensions of this view, uploaded again when the layout version changes
+        self.m_texture_cell_viewports = None
+        self.m_cell_layout_version = -1
+
+        self.m_rasterizer = None # see BAD_OBJECT_ID_DEPTH_BACKEND
+
+        # the view only renders when its signature changed, see BAD_Pipeline.compute_frame_signature
+        self.m_frame_signature = None
+        self.m_visible_object_ids = None # objects inside the view frustum at the last render, None when culling is off
+        self.m_screen_extents = None # (object ids, (n, 2) pixel sizes) of the visible instances at the last render
+        self.m_render_count = 0
+
+    def update(self, window : bpy.types.Window, space : bpy.types.SpaceView3D, region : bpy.types.Region):
+        self.m_window = window
+        self.m_space = space
+        self.m_region = region
+
+    def is_resized(self) -> bool:
+        return (self.m_region.width, self.m_region.height) != tuple(self.m_viewport_dimensions)
+
+    def update_render_targets(self, viewport_dimensions : tuple):
+        self.m_viewport_dimensions = tuple(viewport_dimensions)
+        targets, self.m_render_target_dimensions = self.m_render_targets.acquire(self.m_viewport_dimensions[0], self.m_viewport_dimensions[1])
+
+        self.m_texture_color_attachment_object_id = targets["object_id"]
+        self.m_texture_color_attachment_linearized_depth = targets["linearized_depth"]
+        self.m_texture_depth_attachment = targets["depth"]
+        self.m_texture_combined_render = targets["combined_render"]
+        self.m_texture_pixel_keys = targets["pixel_keys"]
+        self.m_framebuffer_view_3d = targets["framebuffer"]
+        self.m_framebuffer_offscreen = targets["offscreen"]
+
+        self.m_cell_layout_version = -1 # cell 0 holds the viewport dimensions
+
+        self.m_texture_name_to_display_texture_info["Object ID"] = { "texture" : self.m_texture_color_attachment_object_id,
+                                                                     "extent" : self.m_viewport_dimensions,
+                                                                     "is_multiple_channels" : 0.0,
+                                                                     "channel_min" : 0.0,
+                                                                     "channel_max" : 0.0} # set to default values they are going to be updated in render
+        self.m_texture_name_to_display_texture_info["Depth Linearized"] = { "texture" : self.m_texture_color_attachment_linearized_depth,
+                                                                            "extent" : self.m_viewport_dimensions,
+                                                                            "is_multiple_channels" : 0.0,
+                                                                            "channel_min" : 0.0, # set to default values they are going to be updated in render
+                                                                            "channel_max" : 0.0}
+        self.m_texture_name_to_display_texture_info["Combined Render"] = { "texture" : self.m_texture_combined_render,
+                                                                           "extent" : self.m_viewport_dimensions,
+                                                                           "is_multiple_channels" : 1.0,
+                                                                           "channel_min" : 0.0,
+                                                                           "channel_max" : 1.0}
+        self.m_texture_name_to_display_texture_info["Color"] = { "texture" : self.m_framebuffer_offscreen.texture_color,
+                                                                 "extent" : self.m_viewport_dimensions,
+                                                                 "is_multiple_channels" : 1.0,
+                                                                 "channel_min" : 0.0,
+                                                                 "channel_max" : 1.0}
+
+    # maps the clip space of projection_matrix onto the viewport sub-rectangle of the render targets:
+    # x' = sx * x + (sx - 1) * w moves the ndc range [-1, 1] to [-1, 2 * sx - 1], the same for y
+    def sub_rectangle_projection(self, projection_matrix):
+        sx = self.m_viewport_dimensions[0] / self.m_render_target_dimensions[0]
+        sy = self.m_viewport_dimensions[1] / self.m_render_target_dimensions[1]
+
+        if sx == 1.0 and sy == 1.0:
+            return projection_matrix
+
+        matrix = projection_matrix.copy()
+        matrix[0] = matrix[0] * sx + matrix[3] * (sx - 1.0)
+        matrix[1] = matrix[1] * sy + matrix[3] * (sy - 1.0)
+        return matrix
+
+    def release(self):
+        self.m_render_targets.clear()
+        self.m_framebuffer_offscreen = None
+        self.m_texture_name_to_display_texture_info.clear()
+        self.m_window = None
+        self.m_space = None
+        self.m_region = None
@@ -2,12 +2,23 @@ import blender_add_on
 import importlib
 
 def reload():
+    importlib.reload(blender_add_on.bad_cpu_backend)
+    importlib.reload(blender_add_on.bad_export)
+    importlib.reload(blender_add_on.bad_geometry)
     importlib.reload(blender_add_on.bad_globals)
     importlib.reload(blender_add_on.bad_helpers)
     importlib.reload(blender_add_on.bad_menus)
+    importlib.reload(blender_add_on.bad_mesh_preparer)
+    importlib.reload(blender_add_on.bad_packer)
     importlib.reload(blender_add_on.bad_pipeline)
+    importlib.reload(blender_add_on.bad_profiler)
+    importlib.reload(blender_add_on.bad_rasterizer)
+    importlib.reload(blender_add_on.bad_render_targets)
+    importlib.reload(blender_add_on.bad_resources)
     importlib.reload(blender_add_on.bad_settings)
+    importlib.reload(blender_add_on.bad_shader_cache)
     importlib.reload(blender_add_on.bad_shaders)
+    importlib.reload(blender_add_on.bad_views)
     importlib.reload(blender_add_on)
     return None
 